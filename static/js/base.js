@@ -0,0 +1,160 @@
+// Initialize AOS
+AOS.init({
+    duration: 1000,
+    once: true,
+    offset: 100
+});
+
+// Navbar scroll effect
+window.addEventListener('scroll', function() {
+    const navbar = document.querySelector('.navbar');
+    if (window.scrollY > 50) {
+        navbar.classList.add('scrolled');
+    } else {
+        navbar.classList.remove('scrolled');
+    }
+});
+
+// Smooth scrolling for anchor links
+document.querySelectorAll('a[href^="#"]').forEach(anchor => {
+    anchor.addEventListener('click', function (e) {
+        e.preventDefault();
+        const target = document.querySelector(this.getAttribute('href'));
+        if (target) {
+            target.scrollIntoView({
+                behavior: 'smooth',
+                block: 'start'
+            });
+        }
+    });
+});
+
+// Live Search Functionality
+let searchTimeout;
+const searchInput = document.getElementById('searchInput');
+const searchResults = document.getElementById('searchResults');
+
+if (searchInput) {
+    searchInput.addEventListener('input', function() {
+        clearTimeout(searchTimeout);
+        const query = this.value.trim();
+
+        if (query.length < 2) {
+            searchResults.style.display = 'none';
+            return;
+        }
+
+        searchTimeout = setTimeout(() => {
+            fetch(`/api/search/?q=${encodeURIComponent(query)}`)
+                .then(response => response.json())
+                .then(data => {
+                    displaySearchResults(data.results);
+                })
+                .catch(error => {
+                    console.error('Search error:', error);
+                });
+        }, 300);
+    });
+
+    // Hide search results when clicking outside
+    document.addEventListener('click', function(e) {
+        if (!searchInput.contains(e.target) && !searchResults.contains(e.target)) {
+            searchResults.style.display = 'none';
+        }
+    });
+}
+
+function displaySearchResults(results) {
+    const searchResults = document.getElementById('searchResults');
+
+    if (results.length === 0) {
+        searchResults.innerHTML = '<div class="search-result-item text-center py-4">No results found</div>';
+    } else {
+        searchResults.innerHTML = results.map(result => `
+            <div class="search-result-item" onclick="window.location.href='${result.url}'">
+                <div class="d-flex align-items-center">
+                    ${result.image ? `<img src="${result.image}" alt="${result.name}" style="width: 60px; height: 60px; object-fit: cover; border-radius: 12px; margin-right: 20px;">` : ''}
+                    <div>
+                        <h6 class="mb-1 fw-bold">${result.name}</h6>
+                        <small class="text-muted d-block mb-2">${result.description}</small>
+                        <span class="badge bg-primary">${result.type}</span>
+                    </div>
+                </div>
+            </div>
+        `).join('');
+    }
+
+    searchResults.style.display = 'block';
+}
+
+// Toast notification function
+function showToast() {
+    const toast = new bootstrap.Toast(document.getElementById('successToast'));
+    toast.show();
+
+    // Auto hide after 5 seconds
+    setTimeout(() => {
+        toast.hide();
+    }, 5000);
+}
+
+// Handle AJAX form submissions
+document.addEventListener('DOMContentLoaded', function() {
+    const contactForms = document.querySelectorAll('form[action*="contact"]');
+
+    // Static snapshot pages carry no per-visitor tokens; fetch them first.
+    const staticForms = Array.from(contactForms).filter(form =>
+        form.querySelector('input[name="csrfmiddlewaretoken"][value=""]'));
+    if (staticForms.length) {
+        fetch('/contact/token/', {credentials: 'same-origin'})
+            .then(response => response.json())
+            .then(data => {
+                staticForms.forEach(form => {
+                    form.querySelector('input[name="csrfmiddlewaretoken"]').value = data.csrf_token;
+                    form.querySelector('input[name="form_token"]').value = data.form_token;
+                });
+            })
+            .catch(error => {
+                console.error('Token error:', error);
+            });
+    }
+
+    contactForms.forEach(form => {
+        form.addEventListener('submit', function(e) {
+            e.preventDefault();
+
+            const formData = new FormData(this);
+
+            fetch(this.action, {
+                method: 'POST',
+                body: formData,
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest',
+                }
+            })
+            .then(response => {
+                if (response.redirected) {
+                    showToast();
+                    setTimeout(() => {
+                        window.location.href = response.url;
+                    }, 3000);
+                } else if (response.ok) {
+                    showToast();
+                    this.reset();
+                } else if (response.status === 429) {
+                    response.json().then(data => alert(data.message));
+                } else {
+                    console.error('Form submission failed');
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+            });
+        });
+    });
+});
+
+// Update all elements with data-year attribute
+document.querySelectorAll('[data-year]').forEach(element => {
+    element.textContent = new Date().getFullYear();
+});
@@ -1,6 +1,89 @@
-from django.contrib import admin
+import tempfile
+import zipfile
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from django.utils.html import format_html
+from .forms import ImportForm
 from .models import *
+from .pagination import EstimatedCountPaginator
+from .transfer import (
+    export_lines, extract_media_archive, file_field_names, import_rows, read_rows, text_stream, write_media_archive,
+)
+
+
+class TransferMixin:
+    """Bulk export actions (CSV, JSON Lines, media zip) and an import page.
+
+    The import page runs the same all-or-nothing ``import_rows`` as the
+    import_data command, after adding the files of an optional media zip.
+    """
+    actions = ['export_csv', 'export_jsonl', 'export_media']
+    change_list_template = 'admin/website/transfer_change_list.html'
+
+    def _filename(self, queryset, suffix):
+        return f'{queryset.model._meta.model_name}-{timezone.now():%Y%m%d-%H%M}{suffix}'
+
+    def _export(self, queryset, fmt, content_type):
+        model = queryset.model
+        response = StreamingHttpResponse(export_lines(model, queryset, fmt), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self._filename(queryset, f".{fmt}")}"'
+        return response
+
+    @admin.action(description="Export selected as CSV")
+    def export_csv(self, request, queryset):
+        return self._export(queryset, 'csv', 'text/csv; charset=utf-8')
+
+    @admin.action(description="Export selected as JSON Lines")
+    def export_jsonl(self, request, queryset):
+        return self._export(queryset, 'jsonl', 'application/x-ndjson')
+
+    @admin.action(description="Export media files of selected as ZIP")
+    def export_media(self, request, queryset):
+        # Spooled to disk: a zip is written with seeks, and media can be large.
+        archive = tempfile.TemporaryFile()
+        write_media_archive(archive, queryset.model, queryset)
+        archive.seek(0)
+        return FileResponse(archive, as_attachment=True, filename=self._filename(queryset, '-media.zip'))
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if not file_field_names(self.model):
+            actions.pop('export_media', None)
+        return actions
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        opts = self.model._meta
+        form = ImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload, media = form.cleaned_data['file'], form.cleaned_data['media']
+            fmt = form.cleaned_data['format'] or ('jsonl' if upload.name.endswith(('.jsonl', '.ndjson')) else 'csv')
+            try:
+                added = extract_media_archive(media) if media else 0
+                result = import_rows(self.model, read_rows(text_stream(upload.file), fmt))
+            except (ValueError, zipfile.BadZipFile) as exc:
+                form.add_error(None, f'Nothing imported. {exc}')
+            else:
+                self.message_user(request, f'{result["created"]} created, {result["updated"]} updated, '
+                                           f'{added} media file(s) added.', messages.SUCCESS)
+                return redirect(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+        context = dict(self.admin_site.each_context(request), opts=opts, form=form,
+                       title=f'Import {opts.verbose_name_plural}')
+        return TemplateResponse(request, 'admin/website/import.html', context)
 
 
 @admin.register(SiteSettings)
@@ -54,8 +137,8 @@ class HeroSectionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
-    list_display = ['name', 'image_preview', 'is_featured', 'order', 'created_at']
+class ServiceAdmin(TransferMixin, admin.ModelAdmin):
+    list_display = ['name', 'image_preview', 'is_featured', 'order', 'download_count', 'created_at']
     list_filter = ['is_featured', 'created_at']
     search_fields = ['name', 'short_description']
     list_editable = ['is_featured', 'order']
@@ -79,8 +162,9 @@ class ServiceAdmin(admin.ModelAdmin):
 
 
 @admin.register(Training)
-class TrainingAdmin(admin.ModelAdmin):
-    list_display = ['name', 'image_preview', 'level', 'duration', 'is_featured', 'order', 'created_at']
+class TrainingAdmin(TransferMixin, admin.ModelAdmin):
+    list_display = ['name', 'image_preview', 'level', 'duration', 'is_featured', 'order', 'download_count',
+                    'created_at']
     list_filter = ['level', 'is_featured', 'created_at']
     search_fields = ['name', 'short_description']
     list_editable = ['is_featured', 'order']
@@ -104,7 +188,7 @@ class TrainingAdmin(admin.ModelAdmin):
 
 
 @admin.register(TrustedCompany)
-class TrustedCompanyAdmin(admin.ModelAdmin):
+class TrustedCompanyAdmin(TransferMixin, admin.ModelAdmin):
     list_display = ['name', 'logo_preview', 'website_url', 'order', 'created_at']
     list_editable = ['order']
     search_fields = ['name']
@@ -119,7 +203,7 @@ class TrustedCompanyAdmin(admin.ModelAdmin):
 
 
 @admin.register(Testimonial)
-class TestimonialAdmin(admin.ModelAdmin):
+class TestimonialAdmin(TransferMixin, admin.ModelAdmin):
     list_display = ['name', 'image_preview', 'company', 'rating', 'is_featured', 'order', 'created_at']
     list_filter = ['rating', 'is_featured', 'created_at']
     search_fields = ['name', 'company', 'review']
@@ -135,12 +219,22 @@ class TestimonialAdmin(admin.ModelAdmin):
 
 
 @admin.register(Contact)
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(TransferMixin, admin.ModelAdmin):
     list_display = ['full_name', 'email', 'phone_number', 'status', 'created_at']
-    list_filter = ['status', 'created_at']
+    list_filter = ['status']
+    date_hierarchy = 'created_at'
     search_fields = ['full_name', 'email', 'phone_number']
+    search_help_text = "Start of a name, email address or phone number"
     list_editable = ['status']
     readonly_fields = ['created_at', 'updated_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed prefix search on the normalized keys instead of icontains.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.search(search_term.strip()), False
 
     fieldsets = (
         ('Contact Information', {
@@ -153,3 +247,20 @@ class ContactAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['subject']
+    readonly_fields = ['contact', 'subject', 'body', 'attempts', 'last_error', 'sent_at', 'created_at', 'updated_at']
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Retry selected emails now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} email(s) queued for delivery.")
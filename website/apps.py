@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class WebsiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'website'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .db import configure_sqlite
+        from .metrics import install_sql_timer
+
+        connection_created.connect(configure_sqlite, dispatch_uid='website.configure_sqlite')
+        connection_created.connect(install_sql_timer, dispatch_uid='website.install_sql_timer')
@@ -0,0 +1,46 @@
+"""
+Third-party front-end assets used by base.html.
+
+Each entry maps the CDN URL the site has always used to the path under
+``static/`` where ``build_assets`` vendors a copy. With SELF_HOSTED_ASSETS
+enabled, the ``vendor_url`` template tag points at the local copy, which
+collectstatic fingerprints and precompresses (gzip and brotli) and WhiteNoise
+serves with immutable cache headers.
+"""
+from django.conf import settings
+
+VENDOR_ASSETS = {
+    'bootstrap_css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+        'vendor/bootstrap/bootstrap.min.css',
+    ),
+    'bootstrap_js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+        'vendor/bootstrap/bootstrap.bundle.min.js',
+    ),
+    'fontawesome_css': (
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+        'vendor/fontawesome/css/icons.min.css',
+    ),
+    'google_fonts_css': (
+        'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700'
+        '&family=Poppins:wght@300;400;500;600;700;800;900&display=swap',
+        'vendor/fonts/fonts.css',
+    ),
+    'aos_css': (
+        'https://unpkg.com/aos@2.3.1/dist/aos.css',
+        'vendor/aos/aos.css',
+    ),
+    'aos_js': (
+        'https://unpkg.com/aos@2.3.1/dist/aos.js',
+        'vendor/aos/aos.js',
+    ),
+}
+
+FONT_AWESOME_WEBFONTS_URL = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/'
+FONT_AWESOME_WEBFONTS_DIR = 'vendor/fontawesome/webfonts'
+GOOGLE_FONTS_DIR = 'vendor/fonts'
+
+
+def self_hosted():
+    return getattr(settings, 'SELF_HOSTED_ASSETS', False)
@@ -0,0 +1,131 @@
+"""
+Async variants of the public read-only views.
+
+They are routed instead of their counterparts in views.py when
+``WEBSITE_ASYNC_VIEWS`` is enabled, which only pays off under an ASGI
+server. SiteSettings are loaded before rendering and attached to the
+request, so the ``site_settings`` context processor never touches the ORM
+from the event loop.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404, render
+
+from .cache import aget_site_settings
+from .conditional import (
+    conditional_page, home_sources, service_detail_sources, services_sources,
+    training_detail_sources, trainings_sources,
+)
+from .models import HeroSection, Service, Testimonial, Training, TrustedCompany
+from .images import prefetch_renditions
+from .page_cache import cache_public_page
+from .pagination import LISTING_PAGE_SIZE, paginate_listing
+from .related import related_cards
+from .search import aget_search_index
+
+
+# Templates can still reach the ORM (e.g. responsive_image looking up
+# renditions), so rendering runs in the sync thread like the queries do.
+_arender = sync_to_async(render)
+_apaginate_listing = sync_to_async(paginate_listing)
+_arelated_cards = sync_to_async(related_cards)
+_aprefetch_renditions = sync_to_async(prefetch_renditions)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset.aiterator()]
+
+
+@conditional_page(home_sources)
+@cache_public_page
+async def home(request):
+    # The async ORM runs each query in the shared sync thread, so gather()
+    # mainly saves the round trips through the event loop between them.
+    (request.site_settings, hero_section, services, trainings, testimonials) = await asyncio.gather(
+        aget_site_settings(),
+        HeroSection.objects.filter(is_active=True).afirst(),
+        _alist(Service.objects.cards().filter(is_featured=True)[:6]),
+        _alist(Training.objects.cards().filter(is_featured=True)[:6]),
+        _alist(Testimonial.objects.filter(is_featured=True)[:6]),
+    )
+    await _aprefetch_renditions(services, trainings, testimonials)
+    # Left lazy for the cached marquee fragment; rendering runs in the sync thread.
+    trusted_companies = TrustedCompany.objects.all()
+
+    context = {
+        'hero_section': hero_section,
+        'services': services,
+        'trainings': trainings,
+        'trusted_companies': trusted_companies,
+        'testimonials': testimonials,
+    }
+    return await _arender(request, 'website/index.html', context)
+
+
+@conditional_page(services_sources)
+@cache_public_page
+async def services_list(request):
+    request.site_settings = await aget_site_settings()
+    page_obj = await _apaginate_listing(request.GET, Service.objects.cards(), LISTING_PAGE_SIZE, 'services')
+    await _aprefetch_renditions(page_obj)
+
+    context = {
+        'page_obj': page_obj,
+        'services': page_obj,
+    }
+    return await _arender(request, 'website/services.html', context)
+
+
+@conditional_page(service_detail_sources)
+@cache_public_page
+async def service_detail(request, pk):
+    request.site_settings = await aget_site_settings()
+    service = await aget_object_or_404(Service, pk=pk)
+    related_services = await _arelated_cards(Service, pk)
+    await _aprefetch_renditions([service], related_services)
+
+    context = {
+        'service': service,
+        'related_services': related_services,
+    }
+    return await _arender(request, 'website/service_detail.html', context)
+
+
+@conditional_page(trainings_sources)
+@cache_public_page
+async def trainings_list(request):
+    request.site_settings = await aget_site_settings()
+    page_obj = await _apaginate_listing(request.GET, Training.objects.cards(), LISTING_PAGE_SIZE, 'trainings')
+    await _aprefetch_renditions(page_obj)
+
+    context = {
+        'page_obj': page_obj,
+        'trainings': page_obj,
+    }
+    return await _arender(request, 'website/trainings.html', context)
+
+
+@conditional_page(training_detail_sources)
+@cache_public_page
+async def training_detail(request, pk):
+    request.site_settings = await aget_site_settings()
+    training = await aget_object_or_404(Training, pk=pk)
+    whatsapp_message = f"Hi, I'm interested in {training.name} training. Please provide more details about enrollment."
+    related_trainings = await _arelated_cards(Training, pk)
+    await _aprefetch_renditions([training], related_trainings)
+
+    context = {
+        'training': training,
+        'related_trainings': related_trainings,
+        "whatsapp_message": whatsapp_message,
+    }
+    return await _arender(request, 'website/training_detail.html', context)
+
+
+async def live_search(request):
+    query = request.GET.get('q', '')
+    index = await aget_search_index()
+    return HttpResponse(index.live_search(query), content_type='application/json')
@@ -0,0 +1,106 @@
+"""
+Small data structures used by the live search endpoint.
+"""
+import threading
+from collections import OrderedDict
+
+
+class _Node:
+    __slots__ = ('children', 'keys', 'owner')
+
+    def __init__(self, owner, children=None, keys=None):
+        self.owner = owner
+        self.children = {} if children is None else dict(children)
+        self.keys = set() if keys is None else set(keys)
+
+
+class PrefixTrie:
+    """Maps every prefix of the inserted words to the keys of their documents.
+
+    Keys are stored on each node along a word's path, so a lookup costs
+    ``len(prefix)`` steps no matter how large the catalog is.
+
+    ``copy()`` is cheap: both tries share every node, and each copies the
+    nodes along a word's path before changing them. A trie that is only read
+    after being copied can be read without locks while its copy is updated.
+    """
+
+    def __init__(self):
+        self._owner = object()
+        self.root = _Node(self._owner)
+
+    def copy(self):
+        clone = PrefixTrie()
+        clone.root = self.root
+        # From now on the shared nodes belong to neither trie.
+        self._owner = object()
+        return clone
+
+    def _own(self, node):
+        if node.owner is self._owner:
+            return node
+        return _Node(self._owner, node.children, node.keys)
+
+    def insert(self, word, key):
+        node = self.root = self._own(self.root)
+        for char in word:
+            child = node.children.get(char)
+            child = node.children[char] = _Node(self._owner) if child is None else self._own(child)
+            child.keys.add(key)
+            node = child
+
+    def remove(self, word, key):
+        path = [self._own(self.root)]
+        self.root = path[0]
+        for char in word:
+            node = path[-1].children.get(char)
+            if node is None:
+                break
+            node = path[-1].children[char] = self._own(node)
+            node.keys.discard(key)
+            path.append(node)
+
+        for parent, char in zip(reversed(path[:-1]), reversed(word[:len(path) - 1])):
+            child = parent.children[char]
+            if child.keys or child.children:
+                break
+            del parent.children[char]
+
+    def lookup(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return frozenset()
+        return frozenset(node.keys)
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
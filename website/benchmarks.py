@@ -0,0 +1,259 @@
+"""
+In-process micro-benchmarks for the hot paths, with checked-in budgets.
+
+Each benchmark is a zero-argument callable plus an untimed ``setup`` run
+before every call: rendering each template in templates/website with a
+large context, the querysets behind the views, live search serialisation,
+the site_settings context processor and whole requests through the test
+client, both as page cache hits and as misses.
+
+A run records per benchmark the median time, the peak memory allocated by
+one call (tracemalloc) and its query count. ``check`` compares a run with
+the budgets in ``BASELINE_PATH``: time and memory may exceed the baseline
+by the file's tolerances, the query count not at all. The ``benchmark``
+command runs everything against a throwaway database filled by
+``create_fixture``, so numbers do not depend on the live data.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.db import connection, reset_queries
+from django.http import QueryDict
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import context_processors
+from .cache import invalidate_site_settings
+from .forms import ContactForm
+from .images import prefetch_renditions
+from .models import HeroSection, Service, SiteSettings, Testimonial, Training, TrustedCompany
+from .page_cache import purge_all
+from .pagination import LISTING_PAGE_SIZE, paginate_listing
+from .related import related_cards
+from .search import build_index, get_search_index
+from .seed import seed
+
+BASELINE_PATH = Path(__file__).with_name('benchmark_baseline.json')
+DEFAULT_TOLERANCE = {'time': 0.3, 'memory': 0.1}
+# Absolute slack on top of the tolerance, so sub-millisecond noise never fails a run.
+TIME_SLACK_MS = 0.05
+MEMORY_SLACK_KB = 4
+# Slow benchmarks stop early, after at least MIN_ROUNDS calls.
+MAX_SECONDS = 2.0
+MIN_ROUNDS = 3
+FIXTURE_COUNTS = {'services': 300, 'trainings': 300, 'companies': 100, 'testimonials': 40}
+SEARCH_QUERIES = ('py', 'pyth', 'python', 'cloud dev', 'secure', 'kubernetes work', 'data an', 'zzz')
+CATALOG = ((Service, 'services', 'service'), (Training, 'trainings', 'training'))
+
+
+def create_fixture(scale=1.0):
+    """Fill an empty database with the catalog the benchmarks run against."""
+    SiteSettings.objects.create(site_name='Zynder Tech', phone_number='+91 9000000000', email='info@example.com',
+                                address='Kochi', whatsapp_number='919000000000')
+    HeroSection.objects.create(title='Hero', subtitle='Subtitle', description='<p>Hero description</p>')
+    seed({kind: max(1, int(count * scale)) for kind, count in FIXTURE_COUNTS.items()}, seed=0)
+
+
+def _noop():
+    pass
+
+
+def _home_context():
+    services = list(Service.objects.cards().filter(is_featured=True)[:6])
+    trainings = list(Training.objects.cards().filter(is_featured=True)[:6])
+    companies = list(TrustedCompany.objects.all())
+    testimonials = list(Testimonial.objects.filter(is_featured=True)[:6])
+    prefetch_renditions(services, trainings, companies, testimonials)
+    return {
+        'hero_section': HeroSection.objects.filter(is_active=True).first(),
+        'services': services,
+        'trainings': trainings,
+        'trusted_companies': companies,
+        'testimonials': testimonials,
+    }
+
+
+def template_benchmarks(request):
+    contexts = {'index.html': _home_context(), 'contact.html': {'form': ContactForm()}}
+    for model, plural, singular in CATALOG:
+        page = paginate_listing(QueryDict(), model.objects.cards(), LISTING_PAGE_SIZE, plural)
+        item = model.objects.order_by('pk').first()
+        related = related_cards(model, item.pk)
+        prefetch_renditions(page, [item], related)
+        contexts[f'{plural}.html'] = {'page_obj': page, plural: page}
+        contexts[f'{singular}_detail.html'] = {singular: item, f'related_{plural}': related,
+                                               'whatsapp_message': f'Hi, about {item.name}'}
+    for name in ('terms.html', 'privacy.html', 'refund.html'):
+        contexts[name] = {}
+    return {
+        f'template:{name}': (lambda name=name, context=context: render_to_string(
+            f'website/{name}', context, request), _noop)
+        for name, context in sorted(contexts.items())
+    }
+
+
+def query_benchmarks():
+    benchmarks = {
+        'query:home.hero': lambda: HeroSection.objects.filter(is_active=True).first(),
+        'query:home.companies': lambda: list(TrustedCompany.objects.all()),
+        'query:home.testimonials': lambda: list(Testimonial.objects.filter(is_featured=True)[:6]),
+    }
+    for model, plural, singular in CATALOG:
+        last_page = QueryDict(f'page={max(1, -(-model.objects.count() // LISTING_PAGE_SIZE))}')
+        pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+        benchmarks.update({
+            f'query:home.{plural}': lambda model=model: list(model.objects.cards().filter(is_featured=True)[:6]),
+            f'query:{plural}.first_page': lambda model=model, plural=plural: list(
+                paginate_listing(QueryDict(), model.objects.cards(), LISTING_PAGE_SIZE, plural)),
+            f'query:{plural}.last_page': lambda model=model, plural=plural, params=last_page: list(
+                paginate_listing(params, model.objects.cards(), LISTING_PAGE_SIZE, plural)),
+            f'query:{singular}_detail': lambda model=model, pk=pk: (
+                get_object_or_404(model, pk=pk), related_cards(model, pk)),
+        })
+    return {name: (func, _noop) for name, func in benchmarks.items()}
+
+
+def search_benchmarks():
+    index = get_search_index()
+
+    def live_search():
+        for query in SEARCH_QUERIES:
+            index.live_search(query)
+
+    return {
+        'search:live_search': (live_search, index.responses.clear),
+        'search:live_search.memoized': (live_search, _noop),
+        'search:build_index': (build_index, _noop),
+    }
+
+
+def context_benchmarks(request):
+    return {
+        'context:site_settings': (lambda: context_processors.site_settings(request), _noop),
+        'context:site_settings.invalidated': (lambda: context_processors.site_settings(request),
+                                              invalidate_site_settings),
+    }
+
+
+def view_benchmarks():
+    client = Client()
+    service = Service.objects.order_by('pk').first()
+    training = Training.objects.order_by('pk').first()
+    paths = {
+        'home': reverse('home'),
+        'services': reverse('services'),
+        'service_detail': service.get_absolute_url(),
+        'trainings': reverse('trainings'),
+        'training_detail': training.get_absolute_url(),
+        'contact': reverse('contact'),
+        'live_search': reverse('live_search') + '?q=python',
+        'terms': reverse('terms'),
+    }
+    benchmarks = {}
+    for name, path in paths.items():
+        get = lambda path=path: client.get(path)
+        benchmarks[f'view:{name}'] = (get, _noop)
+        if name not in ('contact', 'live_search'):
+            benchmarks[f'view:{name}.cache_miss'] = (get, purge_all)
+    return benchmarks
+
+
+def collect(names=None):
+    """``{name: (func, setup)}`` of the benchmarks whose name contains one of ``names``."""
+    request = RequestFactory().get('/')
+    benchmarks = {
+        **template_benchmarks(request),
+        **query_benchmarks(),
+        **search_benchmarks(),
+        **context_benchmarks(request),
+        **view_benchmarks(),
+    }
+    if names:
+        benchmarks = {name: b for name, b in benchmarks.items() if any(part in name for part in names)}
+    return dict(sorted(benchmarks.items()))
+
+
+def measure(func, setup, rounds):
+    setup()
+    func()
+    times = []
+    for _ in range(rounds):
+        setup()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+        if sum(times) > MAX_SECONDS and len(times) >= MIN_ROUNDS:
+            break
+
+    setup()
+    # Requests reset the query log when they start; count from an empty one.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    # Read now: the captured list is a view of the live log.
+    query_count = len(queries)
+
+    setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'time_ms': round(statistics.median(times) * 1000, 3),
+        'min_ms': round(min(times) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1),
+        'queries': query_count,
+    }
+
+
+def run_benchmarks(names=None, rounds=20, progress=None):
+    results = {}
+    for name, (func, setup) in collect(names).items():
+        results[name] = measure(func, setup, rounds)
+        if progress:
+            progress(name, results[name])
+    return results
+
+
+def read_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'tolerance': DEFAULT_TOLERANCE, 'benchmarks': {}}
+
+
+def write_baseline(results, path=BASELINE_PATH, tolerance=None):
+    baseline = {
+        'tolerance': tolerance or read_baseline(path).get('tolerance', DEFAULT_TOLERANCE),
+        'benchmarks': {name: {key: result[key] for key in ('time_ms', 'peak_kb', 'queries')}
+                       for name, result in results.items()},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def check(results, baseline, tolerance=None):
+    """Budget overruns as ``(name, metric, budget, measured)`` tuples."""
+    tolerance = {**DEFAULT_TOLERANCE, **baseline.get('tolerance', {}), **(tolerance or {})}
+    failures = []
+    for name, result in results.items():
+        budget = baseline['benchmarks'].get(name)
+        if budget is None:
+            continue
+        if result['time_ms'] > budget['time_ms'] * (1 + tolerance['time']) + TIME_SLACK_MS:
+            failures.append((name, 'time_ms', budget['time_ms'], result['time_ms']))
+        if result['peak_kb'] > budget['peak_kb'] * (1 + tolerance['memory']) + MEMORY_SLACK_KB:
+            failures.append((name, 'peak_kb', budget['peak_kb'], result['peak_kb']))
+        if result['queries'] > budget['queries']:
+            failures.append((name, 'queries', budget['queries'], result['queries']))
+    return failures
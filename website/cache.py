@@ -0,0 +1,125 @@
+"""
+Cached access to the SiteSettings singleton.
+
+Every worker keeps the row in memory together with the generation it was
+loaded under. The generation counter lives in the shared Django cache and is
+bumped from the SiteSettings post_save/post_delete signals, so each worker
+notices an edit on its next lookup and reloads the row once. Counters start
+from the clock, so one that was evicted never comes back with a value that
+older entries were stored under.
+
+The same generations version the cached template fragments: the navbar and
+footer in base.html vary on the SiteSettings generation, the trusted
+companies marquee on its own generation.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import SiteSettings
+
+SITE_SETTINGS_GENERATION_KEY = 'website:site_settings:generation'
+SITE_SETTINGS_VALUE_KEY = 'website:site_settings:%s'
+SITE_SETTINGS_TIMEOUT = 60 * 60 * 24
+TRUSTED_COMPANIES_GENERATION_KEY = 'website:trusted_companies:generation'
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+_MISSING = object()
+_lock = threading.Lock()
+_local = {'generation': None, 'value': None}
+
+
+def get_generation(key):
+    """Return the shared generation counter stored under ``key``."""
+    generation = cache.get(key)
+    if generation is None:
+        initial = time.time_ns()
+        cache.add(key, initial, timeout=None)
+        generation = cache.get(key, initial)
+    return generation
+
+
+async def aget_generation(key):
+    generation = await cache.aget(key)
+    if generation is None:
+        initial = time.time_ns()
+        await cache.aadd(key, initial, timeout=None)
+        generation = await cache.aget(key, initial)
+    return generation
+
+
+def bump_generation(key):
+    """Advance the counter under ``key`` so every worker drops derived state."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = time.time_ns()
+        cache.set(key, generation, timeout=None)
+        return generation
+
+
+def site_settings_generation():
+    return get_generation(SITE_SETTINGS_GENERATION_KEY)
+
+
+def get_site_settings():
+    """Return the SiteSettings row (or None) without a query on the hot path."""
+    generation = site_settings_generation()
+    if _local['generation'] == generation:
+        return _local['value']
+
+    with _lock:
+        if _local['generation'] == generation:
+            return _local['value']
+
+        key = SITE_SETTINGS_VALUE_KEY % generation
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = SiteSettings.objects.first()
+            cache.set(key, value, SITE_SETTINGS_TIMEOUT)
+
+        _local['generation'] = generation
+        _local['value'] = value
+        return value
+
+
+async def aget_site_settings():
+    """Async counterpart of get_site_settings() for use in async views."""
+    generation = await aget_generation(SITE_SETTINGS_GENERATION_KEY)
+    if _local['generation'] == generation:
+        return _local['value']
+
+    key = SITE_SETTINGS_VALUE_KEY % generation
+    value = await cache.aget(key, _MISSING)
+    if value is _MISSING:
+        value = await SiteSettings.objects.afirst()
+        await cache.aset(key, value, SITE_SETTINGS_TIMEOUT)
+
+    with _lock:
+        _local['generation'] = generation
+        _local['value'] = value
+    return value
+
+
+def invalidate_site_settings():
+    bump_generation(SITE_SETTINGS_GENERATION_KEY)
+
+    with _lock:
+        _local['generation'] = None
+        _local['value'] = None
+
+
+def fragment_generations():
+    """Template context for ``{% cache %}`` tags that vary on content generations."""
+    keys = {
+        'site_settings_generation': SITE_SETTINGS_GENERATION_KEY,
+        'trusted_companies_generation': TRUSTED_COMPANIES_GENERATION_KEY,
+    }
+    found = cache.get_many(list(keys.values()))
+    return {name: found[key] if key in found else get_generation(key) for name, key in keys.items()}
+
+
+def invalidate_trusted_companies():
+    bump_generation(TRUSTED_COMPANIES_GENERATION_KEY)
@@ -0,0 +1,162 @@
+"""
+Conditional GET (ETag / Last-Modified) for the public pages.
+
+Each page declares the querysets it renders. Their latest ``updated_at``,
+together with SiteSettings, is read in a single aggregate query and
+combined with the page cache versions, which the model signals bump on
+every save and delete (a deleted row cannot raise a MAX). The validators are
+cached under those versions, so a repeat visit costs no query at all and an
+unchanged page is answered with 304 before anything is rendered.
+"""
+import datetime
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.core.cache import cache
+from django.db.models import DateTimeField, Func, Max, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import HeroSection, Service, SiteSettings, Testimonial, Training, TrustedCompany
+from .page_cache import PAGE_CACHE_TIMEOUT, apage_versions, bypasses_cache, page_versions
+
+VALIDATORS_KEY = 'website:page:validators:%s'
+EPOCH = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def home_sources(request):
+    return [
+        HeroSection.objects.filter(is_active=True),
+        Service.objects.filter(is_featured=True)[:6],
+        Training.objects.filter(is_featured=True)[:6],
+        TrustedCompany.objects.all(),
+        Testimonial.objects.filter(is_featured=True)[:6],
+    ]
+
+
+def services_sources(request):
+    return [Service.objects.all()]
+
+
+def service_detail_sources(request, pk):
+    return [Service.objects.filter(pk=pk), Service.objects.filter(neighbor_of__source_id=pk)]
+
+
+def trainings_sources(request):
+    return [Training.objects.all()]
+
+
+def training_detail_sources(request, pk):
+    return [Training.objects.filter(pk=pk), Training.objects.filter(neighbor_of__source_id=pk)]
+
+
+def site_sources(request):
+    """Pages that only render SiteSettings, e.g. the legal pages."""
+    return []
+
+
+def _latest(queryset):
+    if queryset.query.is_sliced:
+        queryset = queryset.model.objects.filter(pk__in=queryset.values('pk'))
+    # A bare MAX() rather than ORDER BY ... LIMIT 1: no sort, and an index on
+    # updated_at turns it into a single lookup.
+    latest = queryset.order_by().annotate(latest=Func('updated_at', function='MAX')).values('latest')
+    return Coalesce(Subquery(latest, output_field=DateTimeField()), Value(EPOCH))
+
+
+def _latest_update_query(querysets):
+    # SiteSettings anchors the aggregate: MAX over an empty table still
+    # yields one row, so the subqueries are evaluated either way.
+    expression = Coalesce(Max('updated_at'), Value(EPOCH))
+    if querysets:
+        expression = Greatest(expression, *[_latest(qs) for qs in querysets])
+    return SiteSettings.objects.order_by(), {'last_modified': expression}
+
+
+def latest_update(querysets):
+    """Latest ``updated_at`` across ``querysets`` and SiteSettings, in one query."""
+    queryset, aggregate = _latest_update_query(querysets)
+    return queryset.aggregate(**aggregate)['last_modified']
+
+
+async def alatest_update(querysets):
+    queryset, aggregate = _latest_update_query(querysets)
+    return (await queryset.aaggregate(**aggregate))['last_modified']
+
+
+def _validators(last_modified, versions):
+    # The versions are clock-based, so the newest one is when the page was
+    # last purged; that also covers deletes, which leave MAX(updated_at) alone.
+    purged = datetime.datetime.fromtimestamp(max(versions) / 1e9, datetime.timezone.utc)
+    last_modified = max(last_modified, purged)
+    digest = hashlib.md5(repr((last_modified.isoformat(), versions)).encode()).hexdigest()
+    # Weak: the bytes differ per visitor because of the CSRF token.
+    return {'etag': f'W/"{digest}"', 'last_modified': int(last_modified.timestamp())}
+
+
+def _key(request, versions):
+    return VALIDATORS_KEY % hashlib.md5(repr((request.path, versions)).encode()).hexdigest()
+
+
+def _finish(request, response, validators):
+    if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', validators['etag'])
+        response.headers.setdefault('Last-Modified', http_date(validators['last_modified']))
+        # Let browsers keep the page but revalidate it on every visit.
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_page(sources):
+    """Answer conditional GET/HEAD requests for the wrapped page view.
+
+    ``sources(request, *args, **kwargs)`` returns the querysets the page
+    renders. Apply it outside ``cache_public_page`` so a 304 skips the
+    page cache lookup as well.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if bypasses_cache(request):
+                    return await view(request, *args, **kwargs)
+
+                versions = await apage_versions(request, view)
+                key = _key(request, versions)
+                validators = await cache.aget(key)
+                if validators is None:
+                    last_modified = await alatest_update(sources(request, *args, **kwargs))
+                    validators = _validators(last_modified, versions)
+                    await cache.aset(key, validators, PAGE_CACHE_TIMEOUT)
+
+                response = get_conditional_response(request, **validators)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, validators)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if bypasses_cache(request):
+                return view(request, *args, **kwargs)
+
+            versions = page_versions(request, view)
+            key = _key(request, versions)
+            validators = cache.get(key)
+            if validators is None:
+                last_modified = latest_update(sources(request, *args, **kwargs))
+                validators = _validators(last_modified, versions)
+                cache.set(key, validators, PAGE_CACHE_TIMEOUT)
+
+            response = get_conditional_response(request, **validators)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish(request, response, validators)
+
+        return wrapper
+
+    return decorator
@@ -1,8 +1,14 @@
-from .models import SiteSettings
+from .cache import FRAGMENT_CACHE_TIMEOUT, fragment_generations, get_site_settings
 
 def site_settings(request):
+    # Versions and timeout for the {% cache %} fragments of the shared chrome.
+    context = {'fragment_cache_timeout': FRAGMENT_CACHE_TIMEOUT, **fragment_generations()}
+    # Async views load the row ahead of rendering (see async_views), since
+    # the ORM cannot be used from the event loop.
+    if hasattr(request, 'site_settings'):
+        return {'site_settings': request.site_settings, **context}
     try:
-        settings = SiteSettings.objects.first()
-        return {'site_settings': settings}
-    except:
-        return {'site_settings': None}
+        settings = get_site_settings()
+        return {'site_settings': settings, **context}
+    except Exception:
+        return {'site_settings': None, **context}
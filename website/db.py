@@ -0,0 +1,17 @@
+"""
+Per-connection database tuning.
+
+SQLite keeps most settings per connection, so the ``SQLITE_PRAGMAS`` setting
+is applied from the ``connection_created`` signal. With persistent
+connections (CONN_MAX_AGE) that happens once per worker thread rather than
+per request.
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,210 @@
+"""
+Brochure (PDF) downloads for services and trainings.
+
+Files are answered with strong ETag / Last-Modified validators taken from
+the file's stat, so revalidation is a 304 without reading it, and honour a
+single ``Range`` (guarded by ``If-Range``) so interrupted downloads resume.
+The body is a FileResponse over the open file: WSGI servers with a
+``wsgi.file_wrapper`` (gunicorn, uWSGI) send it with sendfile() instead of
+copying it through Python. With ``DOWNLOAD_OFFLOAD`` set, Django only
+checks the request and hands the transfer to the front proxy through
+``X-Accel-Redirect`` (nginx) or ``X-Sendfile`` (Apache, lighttpd), which
+frees the worker at once.
+
+Download counts are summed in process memory and written every
+``DOWNLOAD_COUNT_FLUSH_INTERVAL`` seconds from the background worker, one
+UPDATE per model and count, so a download never waits on a database write.
+Counts still pending when a process is killed are lost.
+"""
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import F
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .images import run_in_background
+
+# '' (serve from Django), 'x-accel-redirect' or 'x-sendfile'.
+DOWNLOAD_OFFLOAD = getattr(settings, 'DOWNLOAD_OFFLOAD', '')
+# Internal nginx location that aliases MEDIA_ROOT, for X-Accel-Redirect.
+DOWNLOAD_ACCEL_PREFIX = getattr(settings, 'DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+DOWNLOAD_COUNT_FLUSH_INTERVAL = getattr(settings, 'DOWNLOAD_COUNT_FLUSH_INTERVAL', 30)
+DOWNLOAD_MAX_AGE = getattr(settings, 'DOWNLOAD_MAX_AGE', 60 * 60)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Inclusive ``(start, end)`` of a single-range ``Range`` header, or None.
+
+    None means the header is absent or not understood (including multiple
+    ranges), in which case the whole file is sent. Raises RangeNotSatisfiable
+    for a well-formed range outside the file.
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+class FileRange:
+    """Bounded view of an open file from its current position.
+
+    Exposes fileno() so a WSGI file wrapper can still sendfile() it: those
+    send ``Content-Length`` bytes from the current offset.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _offloaded(field, filename):
+    response = HttpResponse(content_type='application/pdf')
+    if DOWNLOAD_OFFLOAD == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + quote(field.name)
+    else:
+        response['X-Sendfile'] = field.path
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def serve_file(request, field, filename=None):
+    """Response delivering the stored file of ``field`` as an attachment."""
+    if not field:
+        raise Http404('No file')
+    filename = filename or os.path.basename(field.name)
+    try:
+        path = field.path
+    except NotImplementedError:
+        # Remote storage: let it serve the file itself.
+        return HttpResponseRedirect(field.url)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404('File not found')
+
+    size, last_modified = stat.st_size, int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _offloaded(field, filename) if DOWNLOAD_OFFLOAD else _file_response(
+            request, path, filename, size, etag, last_modified)
+    if response.status_code in (200, 206, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=DOWNLOAD_MAX_AGE)
+    return response
+
+
+def _file_response(request, path, filename, size, etag, last_modified):
+    byte_range = None
+    if request.method == 'GET' and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, as_attachment=True, filename=filename)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start + 1), as_attachment=True, filename=filename,
+                                status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def counts_download(request, response):
+    """Count a download once: not for 304s, HEAD or resumed ranges."""
+    if request.method != 'GET' or response.status_code not in (200, 206):
+        return False
+    return response.status_code == 200 or response['Content-Range'].startswith('bytes 0-')
+
+
+def record_download(model, pk):
+    with _lock:
+        _pending[model, pk] += 1
+    if time.monotonic() - _last_flush >= DOWNLOAD_COUNT_FLUSH_INTERVAL:
+        run_in_background(flush_download_counts)
+
+
+def flush_download_counts():
+    """Add the pending counts to ``download_count``; returns the downloads written."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    # Rows with the same count share one UPDATE.
+    groups = defaultdict(list)
+    for (model, pk), count in pending.items():
+        groups[model, count].append(pk)
+    for (model, count), pks in groups.items():
+        model.objects.filter(pk__in=pks).update(download_count=F('download_count') + count)
+    return sum(pending.values())
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush_download_counts()
+    except Exception:
+        logger.exception('Could not save pending download counts')
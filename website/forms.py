@@ -28,3 +28,11 @@ class ContactForm(forms.ModelForm):
                 'required': True
             }),
         }
+
+
+class ImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV or JSON Lines, as written by the export actions.')
+    format = forms.ChoiceField(choices=[('', 'From the file extension'), ('csv', 'CSV'), ('jsonl', 'JSON Lines')],
+                               required=False)
+    media = forms.FileField(required=False, label='Media archive',
+                            help_text='Optional zip of media files, added to storage before the rows.')
@@ -0,0 +1,241 @@
+"""
+Responsive renditions of uploaded images.
+
+Each original is resized to the widths in ``IMAGE_RENDITION_WIDTHS`` (never
+upscaled) and encoded as AVIF (when Pillow supports it), WebP and a JPEG or
+PNG fallback. Files are stored next to the original under ``renditions/``
+with the first characters of the source's SHA-256 in their name, so a
+replaced upload never reuses a stale URL. Saves generate renditions on a
+background thread after commit. The ``build_image_renditions`` command
+backfills existing media.
+"""
+import hashlib
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+from PIL import Image, ImageOps, features
+
+from .models import HeroSection, ImageRendition, Service, Testimonial, Training, TrustedCompany
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = {
+    Service: ('image',),
+    Training: ('image',),
+    TrustedCompany: ('logo',),
+    Testimonial: ('image',),
+    HeroSection: ('background_image',),
+}
+RENDITION_WIDTHS = getattr(settings, 'IMAGE_RENDITION_WIDTHS', (160, 320, 480, 640, 960, 1280, 1920))
+QUALITY = {'avif': 55, 'webp': 78, 'jpeg': 82}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+# Formats offered as <source> elements, best first; the fallback goes on <img>.
+SOURCE_FORMATS = ('avif', 'webp')
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+
+CACHE_KEY = 'website:renditions:%s'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='renditions')
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def output_formats(image):
+    formats = ['avif'] if features.check('avif') else []
+    formats.append('webp')
+    formats.append('png' if _has_alpha(image) else 'jpeg')
+    return formats
+
+
+def rendition_name(source, digest, width, fmt):
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'renditions', f'{stem}.{digest}.{width}w.{EXTENSIONS[fmt]}')
+
+
+def _encode(image, fmt):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif fmt != 'jpeg' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+
+    buffer = BytesIO()
+    options = {'optimize': True} if fmt in ('jpeg', 'png') else {}
+    if fmt in QUALITY:
+        options['quality'] = QUALITY[fmt]
+    if fmt == 'jpeg':
+        options['progressive'] = True
+    image.save(buffer, format=fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def generate_renditions(source, storage=default_storage, force=False):
+    """Create the renditions of the stored image ``source``.
+
+    Returns the number of files written; 0 when they are already current.
+    """
+    with storage.open(source, 'rb') as handle:
+        data = handle.read()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+
+    existing = list(ImageRendition.objects.filter(source=source))
+    if existing and not force and all(r.source_hash == digest for r in existing):
+        return 0
+
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    largest = min(image.width, max(RENDITION_WIDTHS))
+    widths = sorted({width for width in RENDITION_WIDTHS if width < image.width} | {largest})
+
+    created = []
+    for fmt in output_formats(image):
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+            name = rendition_name(source, digest, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(_encode(resized, fmt)))
+            created.append(ImageRendition(
+                source=source, source_hash=digest, format=fmt, width=width, height=height, file=name,
+            ))
+
+    for rendition in existing:
+        if rendition.file not in {r.file for r in created} and storage.exists(rendition.file):
+            storage.delete(rendition.file)
+    ImageRendition.objects.filter(source=source).delete()
+    ImageRendition.objects.bulk_create(created)
+    cache.delete(CACHE_KEY % hashlib.md5(source.encode()).hexdigest())
+    return len(created)
+
+
+def _generate_safely(source, storage=default_storage, force=False):
+    try:
+        return generate_renditions(source, storage, force=force)
+    except (OSError, ValueError):
+        logger.exception('Could not build renditions for %s', source)
+        return 0
+
+
+def generate_for_instance(instance, force=False):
+    written = 0
+    for field in IMAGE_FIELDS.get(type(instance), ()):
+        image = getattr(instance, field)
+        if image:
+            written += _generate_safely(image.name, image.storage, force=force)
+    return written
+
+
+def generate_for_sources(sources, force=False):
+    """Build renditions for media files referenced by name, e.g. CKEditor uploads."""
+    return sum(_generate_safely(source, force=force) for source in sources)
+
+
+def run_in_background(func, *args):
+    """Run ``func`` on the renditions worker thread, outside the request."""
+
+    def task():
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Background image task failed')
+        finally:
+            close_old_connections()
+
+    return _executor.submit(task)
+
+
+def _rendition_info(renditions):
+    if not renditions:
+        return {}
+    largest = max(renditions, key=lambda r: r.width)
+    info = {'width': largest.width, 'height': largest.height, 'formats': {}}
+    for rendition in renditions:
+        info['formats'].setdefault(rendition.format, []).append(
+            (rendition.width, default_storage.url(rendition.file))
+        )
+    return info
+
+
+def renditions_for(source):
+    """Return ``{'width', 'height', 'formats': {fmt: [(width, url), ...]}}`` or None."""
+    key = CACHE_KEY % hashlib.md5(source.encode()).hexdigest()
+    info = cache.get(key)
+    if info is None:
+        info = _rendition_info(list(ImageRendition.objects.filter(source=source).order_by('format', 'width')))
+        cache.set(key, info, CACHE_TIMEOUT)
+    return info or None
+
+
+def prefetch_renditions(*collections):
+    """Cache the renditions of every image on the instances in ``collections``.
+
+    One query covers all the sources not cached yet, so a page of cards does
+    not look its images up one by one while rendering. Querysets passed in
+    are evaluated, and the template then reuses their results.
+    """
+    sources = {
+        getattr(obj, name).name
+        for objects in collections for obj in objects if obj is not None
+        for name in IMAGE_FIELDS.get(type(obj), ()) if getattr(obj, name)
+    }
+    keys = {CACHE_KEY % hashlib.md5(source.encode()).hexdigest(): source for source in sources}
+    cached = cache.get_many(list(keys))
+    missing = {source: key for key, source in keys.items() if key not in cached}
+    if not missing:
+        return
+    found = {}
+    for rendition in ImageRendition.objects.filter(source__in=list(missing)).order_by('source', 'format', 'width'):
+        found.setdefault(rendition.source, []).append(rendition)
+    cache.set_many({key: _rendition_info(found.get(source)) for source, key in missing.items()}, CACHE_TIMEOUT)
+
+
+def thumbnail_url(image, min_width):
+    """URL of the smallest WebP rendition at least ``min_width`` wide, else the original."""
+    if not image:
+        return None
+    info = renditions_for(image.name)
+    if info:
+        for width, url in info['formats'].get('webp', []):
+            if width >= min_width:
+                return url
+    return image.url
+
+
+def _srcset(candidates):
+    return ', '.join(f'{url} {width}w' for width, url in candidates)
+
+
+def picture_html(url, source, sizes='100vw', **attrs):
+    """HTML for the image at ``url`` using the renditions of ``source``.
+
+    Returns a plain <img> when no renditions exist yet.
+    """
+    info = renditions_for(source) if source else None
+    if not info:
+        return format_html('<img src="{}"{}>', url, flatatt(attrs))
+
+    formats = info['formats']
+    fallback = formats.get('jpeg') or formats.get('png') or []
+    if fallback:
+        attrs['srcset'] = _srcset(fallback)
+        attrs['sizes'] = sizes
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((MIME_TYPES[fmt], _srcset(formats[fmt]), sizes) for fmt in SOURCE_FORMATS if fmt in formats),
+    )
+    # display: contents keeps <picture> out of layout so existing img CSS still applies.
+    return format_html('<picture style="display: contents">{}<img src="{}"{}></picture>',
+                       sources, url, flatatt(attrs))
@@ -0,0 +1,319 @@
+"""
+HTTP load test against a running server.
+
+Worker threads, each with its own keep-alive connection and seeded random
+generator, pick scenarios by ``SCENARIO_WEIGHTS`` and time every request.
+The scenarios cover each route in website/urls.py plus two flows:
+
+* ``live_search`` types a word one keystroke at a time, as base.js does,
+  firing a request per prefix of two or more characters;
+* ``contact_post`` submits the AJAX contact form with the tokens from
+  ``/contact/token/``. The rate limits key on the client IP, so each post
+  sends a random ``X-Forwarded-For``; start the server with
+  ``DJANGO_TRUST_X_FORWARDED_FOR=1`` or most posts are answered 429.
+  Posts sent within CONTACT_MIN_FILL_SECONDS of fetching the tokens are
+  screened out as automated, which the default warm-up covers. The posts
+  use ``SEED_EMAIL_DOMAIN`` addresses: they queue no notification email and
+  ``seed_scale_data --clear`` removes them.
+
+Per request the server's ``Server-Timing`` header (see website.metrics)
+gives the number of SQL queries. Results are summarised per scenario
+(requests/s, latency percentiles, queries per request, status codes) into
+a JSON document; ``compare`` lists what got worse between two of them.
+"""
+import http.client
+import itertools
+import json
+import math
+import platform
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+import django
+from django.urls import reverse
+
+from . import urls as website_urls
+from .models import Contact, Service, Training, TrustedCompany
+from .pagination import LISTING_PAGE_SIZE
+from .seed import SEED_EMAIL_DOMAIN
+
+# Relative share of each scenario; every URL name in website/urls.py has one.
+SCENARIO_WEIGHTS = {
+    'home': 20,
+    'services': 8,
+    'service_detail': 14,
+    'trainings': 8,
+    'training_detail': 14,
+    'service_brochure': 1,
+    'training_brochure': 1,
+    'live_search': 16,
+    'contact': 2,
+    'contact_new': 2,
+    'contact_token': 2,
+    'contact_post': 2,
+    'terms': 1,
+    'privacy': 1,
+    'refund': 1,
+    # Only run when a metrics token is given.
+    'metrics': 1,
+}
+PERCENTILES = (50, 95, 99)
+SERVER_TIMING_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+SEARCH_WORDS = 200
+
+# compare(): metric -> True when a higher value is better.
+COMPARED_METRICS = {'rps': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False, 'queries': False}
+
+
+class Targets:
+    """What the scenarios can ask for, read once from the database."""
+
+    def __init__(self):
+        self.service_pks = list(Service.objects.values_list('pk', flat=True))
+        self.training_pks = list(Training.objects.values_list('pk', flat=True))
+        self.pages = {
+            'services': max(1, math.ceil(len(self.service_pks) / LISTING_PAGE_SIZE)),
+            'trainings': max(1, math.ceil(len(self.training_pks) / LISTING_PAGE_SIZE)),
+        }
+        words = Counter()
+        for name in itertools.chain(Service.objects.values_list('name', flat=True)[:2000],
+                                    Training.objects.values_list('name', flat=True)[:2000]):
+            words.update(word.lower() for word in re.findall(r'[A-Za-z]{3,}', name))
+        self.search_words = [word for word, _ in words.most_common(SEARCH_WORDS)] or ['service']
+
+    def sizes(self):
+        return {
+            'services': len(self.service_pks),
+            'trainings': len(self.training_pks),
+            'companies': TrustedCompany.objects.count(),
+            'contacts': Contact.objects.count(),
+        }
+
+
+def route_names():
+    return {pattern.name for pattern in website_urls.urlpatterns if pattern.name}
+
+
+def _listing(rng, targets, name):
+    # Mostly the first pages, as visitors do, with a tail of deep pages.
+    pages = targets.pages[name]
+    number = 1 if rng.random() < 0.6 else rng.randint(1, pages)
+    return reverse(name) + (f'?page={number}' if number > 1 else '')
+
+
+def scenario_requests(name, rng, targets, worker):
+    """``(method, path, body)`` requests making up one run of scenario ``name``."""
+    if name == 'services' or name == 'trainings':
+        return [('GET', _listing(rng, targets, name), None)]
+    if name in ('service_detail', 'training_detail', 'service_brochure', 'training_brochure'):
+        pks = targets.service_pks if name.startswith('service') else targets.training_pks
+        if not pks:
+            return []
+        return [('GET', reverse(name, kwargs={'pk': rng.choice(pks)}), None)]
+    if name == 'live_search':
+        word = rng.choice(targets.search_words)
+        return [('GET', reverse('live_search') + '?' + urlencode({'q': word[:n]}), None)
+                for n in range(2, len(word) + 1)]
+    if name == 'contact_post':
+        serial = next(worker.serial)
+        return [('POST', reverse('contact_new'), {
+            'full_name': 'Load Test',
+            'email': f'loadtest.{worker.index}.{serial}@{SEED_EMAIL_DOMAIN}',
+            'phone_number': '+91 9000000000',
+            'message': f'Load test message {worker.index}-{serial}',
+        })]
+    return [('GET', reverse(name), None)]
+
+
+class Worker:
+    def __init__(self, index, base_url, seed, metrics_token=''):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=30)
+        self.index = index
+        self.rng = random.Random(f'{seed}:{index}')
+        self.serial = itertools.count()
+        self.cookies = {}
+        self.tokens = None
+        self.metrics_token = metrics_token
+
+    def close(self):
+        self.connection.close()
+
+    def send(self, method, path, body=None, headers=None):
+        """Send one request; returns the response and its body."""
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        for header, value in response.getheaders():
+            if header.lower() == 'set-cookie':
+                name, _, rest = value.partition('=')
+                self.cookies[name.strip()] = rest.split(';')[0]
+        return response, content
+
+    def request(self, method, path, body=None):
+        """Timed request; returns ``(status, seconds, queries or None, bytes)``."""
+        headers = {}
+        if path.startswith('/metrics') and self.metrics_token:
+            headers['Authorization'] = f'Bearer {self.metrics_token}'
+        if body is not None:
+            fields = dict(body, csrfmiddlewaretoken=self.tokens['csrf_token'], form_token=self.tokens['form_token'])
+            body = urlencode(fields)
+            address = '.'.join(str(self.rng.randint(1, 254)) for _ in range(3))
+            headers.update({
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-Forwarded-For': f'10.{address}',
+            })
+        started = time.perf_counter()
+        try:
+            response, content = self.send(method, path, body, headers)
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return 0, time.perf_counter() - started, None, 0
+        elapsed = time.perf_counter() - started
+        match = SERVER_TIMING_QUERIES_RE.search(response.getheader('Server-Timing', ''))
+        return response.status, elapsed, int(match.group(1)) if match else None, len(content)
+
+    def fetch_tokens(self):
+        """CSRF cookie and form tokens for the contact posts, as base.js gets them."""
+        _, content = self.send('GET', reverse('contact_token'))
+        self.tokens = json.loads(content)
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, name, sample):
+        with self.lock:
+            self.samples[name].append(sample)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of the sorted list ``values``."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(seconds for _, seconds, _, _ in samples)
+    queries = [q for _, _, q, _ in samples if q is not None]
+    statuses = Counter(status for status, _, _, _ in samples)
+    summary = {
+        'requests': len(samples),
+        'rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+        # Status 0 is a connection error.
+        'errors': sum(n for status, n in statuses.items() if status == 0 or status >= 500),
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'queries': round(sum(queries) / len(queries), 2) if queries else None,
+        'bytes': round(sum(size for _, _, _, size in samples) / len(samples)) if samples else 0,
+    }
+    for p in PERCENTILES:
+        value = percentile(latencies, p)
+        summary[f'p{p}_ms'] = round(value * 1000, 2) if value is not None else None
+    return summary
+
+
+def run(base_url, concurrency=8, duration=30, requests=None, warmup=3, seed=0, metrics_token='', log=None):
+    """Drive ``base_url`` and return the result document.
+
+    Stops after ``duration`` seconds or, when given, after ``requests``
+    scenario runs. The first ``warmup`` seconds are not recorded.
+    """
+    targets = Targets()
+    # Fail fast, with the connection error, when nothing is listening.
+    probe = Worker(-1, base_url, seed)
+    try:
+        probe.fetch_tokens()
+    finally:
+        probe.close()
+    weights = {name: weight for name, weight in SCENARIO_WEIGHTS.items()
+               if name != 'metrics' or metrics_token}
+    names, cumulative = list(weights), list(itertools.accumulate(weights.values()))
+    recorder = Recorder()
+    budget = itertools.count() if requests is not None else None
+    started = time.monotonic()
+    record_from = started + warmup
+    deadline = record_from + duration
+    done = threading.Event()
+
+    def work(index):
+        worker = Worker(index, base_url, seed, metrics_token)
+        try:
+            worker.fetch_tokens()
+            while not done.is_set():
+                if budget is not None and next(budget) >= requests:
+                    done.set()
+                    break
+                name = worker.rng.choices(names, cum_weights=cumulative)[0]
+                for method, path, body in scenario_requests(name, worker.rng, targets, worker):
+                    sample = worker.request(method, path, body)
+                    if budget is not None or time.monotonic() >= record_from:
+                        recorder.add(name, sample)
+                if budget is None and time.monotonic() >= deadline:
+                    done.set()
+        finally:
+            worker.close()
+
+    threads = [threading.Thread(target=work, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    if log:
+        log(f'{concurrency} worker(s) running against {base_url}')
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - (started if budget is not None else record_from)
+
+    all_samples = list(itertools.chain.from_iterable(recorder.samples.values()))
+    return {
+        'meta': {
+            'base_url': base_url,
+            'concurrency': concurrency,
+            'duration': round(elapsed, 2),
+            'seed': seed,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'data': targets.sizes(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'total': summarize(all_samples, elapsed),
+        'scenarios': {name: summarize(samples, elapsed) for name, samples in sorted(recorder.samples.items())},
+    }
+
+
+def compare(baseline, current, tolerance=0.1):
+    """Rows ``(scenario, metric, before, after, change, regressed)`` for two results.
+
+    Latency and throughput regress when they worsen by more than
+    ``tolerance`` (a fraction); queries per request regress on any increase.
+    """
+    rows = []
+    sections = [('total', baseline.get('total', {}), current.get('total', {}))]
+    sections += [(name, baseline['scenarios'].get(name, {}), summary)
+                 for name, summary in sorted(current.get('scenarios', {}).items())]
+    for name, before, after in sections:
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            if metric == 'queries':
+                regressed = new > old
+            elif higher_is_better:
+                regressed = change < -tolerance
+            else:
+                regressed = change > tolerance
+            rows.append((name, metric, old, new, change, regressed))
+    return rows
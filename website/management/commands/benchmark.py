@@ -0,0 +1,89 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from website.benchmarks import BASELINE_PATH, check, create_fixture, read_baseline, run_benchmarks, write_baseline
+
+# The benchmarks measure the application, not the deployment's cache server
+# or the collectstatic manifest.
+BENCHMARK_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmarks'}},
+    'STORAGES': {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+}
+RETRIES = 2
+
+
+class Command(BaseCommand):
+    help = 'Run the in-process micro-benchmarks and check them against the checked-in budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only run benchmarks whose name contains one of these')
+        parser.add_argument('--rounds', type=int, default=20, help='Timed calls per benchmark')
+        parser.add_argument('--baseline', default=str(BASELINE_PATH))
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Record this run as the new budgets instead of checking it')
+        parser.add_argument('--time-tolerance', type=float, help='Override the allowed relative slowdown')
+        parser.add_argument('--memory-tolerance', type=float, help='Override the allowed relative allocation growth')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        baseline = read_baseline(options['baseline'])
+
+        def progress(name, result):
+            budget = baseline['benchmarks'].get(name, {})
+            self.stdout.write(
+                f'{name:<40} {result["time_ms"]:>9.3f} ms {result["peak_kb"]:>9.1f} KiB {result["queries"]:>3} q'
+                + (f'   (budget {budget["time_ms"]:.3f} ms)' if budget else '   (new)')
+            )
+
+        tolerance = {}
+        if options['time_tolerance'] is not None:
+            tolerance['time'] = options['time_tolerance']
+        if options['memory_tolerance'] is not None:
+            tolerance['memory'] = options['memory_tolerance']
+
+        setup_test_environment()
+        try:
+            with override_settings(**BENCHMARK_SETTINGS):
+                databases = setup_databases(verbosity=0, interactive=False)
+                try:
+                    create_fixture()
+                    results = run_benchmarks(options['names'], rounds=options['rounds'], progress=progress)
+                    failures = [] if options['update_baseline'] else check(results, baseline, tolerance)
+                    # Timings on a shared machine are noisy: a real slowdown
+                    # shows up again, a one-off hiccup does not.
+                    for _ in range(RETRIES):
+                        if not failures:
+                            break
+                        self.stdout.write(f'Measuring {len(failures)} over-budget result(s) again')
+                        names = {name for name, *_ in failures}
+                        rerun = run_benchmarks(names, rounds=options['rounds'])
+                        results.update({name: rerun[name] for name in names})
+                        failures = check(results, baseline, tolerance)
+                finally:
+                    teardown_databases(databases, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+        if options['update_baseline']:
+            if options['names']:
+                results = {**baseline['benchmarks'], **results}
+            write_baseline(results, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f'Budgets written to {options["baseline"]}'))
+            return
+
+        for name, metric, budget, measured in failures:
+            self.stderr.write(self.style.ERROR(f'{name}: {metric} {measured} over budget {budget}'))
+        if failures:
+            raise CommandError(f'{len(failures)} benchmark budget(s) exceeded')
+        self.stdout.write(self.style.SUCCESS(f'{len(results)} benchmark(s) within budget'))
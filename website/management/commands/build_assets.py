@@ -0,0 +1,139 @@
+import posixpath
+import re
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from website.assets import (
+    FONT_AWESOME_WEBFONTS_DIR, FONT_AWESOME_WEBFONTS_URL, GOOGLE_FONTS_DIR, VENDOR_ASSETS,
+)
+
+# Google Fonts only serves woff2 to browsers it recognises.
+BROWSER_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+SOURCE_MAP_RE = re.compile(r'\n?(?:/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S*)')
+CSS_URL_RE = re.compile(r'url\((["\']?)([^)"\']+)\1\)')
+ICON_RULE_RE = re.compile(r'((?:\.fa-[a-z0-9-]+:{1,2}before,?)+)\{content:"([^"]*)"\}')
+ESCAPE_RE = re.compile(r'\\([0-9a-fA-F]+)')
+ICON_CLASS_RE = re.compile(r'\bfa-[a-z0-9-]+')
+ICON_SOURCES = ('*.html', '*.js')
+
+
+def fetch(url):
+    request = Request(url, headers={'User-Agent': BROWSER_USER_AGENT})
+    with urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def used_icon_classes(roots):
+    classes = set()
+    for root in roots:
+        for pattern in ICON_SOURCES:
+            for path in Path(root).rglob(pattern):
+                if 'vendor' in path.parts:
+                    continue
+                classes.update(ICON_CLASS_RE.findall(path.read_text(errors='ignore')))
+    return classes
+
+
+def subset_icon_rules(css, used):
+    """Drop the ``.fa-*:before`` glyph rules for icons the site never uses.
+
+    Returns the trimmed CSS and the code points of the glyphs that were kept.
+    """
+    codepoints = set()
+
+    def keep_used(match):
+        selectors = [s for s in match.group(1).split(',') if s and s.split(':')[0][1:] in used]
+        if not selectors:
+            return ''
+        content = match.group(2)
+        codepoints.update(int(code, 16) for code in ESCAPE_RE.findall(content))
+        return '%s{content:"%s"}' % (','.join(selectors), content)
+
+    return ICON_RULE_RE.sub(keep_used, css), codepoints
+
+
+class Command(BaseCommand):
+    help = 'Vendor the CDN assets into static/vendor and run collectstatic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-subset', action='store_true',
+                            help='Keep every Font Awesome icon instead of only those used in templates')
+        parser.add_argument('--no-collectstatic', action='store_true',
+                            help='Only download the files, do not run collectstatic')
+
+    def handle(self, *args, **options):
+        static_dir = Path(settings.STATICFILES_DIRS[0])
+        try:
+            for name, (url, path) in VENDOR_ASSETS.items():
+                if name == 'google_fonts_css':
+                    data = self.google_fonts(url, static_dir)
+                elif name == 'fontawesome_css':
+                    data = self.font_awesome(url, static_dir, subset=not options['no_subset'])
+                else:
+                    data = SOURCE_MAP_RE.sub('', fetch(url).decode()).encode()
+                self.write(static_dir / path, data)
+        except OSError as exc:
+            raise CommandError(f'Could not download assets: {exc}')
+
+        if not options['no_collectstatic']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+        self.stdout.write(self.style.SUCCESS(
+            'Done. Set DJANGO_SELF_HOSTED_ASSETS=1 to serve the vendored copies.'
+        ))
+
+    def write(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        self.stdout.write(f'{path} ({len(data) // 1024} KiB)')
+
+    def google_fonts(self, url, static_dir):
+        css = fetch(url).decode()
+
+        def localise(match):
+            font_url = match.group(2)
+            filename = posixpath.basename(urlsplit(font_url).path)
+            self.write(static_dir / GOOGLE_FONTS_DIR / filename, fetch(font_url))
+            return f'url({filename})'
+
+        return CSS_URL_RE.sub(localise, css).encode()
+
+    def font_awesome(self, url, static_dir, subset=True):
+        css = SOURCE_MAP_RE.sub('', fetch(url).decode())
+        codepoints = None
+        if subset:
+            used = used_icon_classes([static_dir] + [d for t in settings.TEMPLATES for d in t['DIRS']])
+            css, codepoints = subset_icon_rules(css, used)
+            self.stdout.write(f'Font Awesome: kept {len(codepoints)} icon(s)')
+
+        fonts = {posixpath.basename(urlsplit(m.group(2)).path)
+                 for m in CSS_URL_RE.finditer(css) if 'webfonts/' in m.group(2)}
+        for filename in sorted(fonts):
+            data = fetch(urljoin(FONT_AWESOME_WEBFONTS_URL, filename))
+            if codepoints and filename.endswith('.woff2'):
+                data = self.subset_font(data, codepoints)
+            self.write(static_dir / FONT_AWESOME_WEBFONTS_DIR / filename, data)
+        return css.encode()
+
+    def subset_font(self, data, codepoints):
+        try:
+            from fontTools import subset
+        except ImportError:
+            return data
+        font = subset.load_font(BytesIO(data), subset.Options(flavor='woff2'))
+        subsetter = subset.Subsetter(subset.Options(flavor='woff2'))
+        subsetter.populate(unicodes=codepoints)
+        subsetter.subset(font)
+        out = BytesIO()
+        try:
+            subset.save_font(font, out, subset.Options(flavor='woff2'))
+        except ImportError:
+            # woff2 output needs brotli as well as fontTools.
+            return data
+        return out.getvalue()
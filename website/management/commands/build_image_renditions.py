@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from website.images import IMAGE_FIELDS, generate_for_instance, generate_for_sources
+from website.page_cache import purge_all
+from website.richtext import RICH_TEXT_FIELDS, prepare_rich_text, rich_text_columns
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive AVIF/WebP/JPEG renditions for uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild renditions even when they are up to date')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in IMAGE_FIELDS:
+            written = 0
+            for instance in model.objects.all().iterator():
+                written += generate_for_instance(instance, force=options['force'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {written} file(s) written')
+            total += written
+
+        # Images embedded in rich text, then the bodies rendered before those
+        # had renditions (by migration 0004, say): they get <picture> markup.
+        rerendered = 0
+        for model in RICH_TEXT_FIELDS:
+            for instance in model.objects.all().iterator():
+                columns = rich_text_columns(instance)
+                before = [getattr(instance, column) for column in columns]
+                embedded = prepare_rich_text(instance)
+                written = generate_for_sources(embedded, force=options['force'])
+                if written:
+                    total += written
+                    prepare_rich_text(instance)
+                if [getattr(instance, column) for column in columns] != before:
+                    model.objects.filter(pk=instance.pk).update(**{c: getattr(instance, c) for c in columns})
+                    rerendered += 1
+        if rerendered:
+            purge_all()
+        self.stdout.write(f'Rich text: {rerendered} row(s) re-rendered')
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} rendition file(s) written'))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website.related import RELATION_MODELS, rebuild_related
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related services and trainings shown on detail pages'
+
+    def handle(self, *args, **options):
+        for model in RELATION_MODELS:
+            started = time.perf_counter()
+            count = rebuild_related(model)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {count} item(s) in {elapsed:.2f}s')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.transfer import FORMATS, TRANSFER_MODELS, export_lines, write_media_archive
+
+
+class Command(BaseCommand):
+    help = 'Export services, trainings, testimonials, companies or contacts as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(TRANSFER_MODELS))
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write (default: standard output)')
+        parser.add_argument('--media', metavar='ZIP', help='Also bundle the referenced media files into this zip')
+
+    def handle(self, *args, **options):
+        model = TRANSFER_MODELS[options['model']]
+        queryset = model.objects.all()
+        rows = 0
+        try:
+            output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        except OSError as exc:
+            raise CommandError(exc)
+        try:
+            for line in export_lines(model, queryset, options['format']):
+                output.write(line)
+                rows += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        if options['format'] == 'csv':
+            rows -= 1
+
+        if options['media']:
+            files = write_media_archive(options['media'], model, queryset)
+            self.stderr.write(f'{files} media file(s) written to {options["media"]}')
+        self.stderr.write(self.style.SUCCESS(f'Exported {rows} {options["model"]}'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website.snapshot import SNAPSHOT_ROOT, default_host, export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Render the public pages into a static, precompressed directory tree'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(SNAPSHOT_ROOT),
+                            help=f'Snapshot directory (default: {SNAPSHOT_ROOT})')
+        parser.add_argument('--host', default=default_host(),
+                            help='Host name the pages are rendered for')
+        parser.add_argument('--full', action='store_true',
+                            help='Render every page, not only those changed since the last run')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = export_snapshot(options['output'], host=options['host'], full=options['full'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{stats["rendered"]} page(s) rendered, {stats["written"]} written, '
+            f'{stats["unchanged"]} unchanged, {stats["removed"]} removed in {elapsed:.2f}s'
+        )
+        if stats['failed']:
+            self.stderr.write(self.style.WARNING(f'{stats["failed"]} page(s) did not render and were skipped'))
+        self.stdout.write(self.style.SUCCESS(f'Snapshot written to {options["output"]}'))
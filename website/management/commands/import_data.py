@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.transfer import (
+    CHUNK_SIZE, FORMATS, TRANSFER_MODELS, ImportRowError, extract_media_archive, import_rows, read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = 'Create or update services, trainings, testimonials, companies or contacts from CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(TRANSFER_MODELS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Defaults to the file extension (.csv or .jsonl)')
+        parser.add_argument('--media', metavar='ZIP', help='Zip of media files to add to storage first')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Rows per bulk INSERT/UPDATE statement')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+        started = time.perf_counter()
+
+        if options['media']:
+            added = extract_media_archive(options['media'])
+            self.stdout.write(f'{added} media file(s) added')
+
+        model = TRANSFER_MODELS[options['model']]
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                result = import_rows(model, read_rows(stream, fmt), chunk_size=options['chunk_size'])
+        except (OSError, ImportRowError) as exc:
+            raise CommandError(f'Nothing imported. {exc}')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["created"]} created, {result["updated"]} updated in {elapsed:.2f}s'
+        ))
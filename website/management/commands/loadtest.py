@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.loadtest import compare, run
+
+
+class Command(BaseCommand):
+    help = 'Load test a running server and save the results as JSON, optionally against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to record, after the warm-up')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds to run before recording')
+        parser.add_argument('--requests', type=int, help='Stop after this many scenarios instead of a duration')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--metrics-token', default='', help='Bearer token, to include /metrics')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Earlier results to compare against')
+        parser.add_argument('--diff', nargs=2, metavar=('BASELINE', 'RESULTS'),
+                            help='Only compare two saved results, without running')
+        parser.add_argument('--tolerance', type=float, default=0.1,
+                            help='Allowed relative slowdown before a metric counts as a regression')
+
+    def handle(self, *args, **options):
+        if options['diff']:
+            baseline, results = (self.load(path) for path in options['diff'])
+        else:
+            baseline = self.load(options['baseline']) if options['baseline'] else None
+            try:
+                results = run(options['url'], concurrency=options['concurrency'], duration=options['duration'],
+                              requests=options['requests'], warmup=options['warmup'], seed=options['seed'],
+                              metrics_token=options['metrics_token'], log=self.stderr.write)
+            except OSError as exc:
+                raise CommandError(f'Could not reach {options["url"]}: {exc}')
+            self.report(results)
+            if options['output']:
+                with open(options['output'], 'w', encoding='utf-8') as f:
+                    json.dump(results, f, indent=2, sort_keys=True)
+                self.stdout.write(f'Results written to {options["output"]}')
+
+        if baseline is not None:
+            rows = compare(baseline, results, options['tolerance'])
+            regressions = [row for row in rows if row[-1]]
+            for name, metric, old, new, change, regressed in rows:
+                line = f'{name:<16} {metric:<7} {old:>10} -> {new:<10} {change:+.1%}'
+                self.stdout.write(self.style.ERROR(line) if regressed else line)
+            if regressions:
+                raise CommandError(f'{len(regressions)} metric(s) regressed beyond {options["tolerance"]:.0%}')
+            self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+
+    def report(self, results):
+        self.stdout.write(f'{"scenario":<16} {"req":>7} {"rps":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"queries":>8}')
+        rows = [('total', results['total'])] + list(results['scenarios'].items())
+        for name, s in rows:
+            self.stdout.write(
+                f'{name:<16} {s["requests"]:>7} {s["rps"]:>8} {s["p50_ms"] or "-":>8} {s["p95_ms"] or "-":>8} '
+                f'{s["p99_ms"] or "-":>8} {s["queries"] if s["queries"] is not None else "-":>8}'
+            )
+            other = {code: n for code, n in s['statuses'].items() if not code.startswith('2')}
+            if other:
+                self.stdout.write(f'{"":<16} statuses: {other}')
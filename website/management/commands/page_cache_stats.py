@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from website.page_cache import page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show page cache hit/miss/bypass counters per view'
+
+    def handle(self, *args, **options):
+        stats = page_cache_stats()
+        self.stdout.write(f"{'view':<18}{'hit':>10}{'miss':>10}{'bypass':>10}{'hit rate':>10}")
+        for group, counts in stats.items():
+            lookups = counts['hit'] + counts['miss']
+            rate = f"{counts['hit'] / lookups:.1%}" if lookups else '-'
+            self.stdout.write(f"{group:<18}{counts['hit']:>10}{counts['miss']:>10}{counts['bypass']:>10}{rate:>10}")
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the live search index and make every worker reload it'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = rebuild_search_index()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index)} documents ({len(index.postings)} terms) in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from website.seed import BATCH_SIZE, SEED_EMAIL_DOMAIN, SEED_PREFIX, SEEDERS, clear_seeded, seed
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with reproducible synthetic data for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=5000)
+        parser.add_argument('--trainings', type=int, default=5000)
+        parser.add_argument('--companies', type=int, default=500)
+        parser.add_argument('--testimonials', type=int, default=200)
+        parser.add_argument('--contacts', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same rows')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded rows first')
+        parser.add_argument('--clear-only', action='store_true', help='Only delete previously seeded rows')
+        parser.add_argument('--yes', action='store_true',
+                            help='Confirm --clear/--clear-only when DEBUG is off')
+
+    def handle(self, *args, **options):
+        if options['clear'] or options['clear_only']:
+            if not settings.DEBUG and not options['yes']:
+                raise CommandError(
+                    f'Clearing deletes every service, training, company and testimonial named "{SEED_PREFIX}..." '
+                    f'and every contact at {SEED_EMAIL_DOMAIN}, seeded or not. DEBUG is off; pass --yes to confirm.'
+                )
+            for kind, count in clear_seeded().items():
+                self.stdout.write(f'{kind}: {count} seeded row(s) deleted')
+            if options['clear_only']:
+                return
+
+        started = time.perf_counter()
+        counts = {kind: options[kind] for kind in SEEDERS}
+
+        def progress(kind, done, total):
+            if options['verbosity'] > 1 or done == total:
+                self.stdout.write(f'{kind}: {done}/{total} ({time.perf_counter() - started:.1f}s)')
+
+        seed(counts, seed=options['seed'], batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website.outbox import OutboxMailer, drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=8)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting after one pass')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep between polls when the outbox is empty')
+
+    def handle(self, *args, **options):
+        mailer = OutboxMailer()
+        try:
+            while True:
+                sent, failed = drain_outbox(mailer, options['batch_size'], options['max_attempts'])
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                if not options['loop']:
+                    break
+                if not (sent or failed):
+                    mailer.close()
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            mailer.close()
@@ -0,0 +1,276 @@
+"""
+Request timing, SQL and template metrics, by URL name.
+
+``MetricsMiddleware`` times a sampled share (``METRICS_SAMPLE_RATE``) of
+requests. While a sampled request runs, a database execute wrapper counts
+its queries and their time and the template backend times its renders. The
+breakdown goes out in a ``Server-Timing`` header and is added to counters
+keyed by the resolved URL name.
+
+Counters build up in process memory and are added to the shared cache every
+``METRICS_FLUSH_INTERVAL`` seconds. ``/metrics`` therefore reports every
+worker process in the Prometheus text format. Requests that are not sampled
+cost one random() call.
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+
+from .page_cache import STATS_EVENTS, page_cache_stats
+
+METRICS_SAMPLE_RATE = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+METRICS_FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+METRICS_SERVER_TIMING = getattr(settings, 'METRICS_SERVER_TIMING', True)
+# Bearer token for scrapers; staff users can always read /metrics.
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', '')
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SERIES_KEY = 'website:metrics:views'
+VALUE_KEY = 'website:metrics:%s:%s'
+# Summed per view; times are kept in microseconds so the cache can incr() them.
+FIELDS = ('count', 'duration_us', 'queries', 'sql_us', 'template_us', 'bytes') + tuple(
+    f'bucket_{i}' for i in range(len(LATENCY_BUCKETS))
+)
+
+_current = ContextVar('website_metrics_sample', default=None)
+_lock = threading.Lock()
+_pending = {}
+_last_flush = time.monotonic()
+
+
+class Sample:
+    __slots__ = ('started', 'queries', 'sql_time', 'template_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+
+def sql_timer(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.sql_time += time.perf_counter() - started
+
+
+def install_sql_timer(sender, connection, **kwargs):
+    """connection_created receiver; the wrapper outlives reconnects, so add it once."""
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            sample.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing top-level renders of sampled requests."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else 'unresolved'
+
+
+def _response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+def _server_timing(total, sample):
+    return (
+        f'app;dur={total * 1000:.1f}, db;dur={sample.sql_time * 1000:.1f};desc="{sample.queries} queries", '
+        f'tpl;dur={sample.template_time * 1000:.1f}'
+    )
+
+
+def record(view, duration, queries, sql_time, template_time, size):
+    values = {
+        'count': 1,
+        'duration_us': int(duration * 1e6),
+        'queries': queries,
+        'sql_us': int(sql_time * 1e6),
+        'template_us': int(template_time * 1e6),
+        'bytes': size,
+    }
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if duration <= bound:
+            values[f'bucket_{i}'] = 1
+            break
+    with _lock:
+        for field, value in values.items():
+            _pending[view, field] = _pending.get((view, field), 0) + value
+    if time.monotonic() - _last_flush >= METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def flush():
+    """Add this process's pending counters to the shared cache."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    views = {view for view, _ in pending}
+    known = cache.get(SERIES_KEY, set())
+    if not views <= known:
+        cache.set(SERIES_KEY, known | views, timeout=None)
+    for (view, field), value in pending.items():
+        if not value:
+            continue
+        key = VALUE_KEY % (view, field)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, value)
+
+
+def _finish(request, response, sample):
+    total = time.perf_counter() - sample.started
+    if METRICS_SERVER_TIMING:
+        response['Server-Timing'] = _server_timing(total, sample)
+    record(_view_name(request), total, sample.queries, sample.sql_time, sample.template_time,
+           _response_size(response))
+    return response
+
+
+class MetricsMiddleware:
+    """Put first in MIDDLEWARE so the timing covers the whole stack."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, sample)
+
+    async def __acall__(self, request):
+        if random.random() >= METRICS_SAMPLE_RATE:
+            return await self.get_response(request)
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, sample)
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render_metrics():
+    views = sorted(cache.get(SERIES_KEY, set()))
+    keys = [VALUE_KEY % (view, field) for view in views for field in FIELDS]
+    found = cache.get_many(keys)
+
+    def value(view, field):
+        return found.get(VALUE_KEY % (view, field), 0)
+
+    lines = [
+        '# HELP website_request_duration_seconds Time to handle sampled requests, by URL name.',
+        '# TYPE website_request_duration_seconds histogram',
+    ]
+    for view in views:
+        label = f'view="{_label(view)}"'
+        cumulative = 0
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            cumulative += value(view, f'bucket_{i}')
+            lines.append(f'website_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'website_request_duration_seconds_bucket{{{label},le="+Inf"}} {value(view, "count")}')
+        lines.append(f'website_request_duration_seconds_sum{{{label}}} {value(view, "duration_us") / 1e6}')
+        lines.append(f'website_request_duration_seconds_count{{{label}}} {value(view, "count")}')
+
+    counters = (
+        ('website_db_queries_total', 'SQL queries run by sampled requests.', 'queries'),
+        ('website_db_query_seconds_total', 'Time spent in SQL by sampled requests.', 'sql_us'),
+        ('website_template_render_seconds_total', 'Time spent rendering templates.', 'template_us'),
+        ('website_response_bytes_total', 'Response body bytes of sampled requests.', 'bytes'),
+    )
+    for name, help_text, field in counters:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for view in views:
+            total = value(view, field)
+            if field.endswith('_us'):
+                total /= 1e6
+            lines.append(f'{name}{{view="{_label(view)}"}} {total}')
+
+    lines += [
+        '# HELP website_page_cache_events_total Full-page cache lookups, by URL name and outcome.',
+        '# TYPE website_page_cache_events_total counter',
+    ]
+    for group, events in page_cache_stats().items():
+        for event in STATS_EVENTS:
+            lines.append(f'website_page_cache_events_total{{view="{group}",event="{event}"}} {events[event]}')
+
+    lines += [
+        '# HELP website_metrics_sample_rate Share of requests that are measured.',
+        '# TYPE website_metrics_sample_rate gauge',
+        f'website_metrics_sample_rate {METRICS_SAMPLE_RATE}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    allowed = request.user.is_active and request.user.is_staff
+    if METRICS_TOKEN and not allowed:
+        allowed = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}')
+    if not allowed:
+        return HttpResponseForbidden()
+    flush()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
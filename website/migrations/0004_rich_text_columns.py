@@ -0,0 +1,214 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:13
+
+import html
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.db import migrations, models
+
+
+# A frozen copy of the website.richtext sanitiser as of this migration, so
+# later changes there cannot break or alter it. Embedded images come out as
+# plain lazy <img> tags: build_image_renditions re-renders the bodies with
+# the <picture> markup once the renditions exist.
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'cite', 'code', 'col', 'colgroup', 'dd', 'del',
+    'div', 'dl', 'dt', 'em', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i',
+    'img', 'ins', 'kbd', 'li', 'mark', 'ol', 'p', 'pre', 's', 'small', 'span', 'strike', 'strong',
+    'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+VOID_TAGS = {'br', 'col', 'hr', 'img'}
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'form', 'svg', 'math'}
+BLOCK_TAGS = {
+    'blockquote', 'br', 'caption', 'dd', 'div', 'dt', 'figcaption', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'li', 'p', 'pre', 'td', 'th', 'tr',
+}
+GLOBAL_ATTRIBUTES = {'class', 'style', 'title', 'dir', 'lang', 'align'}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'target', 'rel', 'name'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'ol': {'start', 'type'},
+    'table': {'border', 'cellpadding', 'cellspacing', 'summary', 'width'},
+    'td': {'colspan', 'rowspan', 'width'},
+    'th': {'colspan', 'rowspan', 'scope', 'width'},
+    'col': {'span', 'width'},
+    'colgroup': {'span', 'width'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+SAFE_URL_SCHEMES = {'', 'http', 'https', 'mailto', 'tel'}
+UNSAFE_STYLE_RE = re.compile(r'expression|javascript|vbscript|url\s*\(|@import|behavior|-moz-binding|\\|/\*',
+                             re.I)
+URL_IGNORED_RE = re.compile(r'[\x00\t\n\r]')
+URL_STRIPPED = ''.join(map(chr, range(0x21)))
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _safe_url(value):
+    value = value.strip(URL_STRIPPED)
+    scheme = urlsplit(URL_IGNORED_RE.sub('', value)).scheme.lower()
+    return value if scheme in SAFE_URL_SCHEMES else None
+
+
+class Sanitiser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.text = []
+        self.open_tags = []
+        self.drop_depth = 0
+
+    def _attributes(self, tag, attrs):
+        allowed = GLOBAL_ATTRIBUTES | ALLOWED_ATTRIBUTES.get(tag, set())
+        cleaned = {}
+        for name, value in attrs:
+            name = name.lower()
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            if name == 'style' and UNSAFE_STYLE_RE.search(value):
+                continue
+            cleaned[name] = value
+        if tag == 'a' and cleaned.get('target') == '_blank':
+            cleaned['rel'] = 'noopener noreferrer'
+        if tag == 'img':
+            cleaned.setdefault('alt', '')
+            cleaned.update(loading='lazy', decoding='async')
+        return cleaned
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag not in ALLOWED_TAGS:
+            return
+        attributes = self._attributes(tag, attrs)
+        if tag == 'img' and 'src' not in attributes:
+            return
+        rendered = ''.join(f' {name}="{html.escape(value)}"' for name, value in attributes.items())
+        self.out.append(f'<{tag}{rendered}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(0, self.drop_depth - 1)
+            return
+        if self.drop_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            current = self.open_tags.pop()
+            self.out.append(f'</{current}>')
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        if self.drop_depth:
+            return
+        self.out.append(html.escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.out.append(f'</{self.open_tags.pop()}>')
+
+
+def render_rich_text(value):
+    sanitiser = Sanitiser()
+    sanitiser.feed(value or '')
+    sanitiser.close()
+    return ''.join(sanitiser.out), WHITESPACE_RE.sub(' ', ''.join(sanitiser.text)).strip()
+
+
+def render_existing_rows(apps, schema_editor):
+    fields = {
+        'HeroSection': ('description',),
+        'Service': ('full_description', 'features', 'specialties'),
+        'Training': ('full_description', 'features', 'curriculum'),
+    }
+    for model_name, names in fields.items():
+        model = apps.get_model('website', model_name)
+        for instance in model.objects.all():
+            texts = []
+            for name in names:
+                rendered, text = render_rich_text(getattr(instance, name))
+                setattr(instance, f'{name}_html', rendered)
+                texts.append(text)
+            update_fields = [f'{name}_html' for name in names]
+            if model_name != 'HeroSection':
+                instance.search_text = '\n'.join(text for text in texts if text)
+                update_fields.append('search_text')
+            instance.save(update_fields=update_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0003_imagerendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='herosection',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='features_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='full_description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='specialties_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='training',
+            name='curriculum_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='training',
+            name='features_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='training',
+            name='full_description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='training',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_existing_rows, migrations.RunPython.noop),
+    ]
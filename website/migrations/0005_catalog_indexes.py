@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0004_rich_text_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['-created_at'], name='contact_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['status', '-created_at'], name='contact_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='herosection',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='hero_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['order', 'name'], name='service_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['order', 'name'], name='service_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['updated_at'], name='service_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['order', '-created_at'], name='testimonial_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='training',
+            index=models.Index(fields=['order', 'name'], name='training_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='training',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['order', 'name'], name='training_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='training',
+            index=models.Index(fields=['updated_at'], name='training_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trustedcompany',
+            index=models.Index(fields=['order', 'name'], name='company_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trustedcompany',
+            index=models.Index(fields=['updated_at'], name='company_updated_idx'),
+        ),
+    ]
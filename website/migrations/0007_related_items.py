@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0006_listing_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedService',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(default=0)),
+                ('source', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='website.service')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='website.service')),
+            ],
+            options={
+                'verbose_name': 'Related Service',
+                'verbose_name_plural': 'Related Services',
+                'ordering': ['source', 'rank'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('source', 'rank'), name='related_service_rank_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedTraining',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(default=0)),
+                ('source', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='website.training')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='website.training')),
+            ],
+            options={
+                'verbose_name': 'Related Training',
+                'verbose_name_plural': 'Related Trainings',
+                'ordering': ['source', 'rank'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('source', 'rank'), name='related_training_rank_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:30
+
+import re
+
+from django.db import migrations, models
+
+
+# Frozen copies of website.models.normalize_text / normalize_phone, so later
+# changes to those cannot alter what this migration writes.
+def normalize_text(value):
+    return ' '.join(value.split()).lower()
+
+
+def normalize_phone(value):
+    return re.sub(r'\D', '', value)
+
+
+def fill_search_keys(apps, schema_editor):
+    Contact = apps.get_model('website', 'Contact')
+    batch = []
+    for contact in Contact.objects.only('full_name', 'email', 'phone_number').iterator(chunk_size=2000):
+        contact.name_key = normalize_text(contact.full_name)[:100]
+        contact.email_key = normalize_text(contact.email)[:254]
+        contact.phone_key = normalize_phone(contact.phone_number)[:20]
+        batch.append(contact)
+        if len(batch) >= 2000:
+            Contact.objects.bulk_update(batch, ['name_key', 'email_key', 'phone_key'])
+            batch = []
+    Contact.objects.bulk_update(batch, ['name_key', 'email_key', 'phone_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0007_related_items'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='contact_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='contact_status_idx',
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='email_key',
+            field=models.CharField(blank=True, editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='name_key',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        # Fill the keys before building their indexes.
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['-created_at', '-id'], name='contact_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='contact_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['name_key'], name='contact_name_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['email_key'], name='contact_email_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['phone_key'], name='contact_phone_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of website.models.name_suffixes.
+def name_suffixes(name_key):
+    words = name_key.split(' ')
+    return [' '.join(words[i:]) for i in range(1, len(words))]
+
+
+def fill_name_suffixes(apps, schema_editor):
+    Contact = apps.get_model('website', 'Contact')
+    ContactNameSuffix = apps.get_model('website', 'ContactNameSuffix')
+    batch = []
+    for pk, name_key in Contact.objects.values_list('pk', 'name_key').iterator(chunk_size=2000):
+        batch += [ContactNameSuffix(contact_id=pk, key=suffix) for suffix in name_suffixes(name_key)]
+        if len(batch) >= 2000:
+            ContactNameSuffix.objects.bulk_create(batch)
+            batch = []
+    ContactNameSuffix.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0009_download_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactNameSuffix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('contact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_suffixes', to='website.contact')),
+            ],
+        ),
+        # Fill the keys before building their index.
+        migrations.RunPython(fill_name_suffixes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contactnamesuffix',
+            index=models.Index(fields=['key'], name='contact_suffix_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+import re
+
+from django.db import connections, models
 from django.urls import reverse
+from django.utils import timezone
 from ckeditor_uploader.fields import RichTextUploadingField
 from colorfield.fields import ColorField
 
@@ -63,10 +66,16 @@ class HeroSection(models.Model):
     cta_link = models.CharField(max_length=200, default="#services")
     is_active = models.BooleanField(default=True)
 
+    # Sanitised HTML rendered on save (see website/richtext.py)
+    description_html = models.TextField(blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='hero_active_idx'),
+        ]
         verbose_name = "Hero Section"
         verbose_name_plural = "Hero Sections"
 
@@ -74,7 +83,15 @@ class HeroSection(models.Model):
         return self.title
 
 
+class CatalogQuerySet(models.QuerySet):
+    def cards(self):
+        """Only the columns shown on list and related-item cards, not the rich-text bodies."""
+        return self.only(*self.model.CARD_FIELDS)
+
+
 class Service(models.Model):
+    CARD_FIELDS = ('id', 'name', 'short_description', 'image', 'order')
+
     name = models.CharField(max_length=200)
     short_description = models.TextField(max_length=300)
     full_description = RichTextUploadingField()
@@ -82,14 +99,30 @@ class Service(models.Model):
     features = RichTextUploadingField(blank=True)
     specialties = RichTextUploadingField(blank=True)
     pdf_file = models.FileField(upload_to='service_pdfs/', blank=True, null=True)
+    # Written in batches by website.downloads, never by model forms.
+    download_count = models.PositiveIntegerField(default=0, editable=False)
     is_featured = models.BooleanField(default=False)
     order = models.IntegerField(default=0)
 
+    # Sanitised HTML and plain text rendered on save (see website/richtext.py)
+    full_description_html = models.TextField(blank=True, editable=False)
+    features_html = models.TextField(blank=True, editable=False)
+    specialties_html = models.TextField(blank=True, editable=False)
+    search_text = models.TextField(blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CatalogQuerySet.as_manager()
+
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['order', 'name', 'id'], name='service_order_idx'),
+            models.Index(fields=['order', 'name'], condition=models.Q(is_featured=True),
+                         name='service_featured_idx'),
+            models.Index(fields=['updated_at'], name='service_updated_idx'),
+        ]
         verbose_name = "Service"
         verbose_name_plural = "Services"
 
@@ -101,6 +134,8 @@ class Service(models.Model):
 
 
 class Training(models.Model):
+    CARD_FIELDS = ('id', 'name', 'short_description', 'image', 'order', 'level', 'duration')
+
     name = models.CharField(max_length=200)
     short_description = models.TextField(max_length=300)
     full_description = RichTextUploadingField()
@@ -114,14 +149,30 @@ class Training(models.Model):
     features = RichTextUploadingField(blank=True)
     curriculum = RichTextUploadingField(blank=True)
     pdf_file = models.FileField(upload_to='training_pdfs/', blank=True, null=True)
+    # Written in batches by website.downloads, never by model forms.
+    download_count = models.PositiveIntegerField(default=0, editable=False)
     is_featured = models.BooleanField(default=False)
     order = models.IntegerField(default=0)
 
+    # Sanitised HTML and plain text rendered on save (see website/richtext.py)
+    full_description_html = models.TextField(blank=True, editable=False)
+    features_html = models.TextField(blank=True, editable=False)
+    curriculum_html = models.TextField(blank=True, editable=False)
+    search_text = models.TextField(blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CatalogQuerySet.as_manager()
+
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['order', 'name', 'id'], name='training_order_idx'),
+            models.Index(fields=['order', 'name'], condition=models.Q(is_featured=True),
+                         name='training_featured_idx'),
+            models.Index(fields=['updated_at'], name='training_updated_idx'),
+        ]
         verbose_name = "Training"
         verbose_name_plural = "Trainings"
 
@@ -143,6 +194,10 @@ class TrustedCompany(models.Model):
 
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['order', 'name'], name='company_order_idx'),
+            models.Index(fields=['updated_at'], name='company_updated_idx'),
+        ]
         verbose_name = "Trusted Company"
         verbose_name_plural = "Trusted Companies"
 
@@ -165,6 +220,10 @@ class Testimonial(models.Model):
 
     class Meta:
         ordering = ['order', '-created_at']
+        indexes = [
+            models.Index(fields=['order', '-created_at'], condition=models.Q(is_featured=True),
+                         name='testimonial_featured_idx'),
+        ]
         verbose_name = "Testimonial"
         verbose_name_plural = "Testimonials"
 
@@ -172,6 +231,53 @@ class Testimonial(models.Model):
         return f"{self.name} - {self.company}"
 
 
+def normalize_text(value):
+    return ' '.join(value.split()).lower()
+
+
+def normalize_phone(value):
+    return re.sub(r'\D', '', value)
+
+
+def _prefix_lookups(column, prefix, bounded):
+    lookups = {f'{column}__startswith': prefix}
+    if bounded:
+        lookups.update({f'{column}__gte': prefix, f'{column}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)})
+    return lookups
+
+
+def name_suffixes(name_key):
+    """Each later word of a normalized name with the words after it."""
+    words = name_key.split(' ')
+    return [' '.join(words[i:]) for i in range(1, len(words))]
+
+
+class ContactQuerySet(models.QuerySet):
+    def search(self, term):
+        """Contacts whose name, email or phone number starts with ``term``.
+
+        Names also match from any later word ("kumar" finds Anil Kumar),
+        through their ContactNameSuffix rows. Matches run against normalized,
+        indexed key columns. SQLite compares them bytewise, so an explicit
+        ``[prefix, next prefix)`` range lets it seek into their indexes;
+        PostgreSQL seeks on ``LIKE 'prefix%'`` through the pattern_ops indexes.
+        """
+        bounded = connections[self.db].vendor == 'sqlite'
+        condition = models.Q()
+        name = normalize_text(term)
+        prefixes = [('name_key', name), ('email_key', name)]
+        digits = normalize_phone(term)
+        if len(digits) >= 3 and not re.search(r'[^\d\s()+.-]', term):
+            prefixes.append(('phone_key', digits))
+        for column, prefix in prefixes:
+            if prefix:
+                condition |= models.Q(**_prefix_lookups(column, prefix, bounded))
+        if name:
+            suffixes = ContactNameSuffix.objects.filter(**_prefix_lookups('key', name, bounded))
+            condition |= models.Q(pk__in=suffixes.values('contact_id'))
+        return self.filter(condition) if condition else self
+
+
 class Contact(models.Model):
     STATUS_CHOICES = [
         ('new', 'New'),
@@ -186,13 +292,161 @@ class Contact(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
     admin_notes = models.TextField(blank=True)
 
+    # Lowercased / digits-only copies for indexed prefix search in the admin.
+    name_key = models.CharField(max_length=100, blank=True, editable=False)
+    email_key = models.CharField(max_length=254, blank=True, editable=False)
+    phone_key = models.CharField(max_length=20, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ContactQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='contact_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='contact_status_idx'),
+            models.Index(fields=['name_key'], name='contact_name_key_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['email_key'], name='contact_email_key_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['phone_key'], name='contact_phone_key_idx', opclasses=['varchar_pattern_ops']),
+        ]
         verbose_name = "Contact"
         verbose_name_plural = "Contacts"
 
     def __str__(self):
         return f"{self.full_name} - {self.email}"
+
+    def set_search_keys(self):
+        self.name_key = normalize_text(self.full_name)[:100]
+        self.email_key = normalize_text(self.email)[:254]
+        self.phone_key = normalize_phone(self.phone_number)[:20]
+
+    def save(self, *args, **kwargs):
+        self.set_search_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'name_key', 'email_key', 'phone_key'}
+        super().save(*args, **kwargs)
+        if update_fields is None or 'full_name' in update_fields:
+            sync_name_suffixes([self])
+
+
+class ContactNameSuffix(models.Model):
+    """A later part of a contact's normalized name, for word-prefix search."""
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='name_suffixes')
+    key = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key'], name='contact_suffix_key_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+
+def sync_name_suffixes(contacts):
+    """Rewrite the ContactNameSuffix rows of saved ``contacts`` from name_key."""
+    ContactNameSuffix.objects.filter(contact__in=[contact.pk for contact in contacts]).delete()
+    ContactNameSuffix.objects.bulk_create([
+        ContactNameSuffix(contact_id=contact.pk, key=suffix)
+        for contact in contacts for suffix in name_suffixes(contact.name_key)
+    ], batch_size=1000)
+
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    contact = models.ForeignKey(Contact, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='emails')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_queue_idx'),
+        ]
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+
+    def __str__(self):
+        return f"{self.subject} ({self.get_status_display()})"
+
+
+class ImageRendition(models.Model):
+    FORMAT_CHOICES = [
+        ('avif', 'AVIF'),
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+        ('png', 'PNG'),
+    ]
+
+    source = models.CharField(max_length=255, db_index=True, help_text="Storage name of the original image")
+    source_hash = models.CharField(max_length=16)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.CharField(max_length=255)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['source', 'format', 'width']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'format', 'width'], name='unique_image_rendition'),
+        ]
+        verbose_name = "Image Rendition"
+        verbose_name_plural = "Image Renditions"
+
+    def __str__(self):
+        return f"{self.file} ({self.width}w)"
+
+
+class RelatedItem(models.Model):
+    """A precomputed "related" neighbour of a catalog item (see website/related.py)."""
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ['source', 'rank']
+
+    def __str__(self):
+        return f"{self.source} -> {self.target} ({self.score:.3f})"
+
+
+class RelatedService(RelatedItem):
+    # The (source, rank) constraint doubles as the index for the detail page lookup.
+    source = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='neighbors', db_index=False)
+    target = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='neighbor_of')
+
+    class Meta(RelatedItem.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'rank'], name='related_service_rank_unique'),
+        ]
+        verbose_name = "Related Service"
+        verbose_name_plural = "Related Services"
+
+
+class RelatedTraining(RelatedItem):
+    source = models.ForeignKey(Training, on_delete=models.CASCADE, related_name='neighbors', db_index=False)
+    target = models.ForeignKey(Training, on_delete=models.CASCADE, related_name='neighbor_of')
+
+    class Meta(RelatedItem.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'rank'], name='related_training_rank_unique'),
+        ]
+        verbose_name = "Related Training"
+        verbose_name_plural = "Related Trainings"
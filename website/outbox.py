@@ -0,0 +1,148 @@
+"""
+Database-backed outbox for notification emails.
+
+Contact submissions only insert an OutboundEmail row, in the same
+transaction as the Contact itself (see views._save_contact). The
+``send_queued_mail`` worker drains the queue in batches over one SMTP
+connection built from the SiteSettings smtp_* fields. Those are read from
+the database for every batch: the worker is a separate, long-running
+process that the per-process settings cache would leave on old values.
+Failed messages are retried with exponential backoff until
+``max_attempts`` is reached.
+"""
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail, SiteSettings
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 60 * 60 * 6
+STALE_CLAIM_AFTER = timedelta(minutes=15)
+
+
+def enqueue_contact_notification(contact):
+    return OutboundEmail.objects.create(
+        contact=contact,
+        subject=f'New Contact Form Submission from {contact.full_name}',
+        body=f'Name: {contact.full_name}\nEmail: {contact.email}\nPhone: {contact.phone_number}\nMessage: {contact.message}',
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+class OutboxMailer:
+    """Keeps one SMTP connection open across batches.
+
+    The connection is rebuilt when SiteSettings change or after a failure.
+    """
+
+    def __init__(self):
+        self.connection = None
+        self.version = None
+
+    def settings(self):
+        site_settings = SiteSettings.objects.first()
+        if site_settings and site_settings.smtp_username:
+            return site_settings
+        return None
+
+    def open(self, site_settings):
+        version = (site_settings.pk, site_settings.updated_at)
+        if self.connection is not None and self.version == version:
+            return self.connection
+
+        self.close()
+        self.connection = get_connection(
+            host=site_settings.smtp_host or None,
+            port=site_settings.smtp_port,
+            username=site_settings.smtp_username,
+            password=site_settings.smtp_password,
+            use_tls=site_settings.smtp_use_tls,
+            fail_silently=False,
+            timeout=30,
+        )
+        self.connection.open()
+        self.version = version
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                logger.warning('Error closing SMTP connection', exc_info=True)
+        self.connection = None
+        self.version = None
+
+    def send(self, email, site_settings):
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.body,
+            from_email=site_settings.smtp_username,
+            to=[site_settings.email or site_settings.smtp_username],
+            connection=self.open(site_settings),
+        )
+        message.send()
+
+
+def release_stale_claims():
+    """Return messages claimed by a worker that died mid-batch to the queue."""
+    cutoff = timezone.now() - STALE_CLAIM_AFTER
+    return OutboundEmail.objects.filter(status='sending', updated_at__lt=cutoff).update(
+        status='pending', updated_at=timezone.now(),
+    )
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    candidates = OutboundEmail.objects.filter(
+        status='pending', next_attempt_at__lte=now,
+    ).order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size]
+
+    claimed = []
+    for pk in candidates:
+        # Conditional update so concurrent workers never send the same row.
+        if OutboundEmail.objects.filter(pk=pk, status='pending').update(status='sending', updated_at=now):
+            claimed.append(pk)
+    return list(OutboundEmail.objects.filter(pk__in=claimed).order_by('next_attempt_at'))
+
+
+def drain_outbox(mailer, batch_size=50, max_attempts=8):
+    """Send one batch of due messages. Returns ``(sent, failed)`` counts."""
+    site_settings = mailer.settings()
+    if site_settings is None:
+        logger.warning('SMTP is not configured in SiteSettings; leaving outbox untouched')
+        return 0, 0
+
+    release_stale_claims()
+    sent = failed = 0
+    for email in claim_batch(batch_size):
+        email.attempts += 1
+        try:
+            mailer.send(email, site_settings)
+        except Exception as exc:
+            mailer.close()
+            failed += 1
+            email.last_error = f'{type(exc).__name__}: {exc}'
+            if email.attempts >= max_attempts:
+                email.status = 'failed'
+                logger.error('Giving up on outbound email %s: %s', email.pk, email.last_error)
+            else:
+                email.status = 'pending'
+                email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                logger.warning('Outbound email %s failed (attempt %s): %s',
+                               email.pk, email.attempts, email.last_error)
+        else:
+            sent += 1
+            email.status = 'sent'
+            email.sent_at = timezone.now()
+            email.last_error = ''
+        email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'updated_at'])
+    return sent, failed
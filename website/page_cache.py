@@ -0,0 +1,248 @@
+"""
+Full-page cache for the public catalog views.
+
+Entries are keyed by path and query string and are versioned at three
+levels: a global version (bumped when SiteSettings changes, since every page
+renders it), a per-URL-name group version and a per-path version. Model
+signals bump exactly the versions whose pages show the changed row, which
+makes every entry built under the old version unreachable.
+
+Requests that carry a session or pending messages bypass the cache. The CSRF
+token embedded in cached forms is swapped for the visitor's own token on
+every hit, and the contact form's signed render time for a fresh one.
+"""
+import hashlib
+import re
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.urls import reverse
+
+from .models import HeroSection, Service, Testimonial, Training, TrustedCompany
+from .throttle import TOKEN_FIELD, issue_form_token
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 60)
+
+GLOBAL_VERSION_KEY = 'website:page:version:global'
+GROUP_VERSION_KEY = 'website:page:version:group:%s'
+PATH_VERSION_KEY = 'website:page:version:path:%s'
+ENTRY_KEY = 'website:page:entry:%s'
+STATS_KEY = 'website:page:stats:%s:%s'
+STATS_EVENTS = ('hit', 'miss', 'bypass')
+
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = b'__page_cache_csrf_token__'
+FORM_TOKEN_RE = re.compile(rb'(name="' + re.escape(TOKEN_FIELD.encode()) + rb'" value=")[^"]*(")')
+FORM_TOKEN_PLACEHOLDER = b'__page_cache_form_token__'
+
+
+def _new_version():
+    # Derived from the clock so an evicted version key never comes back with
+    # a value that older entries were stored under.
+    return time.time_ns()
+
+
+def _versions(keys):
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, timeout=None)
+        found.update(cache.get_many(list(missing)))
+    return [found.get(key, missing.get(key)) for key in keys]
+
+
+async def _aversions(keys):
+    found = await cache.aget_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        for key, value in missing.items():
+            await cache.aadd(key, value, timeout=None)
+        found.update(await cache.aget_many(list(missing)))
+    return [found.get(key, missing.get(key)) for key in keys]
+
+
+def _bump(keys):
+    if keys:
+        cache.set_many({key: _new_version() for key in keys}, timeout=None)
+
+
+def _version_keys(request, group):
+    return [GLOBAL_VERSION_KEY, GROUP_VERSION_KEY % group, PATH_VERSION_KEY % request.path]
+
+
+def path_versions(path, group):
+    """Current ``[global, group, path]`` versions of ``path``, outside a request."""
+    return _versions([GLOBAL_VERSION_KEY, GROUP_VERSION_KEY % group, PATH_VERSION_KEY % path])
+
+
+def _entry_key(request, versions):
+    raw = repr((request.path, sorted(request.GET.lists()), versions)).encode()
+    return ENTRY_KEY % hashlib.md5(raw).hexdigest()
+
+
+def _record(group, event):
+    key = STATS_KEY % (group, event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def _arecord(group, event):
+    key = STATS_KEY % (group, event)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+def _group(request, view):
+    return request.resolver_match.url_name if request.resolver_match else view.__name__
+
+
+def page_versions(request, view):
+    """Current ``[global, group, path]`` versions of the page ``view`` serves."""
+    return _versions(_version_keys(request, _group(request, view)))
+
+
+async def apage_versions(request, view):
+    return await _aversions(_version_keys(request, _group(request, view)))
+
+
+def bypasses_cache(request):
+    """True for requests whose response must not be shared between visitors."""
+    if request.method not in ('GET', 'HEAD'):
+        return True
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return True
+    return len(messages.get_messages(request)) > 0
+
+
+def _cacheable(response):
+    if response.status_code != 200 or response.streaming:
+        return False
+    if response.has_header('Cache-Control') and 'private' in response['Cache-Control']:
+        return False
+    return all(name == settings.CSRF_COOKIE_NAME for name in response.cookies)
+
+
+def _hit_response(request, entry):
+    content = entry['content']
+    if entry['csrf']:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+    if entry.get('form_token'):
+        content = content.replace(FORM_TOKEN_PLACEHOLDER, issue_form_token().encode())
+    response = HttpResponse(content, content_type=entry['content_type'])
+    response['X-Page-Cache'] = 'HIT'
+    return response
+
+
+def _cache_entry(request, response):
+    if request.method != 'GET' or not _cacheable(response):
+        return None
+    content, replaced = CSRF_INPUT_RE.subn(rb'\1' + CSRF_PLACEHOLDER + rb'\2', response.content)
+    content, form_tokens = FORM_TOKEN_RE.subn(rb'\1' + FORM_TOKEN_PLACEHOLDER + rb'\2', content)
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'csrf': bool(replaced),
+        'form_token': bool(form_tokens),
+    }
+
+
+def cache_public_page(view):
+    """Serve the wrapped view from the page cache for anonymous GET/HEAD requests.
+
+    Works with both regular and ``async def`` views.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            group = _group(request, view)
+            if bypasses_cache(request):
+                await _arecord(group, 'bypass')
+                return await view(request, *args, **kwargs)
+
+            key = _entry_key(request, await _aversions(_version_keys(request, group)))
+            entry = await cache.aget(key)
+            if entry is not None:
+                await _arecord(group, 'hit')
+                return _hit_response(request, entry)
+
+            await _arecord(group, 'miss')
+            response = await view(request, *args, **kwargs)
+            entry = _cache_entry(request, response)
+            if entry is not None:
+                await cache.aset(key, entry, PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'MISS'
+            return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        group = _group(request, view)
+        if bypasses_cache(request):
+            _record(group, 'bypass')
+            return view(request, *args, **kwargs)
+
+        key = _entry_key(request, _versions(_version_keys(request, group)))
+        entry = cache.get(key)
+        if entry is not None:
+            _record(group, 'hit')
+            return _hit_response(request, entry)
+
+        _record(group, 'miss')
+        response = view(request, *args, **kwargs)
+        entry = _cache_entry(request, response)
+        if entry is not None:
+            cache.set(key, entry, PAGE_CACHE_TIMEOUT)
+        response['X-Page-Cache'] = 'MISS'
+        return response
+
+    return wrapper
+
+
+def page_cache_stats(groups=None):
+    """Return ``{group: {'hit': n, 'miss': n, 'bypass': n}}`` counters."""
+    if groups is None:
+        groups = [
+            'home', 'services', 'service_detail', 'trainings', 'training_detail',
+            'terms', 'privacy', 'refund',
+        ]
+    keys = {STATS_KEY % (group, event): (group, event) for group in groups for event in STATS_EVENTS}
+    found = cache.get_many(list(keys))
+    stats = {group: dict.fromkeys(STATS_EVENTS, 0) for group in groups}
+    for key, (group, event) in keys.items():
+        stats[group][event] = found.get(key, 0)
+    return stats
+
+
+def purge_paths(paths=(), groups=()):
+    """Invalidate every cached variant of ``paths`` and of the URL-name ``groups``."""
+    _bump([PATH_VERSION_KEY % path for path in paths] + [GROUP_VERSION_KEY % group for group in groups])
+
+
+def purge_all():
+    _bump([GLOBAL_VERSION_KEY])
+
+
+def affected_paths(instance):
+    """Paths of the cached pages that render ``instance`` directly."""
+    if isinstance(instance, Service):
+        return [reverse('service_detail', kwargs={'pk': instance.pk}), reverse('services'), reverse('home')]
+    if isinstance(instance, Training):
+        return [reverse('training_detail', kwargs={'pk': instance.pk}), reverse('trainings'), reverse('home')]
+    if isinstance(instance, (HeroSection, TrustedCompany, Testimonial)):
+        return [reverse('home')]
+    return []
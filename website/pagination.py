@@ -0,0 +1,229 @@
+"""
+Keyset (seek) pagination for the service and training listings.
+
+Pages are addressed by an opaque, signed cursor holding the sort key of the
+row they continue from, so page 50 costs the same index range scan as page 1:
+no OFFSET, and no COUNT(*) per request. The total used for the page-number
+links is a count cached for ``LISTING_COUNT_TIMEOUT`` seconds and dropped
+whenever a row is added or removed.
+The previous/next arrows and the neighbouring page numbers link cursors.
+Numbers two pages away, and plain ``?page=N`` links, jump with OFFSET: a
+cursor for them would need the rows of the page in between. Walking the
+listing page by page therefore never scans with OFFSET; only jumps do.
+
+``EstimatedCountPaginator`` does the same for admin changelists: an
+unfiltered changelist shows an estimated total instead of running COUNT(*)
+over the whole table on every load.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import Service, Training
+
+LISTING_PAGINATION = getattr(settings, 'LISTING_PAGINATION', 'keyset')
+LISTING_PAGE_SIZE = 9
+LISTING_COUNT_TIMEOUT = getattr(settings, 'LISTING_COUNT_TIMEOUT', 60 * 10)
+ADMIN_COUNT_TIMEOUT = getattr(settings, 'ADMIN_COUNT_TIMEOUT', 60)
+COUNT_KEY = 'website:listing:count:%s'
+# The ``count_key`` each listing view paginates under.
+LISTING_COUNT_KEYS = {Service: 'services', Training: 'trainings'}
+TABLE_COUNT_KEY = 'website:table:count:%s'
+# Below this many rows the planner estimate is not worth trusting.
+ESTIMATE_THRESHOLD = 10000
+CURSOR_SALT = 'website.pagination'
+
+
+def encode_cursor(values, number, direction):
+    return signing.dumps([list(values), number, direction], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor):
+    """Return ``(values, number, direction)``, or None for a bad cursor."""
+    try:
+        values, number, direction = signing.loads(cursor, salt=CURSOR_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(number, int) or number < 1:
+        return None
+    return values, number, direction
+
+
+def seek(keys, values, lookup):
+    """Rows whose ``keys`` tuple sorts after (``gt``) or before (``lt``) ``values``.
+
+    The leading ``>=``/``<=`` bound lets the database seek into the index
+    instead of filtering a scan.
+    """
+    condition = Q()
+    for i, key in enumerate(keys):
+        equal = dict(zip(keys[:i], values[:i]))
+        condition |= Q(**equal, **{f'{key}__{lookup}': values[i]})
+    return Q(**{f'{keys[0]}__{lookup}e': values[0]}) & condition
+
+
+class KeysetPage:
+    def __init__(self, object_list, number, paginator, has_previous, has_next):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __repr__(self):
+        return f'<Page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.paginator.key(self.object_list[-1]), self.number + 1, 'next')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.paginator.key(self.object_list[0]), self.number - 1, 'prev')
+        return None
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` by the ascending, unique ``keys`` tuple.
+
+    Exposes ``count``/``num_pages``/``page_range`` like Django's Paginator,
+    but from a cached, approximate count (None when ``count_key`` is None).
+    """
+
+    def __init__(self, queryset, per_page, keys=('order', 'name', 'id'), count_key=None):
+        self.queryset = queryset.order_by(*keys)
+        self.per_page = per_page
+        self.keys = keys
+        self.count_key = count_key
+
+    def key(self, obj):
+        return [getattr(obj, key) for key in self.keys]
+
+    @property
+    def count(self):
+        if self.count_key is None:
+            return None
+        if not hasattr(self, '_count'):
+            self._count = cache.get_or_set(COUNT_KEY % self.count_key, self.queryset.count,
+                                           LISTING_COUNT_TIMEOUT)
+        return self._count
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, -(-self.count // self.per_page))
+
+    @property
+    def page_range(self):
+        return range(1, (self.num_pages or 0) + 1)
+
+    def page_after(self, values, number):
+        rows = list(self.queryset.filter(seek(self.keys, values, 'gt'))[:self.per_page + 1])
+        return KeysetPage(rows[:self.per_page], number, self, number > 1, len(rows) > self.per_page)
+
+    def page_before(self, values, number):
+        reverse = [f'-{key}' for key in self.keys]
+        rows = list(self.queryset.filter(seek(self.keys, values, 'lt')).order_by(*reverse)[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return KeysetPage(rows, number if has_previous else 1, self, has_previous, True)
+
+    def page_number(self, number):
+        """Jump to page ``number`` with OFFSET, for the page-number links."""
+        if self.num_pages is not None:
+            number = min(number, self.num_pages)
+        offset = (number - 1) * self.per_page
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        return KeysetPage(rows[:self.per_page], number, self, number > 1, len(rows) > self.per_page)
+
+    def get_page(self, params):
+        """Page for request GET ``params``: ``cursor`` wins over ``page``."""
+        cursor = decode_cursor(params.get('cursor', ''))
+        if cursor is not None:
+            values, number, direction = cursor
+            if direction == 'next':
+                return self.page_after(values, number)
+            return self.page_before(values, number)
+        try:
+            number = max(1, int(params.get('page', 1)))
+        except (TypeError, ValueError):
+            number = 1
+        return self.page_number(number)
+
+
+def forget_listing_count(model):
+    """Drop the cached listing total of ``model`` after rows were added or removed."""
+    cache.delete(COUNT_KEY % LISTING_COUNT_KEYS[model])
+
+
+def paginate_listing(params, queryset, per_page, count_key):
+    """Page of ``queryset`` for GET ``params`` in the LISTING_PAGINATION mode."""
+    if LISTING_PAGINATION == 'offset':
+        return Paginator(queryset, per_page).get_page(params.get('page'))
+    return KeysetPaginator(queryset, per_page, count_key=count_key).get_page(params)
+
+
+def estimated_count(queryset):
+    """Approximate row count of ``queryset``'s whole table.
+
+    PostgreSQL reads the planner statistics; other databases count once and
+    cache the result for ADMIN_COUNT_TIMEOUT seconds.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= ESTIMATE_THRESHOLD:
+            return row[0]
+    table = model._default_manager.using(queryset.db)
+    return cache.get_or_set(TABLE_COUNT_KEY % model._meta.label_lower, table.count, ADMIN_COUNT_TIMEOUT)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists over large tables.
+
+    Filtered or searched lists are counted exactly, through the index that
+    serves the filter; the unfiltered list uses ``estimated_count``.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, 'query', None) is not None and not queryset.query.where:
+            return estimated_count(queryset)
+        return super().count
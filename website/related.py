@@ -0,0 +1,268 @@
+"""
+Related services and trainings, by text similarity.
+
+Every item is a TF-IDF vector over the same weighted fields the search index
+uses (name, short description and the plain text of the rich-text bodies),
+and its neighbours are the items with the highest cosine similarity. The
+top ``RELATED_ITEMS`` are stored in RelatedService / RelatedTraining, so a
+detail page reads its related cards with a single indexed join. Lists are
+topped up in catalog order when fewer items share any terms.
+
+``build_related_items`` computes every list, with a blocked sparse product
+over the postings when NumPy is installed. Saves and deletes update only the
+lists that can change: the saved item's own, those that listed it, and those
+it now outranks.
+"""
+import math
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.urls import reverse
+
+from .models import RelatedService, RelatedTraining, Service, Training
+from .page_cache import purge_paths
+from .search import FIELD_WEIGHTS, MODELS, document_fields, tokenize
+
+RELATED_ITEMS = getattr(settings, 'RELATED_ITEMS', 3)
+RELATION_MODELS = {Service: RelatedService, Training: RelatedTraining}
+KINDS = {model: kind for kind, model in MODELS.items()}
+# Rows of the similarity matrix scored per NumPy block, capped so a block
+# holds at most MATRIX_BLOCK_CELLS float32 cells (16 MB).
+MATRIX_CHUNK = 512
+MATRIX_BLOCK_CELLS = 4 * 1024 * 1024
+# Per model, ``{pk: (updated_at, term weights)}``: a refresh after one save
+# tokenises that row only, not the whole catalog. The background worker of
+# each process keeps its own copy.
+_term_weights = defaultdict(dict)
+_term_weights_lock = threading.Lock()
+# Rows per ``pk__in`` lookup, below SQLite's host parameter limit.
+LOOKUP_BATCH = 500
+
+
+def _batches(values):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_BATCH):
+        yield values[start:start + LOOKUP_BATCH]
+
+
+def term_weights(kind, instance):
+    weights = Counter()
+    for field, text in document_fields(kind, instance).items():
+        for token in tokenize(text):
+            if len(token) > 1:
+                weights[token] += FIELD_WEIGHTS[field]
+    return weights
+
+
+class Corpus:
+    """L2-normalised TF-IDF vectors of every item of one catalog model."""
+
+    def __init__(self, model):
+        self.model = model
+        kind = KINDS[model]
+        rows = list(model.objects.values_list('pk', 'updated_at', 'order', 'name'))
+        self.sort_keys = {pk: (order, name, pk) for pk, _, order, name in rows}
+        with _term_weights_lock:
+            cached = _term_weights[model]
+            stale = [pk for pk, updated_at, _, _ in rows if cached.get(pk, (None,))[0] != updated_at]
+            for batch in _batches(stale):
+                for instance in model.objects.filter(pk__in=batch).only(
+                        *model.CARD_FIELDS, 'search_text', 'updated_at'):
+                    cached[instance.pk] = (instance.updated_at, term_weights(kind, instance))
+            for pk in cached.keys() - self.sort_keys.keys():
+                del cached[pk]
+            counts = {pk: cached[pk][1] for pk in self.sort_keys if pk in cached}
+
+        document_frequency = Counter(term for weights in counts.values() for term in weights)
+        total = len(counts)
+        idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in document_frequency.items()}
+
+        self.vectors = {}
+        # Terms found in a single document cannot make two items similar.
+        self.postings = defaultdict(dict)
+        for pk, weights in counts.items():
+            vector = {term: (1 + math.log(weight)) * idf[term] for term, weight in weights.items()}
+            norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+            vector = {term: value / norm for term, value in vector.items()}
+            self.vectors[pk] = vector
+            for term, value in vector.items():
+                if document_frequency[term] > 1:
+                    self.postings[term][pk] = value
+
+    def similarities(self, pk):
+        """Cosine similarity of ``pk`` to every item sharing a term with it."""
+        scores = defaultdict(float)
+        for term, value in self.vectors.get(pk, {}).items():
+            for other, other_value in self.postings.get(term, {}).items():
+                if other != pk:
+                    scores[other] += value * other_value
+        return scores
+
+    def top(self, pk, scores):
+        """``[(pk, score), ...]`` of the best RELATED_ITEMS neighbours of ``pk``."""
+        ranked = sorted((other for other, score in scores.items() if score > 0),
+                        key=lambda other: (-scores[other], self.sort_keys[other]))[:RELATED_ITEMS]
+        if len(ranked) < RELATED_ITEMS:
+            chosen = set(ranked) | {pk}
+            fill = [other for other in sorted(self.sort_keys, key=self.sort_keys.__getitem__)
+                    if other not in chosen]
+            ranked += fill[:RELATED_ITEMS - len(ranked)]
+        return [(other, scores.get(other, 0.0)) for other in ranked]
+
+    def all_neighbors(self):
+        try:
+            import numpy
+        except ImportError:
+            return {pk: self.top(pk, self.similarities(pk)) for pk in self.vectors}
+        return self._all_neighbors_numpy(numpy)
+
+    def _all_neighbors_numpy(self, numpy):
+        # Sparse product over the postings: two items only meet through the
+        # terms they share, so no items x terms matrix is ever built. Each
+        # block of rows is scored against every item at once.
+        pks = list(self.vectors)
+        rows = {pk: row for row, pk in enumerate(pks)}
+        postings = {
+            term: (numpy.fromiter((rows[pk] for pk in docs), dtype=numpy.intp, count=len(docs)),
+                   numpy.fromiter(docs.values(), dtype=numpy.float32, count=len(docs)))
+            for term, docs in self.postings.items()
+        }
+        chunk = max(1, min(MATRIX_CHUNK, MATRIX_BLOCK_CELLS // max(1, len(pks))))
+
+        neighbors = {}
+        for start in range(0, len(pks), chunk):
+            block_pks = pks[start:start + chunk]
+            block_terms = defaultdict(lambda: ([], []))
+            for offset, pk in enumerate(block_pks):
+                for term, value in self.vectors[pk].items():
+                    if term in postings:
+                        block_terms[term][0].append(offset)
+                        block_terms[term][1].append(value)
+            block = numpy.zeros((len(block_pks), len(pks)), dtype=numpy.float32)
+            for term, (offsets, values) in block_terms.items():
+                columns, column_values = postings[term]
+                block[numpy.ix_(offsets, columns)] += numpy.outer(
+                    numpy.asarray(values, dtype=numpy.float32), column_values)
+            for offset, row in enumerate(block):
+                pk = block_pks[offset]
+                row[rows[pk]] = 0
+                candidates = numpy.flatnonzero(row > 0)
+                if len(candidates) > RELATED_ITEMS:
+                    # Only scores tied with or above the K-th best can make the list.
+                    kth = numpy.partition(row[candidates], -RELATED_ITEMS)[-RELATED_ITEMS]
+                    candidates = candidates[row[candidates] >= kth]
+                neighbors[pk] = self.top(pk, {pks[i]: float(row[i]) for i in candidates})
+        return neighbors
+
+
+def _write(relation, source, neighbors, current=None):
+    """Store ``neighbors`` for ``source``; returns False when nothing changed."""
+    if current is not None and [target for target, _ in neighbors] == [target for target, _ in current]:
+        return False
+    relation.objects.filter(source_id=source).delete()
+    relation.objects.bulk_create([
+        relation(source_id=source, target_id=target, rank=rank, score=score)
+        for rank, (target, score) in enumerate(neighbors)
+    ])
+    return True
+
+
+def _stored(relation, sources):
+    stored = defaultdict(list)
+    for batch in _batches(sources):
+        for source, target, score in relation.objects.filter(source_id__in=batch).order_by(
+                'source', 'rank').values_list('source_id', 'target_id', 'score'):
+            stored[source].append((target, score))
+    return stored
+
+
+def _lowest_scores(relation, sources):
+    """``{source: (lowest stored score, list length)}`` for ``sources``."""
+    lowest = {}
+    for batch in _batches(sources):
+        for source, score, count in relation.objects.filter(source_id__in=batch).order_by().values(
+                'source_id').annotate(lowest=Min('score'), count=Count('pk')).values_list(
+                'source_id', 'lowest', 'count'):
+            lowest[source] = (score, count)
+    return lowest
+
+
+def detail_paths(model, pks):
+    url_name = f'{KINDS[model]}_detail'
+    return [reverse(url_name, kwargs={'pk': pk}) for pk in pks]
+
+
+def rebuild_related(model):
+    """Recompute every neighbour list of ``model``; returns the number of items."""
+    relation = RELATION_MODELS[model]
+    neighbors = Corpus(model).all_neighbors()
+    with transaction.atomic():
+        relation.objects.all().delete()
+        relation.objects.bulk_create([
+            relation(source_id=source, target_id=target, rank=rank, score=score)
+            for source, targets in neighbors.items()
+            for rank, (target, score) in enumerate(targets)
+        ], batch_size=1000)
+    purge_paths(groups=[f'{KINDS[model]}_detail'])
+    return len(neighbors)
+
+
+def refresh_related(model, pks, listed_on=()):
+    """Update the lists that the change of items ``pks`` can affect.
+
+    Only these are read and recomputed: the items' own lists, the lists
+    that show one of them (``listed_on`` names those of deleted items, whose
+    rows the cascade removed), and the lists one of them now scores high
+    enough to enter. Deleted items are simply absent from the corpus. Purges
+    the detail pages whose related cards changed.
+    """
+    relation = RELATION_MODELS[model]
+    corpus = Corpus(model)
+    pks = set(pks)
+    scores = {pk: corpus.similarities(pk) for pk in pks if pk in corpus.vectors}
+    with transaction.atomic():
+        listing = set(listed_on) | set(
+            relation.objects.filter(target_id__in=pks).values_list('source_id', flat=True))
+        if len(corpus.vectors) <= RELATED_ITEMS + 1:
+            # Lists topped up in catalog order hold every other item.
+            listing |= corpus.vectors.keys()
+        best = defaultdict(float)
+        for item_scores in scores.values():
+            for source, score in item_scores.items():
+                best[source] = max(best[source], score)
+        lowest = _lowest_scores(relation, best.keys() - pks - listing)
+        entered = {source for source, score in best.items() if source in lowest and (
+            lowest[source][1] < RELATED_ITEMS or score > lowest[source][0])}
+        entered |= best.keys() - pks - listing - lowest.keys()
+
+        sources = ((listing | entered) - pks) & corpus.vectors.keys()
+        stored = _stored(relation, pks | sources)
+        changed = set()
+        for pk, item_scores in scores.items():
+            if _write(relation, pk, corpus.top(pk, item_scores), stored.get(pk)):
+                changed.add(pk)
+        for source in sources:
+            if _write(relation, source, corpus.top(source, corpus.similarities(source)), stored.get(source)):
+                changed.add(source)
+
+    if changed:
+        purge_paths(detail_paths(model, changed))
+    return changed
+
+
+def listed_on(instance):
+    """Pks of the items that show ``instance`` among their related cards."""
+    relation = RELATION_MODELS[type(instance)]
+    return list(relation.objects.filter(target_id=instance.pk).values_list('source_id', flat=True))
+
+
+def related_cards(model, pk):
+    """Cards of the stored neighbours of ``pk``, best first."""
+    cards = list(model.objects.cards().filter(neighbor_of__source_id=pk).order_by('neighbor_of__rank'))
+    if not cards:
+        # Lists not built yet (run build_related_items); fall back to catalog order.
+        cards = list(model.objects.cards().exclude(pk=pk)[:RELATED_ITEMS])
+    return cards
@@ -0,0 +1,204 @@
+"""
+Save-time processing of CKEditor HTML.
+
+Each rich-text field is sanitised against an allowlist once, when the row
+is saved, and stored in a ``<field>_html`` column that templates output
+as-is. Embedded images from MEDIA_URL are rewritten to lazy-loaded
+<picture> markup over their renditions. A plain-text copy of the bodies goes
+to ``search_text`` for search and snippets.
+"""
+import html
+import re
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+
+from .images import picture_html, renditions_for
+from .models import HeroSection, Service, Training
+
+RICH_TEXT_FIELDS = {
+    Service: ('full_description', 'features', 'specialties'),
+    Training: ('full_description', 'features', 'curriculum'),
+    HeroSection: ('description',),
+}
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'cite', 'code', 'col', 'colgroup', 'dd', 'del',
+    'div', 'dl', 'dt', 'em', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i',
+    'img', 'ins', 'kbd', 'li', 'mark', 'ol', 'p', 'pre', 's', 'small', 'span', 'strike', 'strong',
+    'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+VOID_TAGS = {'br', 'col', 'hr', 'img'}
+# Dropped together with everything inside them.
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'form', 'svg', 'math'}
+BLOCK_TAGS = {
+    'blockquote', 'br', 'caption', 'dd', 'div', 'dt', 'figcaption', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'li', 'p', 'pre', 'td', 'th', 'tr',
+}
+
+GLOBAL_ATTRIBUTES = {'class', 'style', 'title', 'dir', 'lang', 'align'}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'target', 'rel', 'name'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'ol': {'start', 'type'},
+    'table': {'border', 'cellpadding', 'cellspacing', 'summary', 'width'},
+    'td': {'colspan', 'rowspan', 'width'},
+    'th': {'colspan', 'rowspan', 'scope', 'width'},
+    'col': {'span', 'width'},
+    'colgroup': {'span', 'width'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+SAFE_URL_SCHEMES = {'', 'http', 'https', 'mailto', 'tel'}
+# Backslashes (CSS escapes such as "\75rl(") and comments could hide the rest.
+UNSAFE_STYLE_RE = re.compile(r'expression|javascript|vbscript|url\s*\(|@import|behavior|-moz-binding|\\|/\*',
+                             re.I)
+# Browsers drop these from URLs before reading the scheme.
+URL_IGNORED_RE = re.compile(r'[\x00\t\n\r]')
+URL_STRIPPED = ''.join(map(chr, range(0x21)))
+WHITESPACE_RE = re.compile(r'\s+')
+
+CONTENT_IMAGE_SIZES = '(min-width: 992px) 66vw, 100vw'
+
+
+def media_source(url):
+    """Storage name of a MEDIA_URL image, or None for anything else."""
+    path = urlsplit(url).path
+    if settings.MEDIA_URL and path.startswith(settings.MEDIA_URL):
+        return unquote(path[len(settings.MEDIA_URL):])
+    return None
+
+
+def _safe_url(value):
+    value = value.strip(URL_STRIPPED)
+    scheme = urlsplit(URL_IGNORED_RE.sub('', value)).scheme.lower()
+    return value if scheme in SAFE_URL_SCHEMES else None
+
+
+class RichTextRenderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.text = []
+        self.open_tags = []
+        self.drop_depth = 0
+        self.media_images = set()
+
+    def _attributes(self, tag, attrs):
+        allowed = GLOBAL_ATTRIBUTES | ALLOWED_ATTRIBUTES.get(tag, set())
+        cleaned = {}
+        for name, value in attrs:
+            name = name.lower()
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            if name == 'style' and UNSAFE_STYLE_RE.search(value):
+                continue
+            cleaned[name] = value
+        if tag == 'a' and cleaned.get('target') == '_blank':
+            cleaned['rel'] = 'noopener noreferrer'
+        return cleaned
+
+    def _image(self, attrs):
+        src = attrs.pop('src', None)
+        if not src:
+            return
+        source = media_source(src)
+        attrs.setdefault('alt', '')
+        attrs['loading'] = 'lazy'
+        attrs['decoding'] = 'async'
+        if source:
+            self.media_images.add(source)
+            info = renditions_for(source)
+            if info and 'width' not in attrs and 'height' not in attrs:
+                attrs['width'] = str(info['width'])
+                attrs['height'] = str(info['height'])
+        self.out.append(picture_html(src, source, sizes=CONTENT_IMAGE_SIZES, **attrs))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        attributes = self._attributes(tag, attrs)
+        if tag == 'img':
+            self._image(attributes)
+            return
+        rendered = ''.join(f' {name}="{html.escape(value)}"' for name, value in attributes.items())
+        self.out.append(f'<{tag}{rendered}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(0, self.drop_depth - 1)
+            return
+        if self.drop_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            current = self.open_tags.pop()
+            self.out.append(f'</{current}>')
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        if self.drop_depth:
+            return
+        self.out.append(html.escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.out.append(f'</{self.open_tags.pop()}>')
+
+
+def render_rich_text(value):
+    """Return ``(safe_html, plain_text, media_image_sources)`` for CKEditor HTML."""
+    renderer = RichTextRenderer()
+    renderer.feed(value or '')
+    renderer.close()
+    text = WHITESPACE_RE.sub(' ', ''.join(renderer.text)).strip()
+    return ''.join(renderer.out), text, renderer.media_images
+
+
+def prepare_rich_text(instance):
+    """Fill the ``*_html`` columns (and ``search_text``) of ``instance``.
+
+    Returns the storage names of the media images embedded in its fields.
+    """
+    texts = []
+    media_images = set()
+    for field in RICH_TEXT_FIELDS.get(type(instance), ()):
+        rendered, text, images = render_rich_text(getattr(instance, field))
+        setattr(instance, f'{field}_html', rendered)
+        texts.append(text)
+        media_images |= images
+    if hasattr(instance, 'search_text'):
+        instance.search_text = '\n'.join(text for text in texts if text)
+    return media_images
+
+
+def rich_text_columns(instance):
+    columns = [f'{field}_html' for field in RICH_TEXT_FIELDS.get(type(instance), ())]
+    if hasattr(instance, 'search_text'):
+        columns.append('search_text')
+    return columns
@@ -0,0 +1,353 @@
+"""
+In-process inverted index behind the live search endpoint.
+
+Services and trainings are tokenised over their name, short description and
+the text of their rich-text bodies. Each field carries a weight, and results
+are ranked with BM25 over the weighted term frequencies. The last query term
+is matched as a prefix against a sorted vocabulary, so type-ahead queries
+such as "pyth" find "python".
+
+Alongside the index each document keeps its ready-made JSON payload and
+its name words in a prefix trie, so type-ahead answers are assembled
+without touching the database. Serialised responses are kept in a bounded
+LRU keyed by the normalised query.
+
+Each worker builds the index lazily on first use. A published index is
+never changed: saves and deletes apply to a copy that shares the untouched
+postings and trie nodes, swap it in, and bump a shared generation counter,
+which makes the other workers rebuild on their next search.
+"""
+import heapq
+import html
+import json
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.html import strip_tags
+
+from .autocomplete import LRUCache, PrefixTrie
+from .cache import aget_generation, bump_generation, get_generation
+from .images import prefetch_renditions, thumbnail_url
+from .models import Service, Training
+
+SEARCH_GENERATION_KEY = 'website:search:generation'
+
+FIELD_WEIGHTS = {
+    'name': 4.0,
+    'short_description': 2.0,
+    'body': 1.0,
+}
+BODY_FIELDS = {
+    'service': ('full_description', 'features', 'specialties'),
+    'training': ('full_description', 'features', 'curriculum'),
+}
+MODELS = {'service': Service, 'training': Training}
+
+RESULTS_PER_KIND = 5
+RESPONSE_CACHE_SIZE = getattr(settings, 'LIVE_SEARCH_CACHE_SIZE', 2048)
+MAX_PREFIX_EXPANSIONS = 50
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def html_to_text(value):
+    return html.unescape(strip_tags(value or ''))
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '').lower()
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return TOKEN_RE.findall(text)
+
+
+def kind_of(instance):
+    return 'service' if isinstance(instance, Service) else 'training'
+
+
+def normalize_query(query):
+    return ' '.join(tokenize(query))
+
+
+def build_payload(kind, instance):
+    return {
+        'type': kind,
+        'id': instance.pk,
+        'name': instance.name,
+        'description': instance.short_description,
+        'url': instance.get_absolute_url(),
+        # The result list shows 60px thumbnails; 120w covers 2x screens.
+        'image': thumbnail_url(instance.image, 120),
+    }
+
+
+def document_fields(kind, instance):
+    body = instance.search_text
+    if not body:
+        # Rows saved before search_text existed.
+        body = ' '.join(html_to_text(getattr(instance, field)) for field in BODY_FIELDS[kind])
+    return {
+        'name': instance.name,
+        'short_description': instance.short_description,
+        'body': body,
+    }
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.payloads = {}
+        self.sort_keys = {}
+        self.names = PrefixTrie()
+        self.name_words = {}
+        self.responses = LRUCache(RESPONSE_CACHE_SIZE)
+        self._terms = None
+        # Terms whose posting dict this index may change; None means all of them.
+        self._owned_terms = None
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def copy(self):
+        """An index to apply updates to while requests keep reading this one.
+
+        Posting dicts and trie nodes stay shared until the copy changes them.
+        """
+        clone = SearchIndex()
+        clone.postings = defaultdict(dict, self.postings)
+        clone.doc_terms = dict(self.doc_terms)
+        clone.doc_lengths = dict(self.doc_lengths)
+        clone.payloads = dict(self.payloads)
+        clone.sort_keys = dict(self.sort_keys)
+        clone.names = self.names.copy()
+        clone.name_words = dict(self.name_words)
+        clone._owned_terms = set()
+        return clone
+
+    def _docs(self, term):
+        docs = self.postings[term]
+        if self._owned_terms is not None and term not in self._owned_terms:
+            docs = self.postings[term] = dict(docs)
+            self._owned_terms.add(term)
+        return docs
+
+    def add(self, kind, instance):
+        key = (kind, instance.pk)
+        self.remove(key)
+
+        weights = defaultdict(float)
+        for field, text in document_fields(kind, instance).items():
+            for token in tokenize(text):
+                weights[token] += FIELD_WEIGHTS[field]
+
+        for term, weight in weights.items():
+            self._docs(term)[key] = weight
+        self.doc_terms[key] = tuple(weights)
+        self.doc_lengths[key] = sum(weights.values())
+
+        words = set(tokenize(instance.name))
+        for word in words:
+            self.names.insert(word, key)
+        self.name_words[key] = words
+        self.payloads[key] = build_payload(kind, instance)
+        self.sort_keys[key] = (instance.order, instance.name.lower(), instance.pk)
+        self._terms = None
+        self.responses.clear()
+
+    def remove(self, key):
+        for term in self.doc_terms.pop(key, ()):
+            docs = self._docs(term)
+            docs.pop(key, None)
+            if not docs:
+                del self.postings[term]
+        self.doc_lengths.pop(key, None)
+
+        for word in self.name_words.pop(key, ()):
+            self.names.remove(word, key)
+        self.payloads.pop(key, None)
+        self.sort_keys.pop(key, None)
+        self._terms = None
+        self.responses.clear()
+
+    @property
+    def terms(self):
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        return self._terms
+
+    def expand_prefix(self, prefix):
+        terms = self.terms
+        start = bisect_left(terms, prefix)
+        matches = []
+        for term in terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def _idf(self, term):
+        n = len(self.doc_terms)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _score_term(self, term, avg_length):
+        scores = {}
+        idf = self._idf(term)
+        for key, tf in self.postings.get(term, {}).items():
+            norm = 1 - BM25_B + BM25_B * self.doc_lengths[key] / avg_length
+            scores[key] = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+        return scores
+
+    def search(self, query, limit=5):
+        """Return ``{'service': [pk, ...], 'training': [pk, ...]}`` ranked by relevance.
+
+        Every query term has to match; the last one may match as a prefix.
+        """
+        tokens = tokenize(query)
+        results = {kind: [] for kind in MODELS}
+        if not tokens or not self.doc_terms:
+            return results
+
+        avg_length = sum(self.doc_lengths.values()) / len(self.doc_lengths) or 1.0
+        totals = None
+        for position, token in enumerate(tokens):
+            if position == len(tokens) - 1:
+                candidates = self.expand_prefix(token)
+            else:
+                candidates = [token] if token in self.postings else []
+
+            token_scores = {}
+            for term in candidates:
+                for key, score in self._score_term(term, avg_length).items():
+                    if score > token_scores.get(key, 0):
+                        token_scores[key] = score
+
+            if totals is None:
+                totals = token_scores
+            else:
+                totals = {key: totals[key] + score for key, score in token_scores.items() if key in totals}
+            if not totals:
+                return results
+
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        for (kind, pk), _score in ranked:
+            if len(results[kind]) < limit:
+                results[kind].append(pk)
+        return results
+
+    def name_matches(self, kind, tokens, limit=5):
+        """Ids of ``kind`` whose name has a word starting with every token, in catalog order."""
+        keys = None
+        for token in tokens:
+            found = self.names.lookup(token)
+            keys = {key for key in found if key[0] == kind} if keys is None else keys & found
+            if not keys:
+                return []
+        return [pk for _kind, pk in heapq.nsmallest(limit, keys, key=self.sort_keys.__getitem__)]
+
+    def live_search(self, query):
+        """Return the serialised ``/api/search/`` response body for ``query``.
+
+        Name-prefix matches come first, followed by full-text hits, with at
+        most ``RESULTS_PER_KIND`` results per type.
+        """
+        normalized = normalize_query(query)
+        body = self.responses.get(normalized)
+        if body is not None:
+            return body
+
+        results = []
+        if normalized:
+            tokens = normalized.split()
+            hits = self.search(normalized, limit=RESULTS_PER_KIND)
+            for kind in MODELS:
+                ordered = self.name_matches(kind, tokens, limit=RESULTS_PER_KIND)
+                ordered += [pk for pk in hits[kind] if pk not in ordered]
+                results.extend(self.payloads[(kind, pk)] for pk in ordered[:RESULTS_PER_KIND])
+
+        body = json.dumps({'results': results}).encode()
+        self.responses.set(normalized, body)
+        return body
+
+
+def build_index():
+    index = SearchIndex()
+    # The plain-text search_text is enough; skip the rich-text HTML columns.
+    instances = {kind: list(model.objects.only(*model.CARD_FIELDS, 'search_text')) for kind, model in MODELS.items()}
+    prefetch_renditions(*instances.values())
+    for kind, items in instances.items():
+        for instance in items:
+            index.add(kind, instance)
+    return index
+
+
+_lock = threading.Lock()
+_state = {'generation': None, 'index': None}
+
+
+def get_search_index():
+    # Take a reference first: an update may drop the shared index at any time.
+    generation = get_generation(SEARCH_GENERATION_KEY)
+    index = _state['index']
+    if index is not None and _state['generation'] == generation:
+        return index
+
+    with _lock:
+        index = _state['index']
+        if index is None or _state['generation'] != generation:
+            index = build_index()
+            _state['index'] = index
+            _state['generation'] = generation
+        return index
+
+
+async def aget_search_index():
+    generation = await aget_generation(SEARCH_GENERATION_KEY)
+    index = _state['index']
+    if index is not None and _state['generation'] == generation:
+        return index
+    return await sync_to_async(get_search_index)()
+
+
+def _apply(change):
+    with _lock:
+        index = _state['index']
+        generation = bump_generation(SEARCH_GENERATION_KEY)
+        if index is not None and _state['generation'] == generation - 1:
+            # Requests may be reading the published index: change a copy and
+            # swap it in, so they only ever see a finished one.
+            index = index.copy()
+            change(index)
+            _state['index'] = index
+            _state['generation'] = generation
+        else:
+            _state['index'] = None
+            _state['generation'] = None
+
+
+def index_instance(instance):
+    kind = kind_of(instance)
+    _apply(lambda index: index.add(kind, instance))
+
+
+def unindex_instance(instance, pk=None):
+    # Deleted instances have lost their pk by the time on_commit runs.
+    key = (kind_of(instance), pk if pk is not None else instance.pk)
+    _apply(lambda index: index.remove(key))
+
+
+def rebuild_search_index():
+    index = build_index()
+    with _lock:
+        _state['index'] = index
+        _state['generation'] = bump_generation(SEARCH_GENERATION_KEY)
+    return index
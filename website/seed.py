@@ -0,0 +1,185 @@
+"""
+Synthetic scale data for benchmarks.
+
+Rows are generated from a fixed vocabulary with a seeded random generator,
+so the same arguments always produce the same catalog. Everything is
+written with bulk_create in batches and tagged (``SEED_PREFIX`` names,
+``SEED_EMAIL_DOMAIN`` addresses) so ``clear_seeded`` removes what was
+seeded, along with the contacts posted by the load test. The tags are all it
+goes by: a real service named "Seed ..." would go too, which is why the
+command asks for ``--yes`` unless DEBUG is on. Afterwards the rich text,
+search index, related items and page cache are brought up to date as after
+a bulk import.
+"""
+import random
+
+from django.db import connections, transaction
+
+from .models import (
+    Contact, ContactNameSuffix, OutboundEmail, Service, Testimonial, Training, TrustedCompany, sync_name_suffixes,
+)
+from .related import RELATION_MODELS
+from .richtext import prepare_rich_text
+from .transfer import after_import
+
+SEED_PREFIX = 'Seed '
+SEED_EMAIL_DOMAIN = 'seed.example.com'
+BATCH_SIZE = 2000
+
+ADJECTIVES = (
+    'Advanced', 'Applied', 'Cloud', 'Managed', 'Secure', 'Scalable', 'Modern', 'Practical', 'Enterprise',
+    'Agile', 'Automated', 'Hybrid', 'Intelligent', 'Mobile', 'Open', 'Realtime',
+)
+TOPICS = (
+    'Python', 'Django', 'Kubernetes', 'Data', 'Network', 'Security', 'DevOps', 'Analytics', 'Database',
+    'Machine Learning', 'Web', 'API', 'Testing', 'Linux', 'Cloud Native', 'Frontend',
+)
+NOUNS = (
+    'Development', 'Consulting', 'Engineering', 'Migration', 'Architecture', 'Operations', 'Bootcamp',
+    'Workshop', 'Audit', 'Support', 'Design', 'Integration',
+)
+FIRST_NAMES = ('Anu', 'Arjun', 'Divya', 'Fatima', 'George', 'Hari', 'Leena', 'Manu', 'Nisha', 'Rahul',
+               'Sara', 'Vivek', 'Joseph', 'Meera', 'Kiran', 'Asha')
+LAST_NAMES = ('Nair', 'Menon', 'Thomas', 'Pillai', 'Varghese', 'Kurian', 'Iyer', 'Das', 'Khan', 'Joseph')
+LEVELS = ('beginner', 'intermediate', 'advanced')
+WORDS = tuple(word.lower() for word in ADJECTIVES + TOPICS + NOUNS)
+
+
+def _title(rng):
+    return f'{rng.choice(ADJECTIVES)} {rng.choice(TOPICS)} {rng.choice(NOUNS)}'
+
+
+def _sentence(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + '.'
+
+
+def _paragraphs(rng, count):
+    return ''.join(f'<p>{_sentence(rng, 30, 80)}</p>' for _ in range(count))
+
+
+def _list(rng, count):
+    return '<ul>' + ''.join(f'<li>{_title(rng)}</li>' for _ in range(count)) + '</ul>'
+
+
+def _service(rng, i):
+    service = Service(
+        name=f'{SEED_PREFIX}{_title(rng)} {i}', short_description=_sentence(rng, 10, 25),
+        full_description=_paragraphs(rng, rng.randint(3, 8)), features=_list(rng, 6), specialties=_list(rng, 4),
+        image=f'services/seed-{i % 50}.jpg', is_featured=rng.random() < 0.1, order=rng.randint(0, 20),
+    )
+    prepare_rich_text(service)
+    return service
+
+
+def _training(rng, i):
+    training = Training(
+        name=f'{SEED_PREFIX}{_title(rng)} {i}', short_description=_sentence(rng, 10, 25),
+        full_description=_paragraphs(rng, rng.randint(3, 8)), features=_list(rng, 6), curriculum=_list(rng, 12),
+        image=f'trainings/seed-{i % 50}.jpg', duration=f'{rng.randint(1, 12)} weeks', level=rng.choice(LEVELS),
+        is_featured=rng.random() < 0.1, order=rng.randint(0, 20),
+    )
+    prepare_rich_text(training)
+    return training
+
+
+def _company(rng, i):
+    return TrustedCompany(name=f'{SEED_PREFIX}company {i}', logo=f'companies/seed-{i % 20}.png',
+                          website_url=f'https://company{i}.example.com', order=i)
+
+
+def _testimonial(rng, i):
+    return Testimonial(
+        name=f'{SEED_PREFIX}{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', designation='CTO',
+        company=f'Company {i}', review=_sentence(rng, 15, 40), rating=rng.randint(3, 5),
+        is_featured=rng.random() < 0.2, order=i,
+    )
+
+
+def _contact(rng, i):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    contact = Contact(
+        full_name=f'{first} {last}', email=f'{first.lower()}.{last.lower()}{i}@{SEED_EMAIL_DOMAIN}',
+        phone_number=f'+91 9{rng.randint(100000000, 999999999)}', message=_sentence(rng, 10, 60),
+        status=rng.choices(('new', 'in_progress', 'completed'), weights=(6, 1, 3))[0],
+    )
+    contact.set_search_keys()
+    return contact
+
+
+SEEDERS = {
+    'services': (Service, _service),
+    'trainings': (Training, _training),
+    'companies': (TrustedCompany, _company),
+    'testimonials': (Testimonial, _testimonial),
+    'contacts': (Contact, _contact),
+}
+
+
+def is_seeded_contact(contact):
+    return contact.email.lower().endswith(f'@{SEED_EMAIL_DOMAIN}')
+
+
+def seeded(model):
+    if model is Contact:
+        return Contact.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}')
+    return model.objects.filter(name__startswith=SEED_PREFIX)
+
+
+def _delete_rows(queryset):
+    """Delete the rows of ``queryset`` with one SQL DELETE; returns the count.
+
+    Unlike QuerySet.delete() this neither collects the rows in memory nor
+    sends the per-row delete signals, and it cascades nothing: callers remove
+    the dependent rows first.
+    """
+    meta = queryset.model._meta
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    subquery, params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {quote(meta.db_table)} WHERE {quote(meta.pk.column)} IN ({subquery})', params)
+        return cursor.rowcount
+
+
+def clear_seeded():
+    """Delete every seeded row; returns ``{kind: rows deleted}``."""
+    deleted = {}
+    for kind, (model, _) in SEEDERS.items():
+        queryset = seeded(model)
+        with transaction.atomic():
+            if model in RELATION_MODELS:
+                relation = RELATION_MODELS[model].objects
+                relation.filter(source__in=queryset).delete()
+                relation.filter(target__in=queryset).delete()
+            if model is Contact:
+                OutboundEmail.objects.filter(contact__in=queryset).update(contact=None)
+                ContactNameSuffix.objects.filter(contact__in=queryset).delete()
+            # after_import redoes the skipped delete signals' work once for
+            # the whole model.
+            deleted[kind] = _delete_rows(queryset)
+        if deleted[kind]:
+            after_import(model, set())
+    return deleted
+
+
+def seed(counts, seed=0, batch_size=BATCH_SIZE, progress=None):
+    """Create ``counts[kind]`` rows per kind of SEEDERS.
+
+    Each kind draws from its own generator, so changing one count leaves the
+    other kinds' rows unchanged. ``progress(kind, done, total)`` is called
+    after every batch.
+    """
+    for kind, (model, build) in SEEDERS.items():
+        total = counts.get(kind, 0)
+        if not total:
+            continue
+        rng = random.Random(f'{seed}:{kind}')
+        for start in range(0, total, batch_size):
+            rows = [build(rng, i) for i in range(start, min(start + batch_size, total))]
+            with transaction.atomic():
+                model.objects.bulk_create(rows, batch_size=batch_size)
+                if model is Contact:
+                    sync_name_suffixes(rows)
+            if progress:
+                progress(kind, start + len(rows), total)
+        after_import(model, set())
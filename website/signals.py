@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_site_settings, invalidate_trusted_companies
+from .images import generate_for_instance, generate_for_sources, run_in_background
+from .models import Contact, HeroSection, Service, SiteSettings, Testimonial, Training, TrustedCompany
+from .outbox import enqueue_contact_notification
+from .page_cache import affected_paths, purge_all, purge_paths
+from .pagination import forget_listing_count
+from .related import detail_paths, listed_on, refresh_related
+from .richtext import prepare_rich_text, rich_text_columns
+from .search import index_instance, unindex_instance
+from .seed import is_seeded_contact
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+def site_settings_changed(sender, **kwargs):
+    invalidate_site_settings()
+    purge_all()
+
+
+@receiver(pre_save, sender=Service)
+@receiver(pre_save, sender=Training)
+@receiver(pre_save, sender=HeroSection)
+def render_rich_text_fields(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._embedded_images = prepare_rich_text(instance)
+
+
+@receiver(pre_delete, sender=Service)
+@receiver(pre_delete, sender=Training)
+def remember_related_listings(sender, instance, **kwargs):
+    # The cascade removes the rows that say where the item is listed.
+    instance._listed_on = listed_on(instance)
+
+
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=Training)
+def catalog_item_changed(sender, instance, created=True, **kwargs):
+    listing_pages = getattr(instance, '_listed_on', None)
+    if listing_pages is None:
+        listing_pages = listed_on(instance)
+    if created:
+        # The listing's page-number links come from this count.
+        forget_listing_count(sender)
+    purge_paths(affected_paths(instance) + detail_paths(sender, listing_pages))
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Training)
+def catalog_item_saved(sender, instance, raw=False, **kwargs):
+    transaction.on_commit(lambda: index_instance(instance))
+    if not raw:
+        transaction.on_commit(lambda: run_in_background(refresh_related, sender, [instance.pk]))
+
+
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=Training)
+def catalog_item_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: unindex_instance(instance, pk))
+    listing_pages = getattr(instance, '_listed_on', ())
+    transaction.on_commit(lambda: run_in_background(refresh_related, sender, [pk], listing_pages))
+
+
+@receiver([post_save, post_delete], sender=HeroSection)
+@receiver([post_save, post_delete], sender=TrustedCompany)
+@receiver([post_save, post_delete], sender=Testimonial)
+def home_content_changed(sender, instance, **kwargs):
+    purge_paths(affected_paths(instance))
+
+
+@receiver([post_save, post_delete], sender=TrustedCompany)
+def trusted_company_changed(sender, **kwargs):
+    invalidate_trusted_companies()
+
+
+@receiver(post_save, sender=Contact)
+def contact_created(sender, instance, created, raw=False, **kwargs):
+    # Seeded and load-test contacts have nobody to notify.
+    if created and not raw and not is_seeded_contact(instance):
+        enqueue_contact_notification(instance)
+
+
+def _build_renditions(instance):
+    model = type(instance)
+    written = generate_for_instance(instance)
+
+    embedded = getattr(instance, '_embedded_images', ())
+    rerender = bool(embedded) and generate_for_sources(embedded) > 0
+    if not (written or rerender):
+        return
+
+    # The row may have been saved again since this job was queued. Work from
+    # its current state, never from the instance captured at save time.
+    current = model.objects.filter(pk=instance.pk).first()
+    if current is None:
+        return
+    if rerender:
+        # Re-render so the embedded <img> tags pick up their new srcset, and
+        # write only if nobody saved the row while we were rendering.
+        prepare_rich_text(current)
+        columns = rich_text_columns(current)
+        model.objects.filter(pk=current.pk, updated_at=current.updated_at).update(
+            **{c: getattr(current, c) for c in columns})
+
+    if isinstance(current, TrustedCompany):
+        invalidate_trusted_companies()
+    purge_paths(affected_paths(current))
+    if isinstance(current, (Service, Training)):
+        # Refresh the search payload so type-ahead picks up the thumbnail.
+        index_instance(current)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Training)
+@receiver(post_save, sender=TrustedCompany)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_save, sender=HeroSection)
+def image_owner_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: run_in_background(_build_renditions, instance))
@@ -0,0 +1,216 @@
+"""
+Static snapshot of the public site.
+
+Every public page is rendered through the normal request stack into
+``<root>/<path>/index.html``, with gzip and (when the ``brotli`` package is
+installed) brotli variants next to it. A web server can then answer the
+site straight from disk and pass only ``/api/search/``, ``/contact/``,
+``/admin/`` and the brochure downloads on to Django, e.g. with nginx::
+
+    location / {
+        root /srv/zynder/snapshot;
+        gzip_static on;
+        brotli_static on;
+        try_files $uri $uri/index.html @django;
+    }
+
+Listing pages are written as ``services/page/2/`` and their pagination
+links are rewritten to match, since a static tree cannot follow cursors.
+The contact forms are saved without their CSRF and render-time tokens;
+base.js fetches fresh ones from ``/contact/token/``.
+
+A manifest records the page cache versions each page was rendered under.
+The model signals already bump those versions for exactly the pages a change
+affects, so a later run re-renders only pages whose versions moved, plus new
+ones, and removes pages that no longer exist. This needs the cache shared
+with the web processes; with a per-process cache every run renders all pages.
+Files whose content did not change are not rewritten.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from html import unescape
+from pathlib import Path
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from .models import Service, Training
+from .page_cache import CSRF_INPUT_RE, path_versions
+from .pagination import LISTING_PAGE_SIZE, decode_cursor
+from .throttle import TOKEN_FIELD
+
+SNAPSHOT_ROOT = getattr(settings, 'SNAPSHOT_ROOT', settings.BASE_DIR / 'snapshot')
+MANIFEST_NAME = '.snapshot.json'
+# Only worth keeping a compressed variant that is noticeably smaller.
+MIN_COMPRESSED_RATIO = 0.95
+
+FORM_TOKEN_RE = re.compile(rb'(name="%s" value=")[^"]*(")' % TOKEN_FIELD.encode())
+PAGE_LINK_RE = re.compile(rb'href="\?(cursor|page)=([^"&]+)"')
+
+
+def default_host():
+    """First concrete ALLOWED_HOSTS entry, so the pages render with a real domain."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def listing_path(name, number):
+    path = reverse(name)
+    return path if number == 1 else f'{path}page/{number}/'
+
+
+def snapshot_routes():
+    """``(static path, request path, URL name)`` for every public page."""
+    routes = [(reverse(name), reverse(name), name) for name in ('home', 'terms', 'privacy', 'refund')]
+    for model, name, detail in ((Service, 'services', 'service_detail'), (Training, 'trainings', 'training_detail')):
+        pks = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        pages = max(1, -(-len(pks) // LISTING_PAGE_SIZE))
+        for number in range(1, pages + 1):
+            routes.append((listing_path(name, number), f'{reverse(name)}?page={number}', name))
+        for pk in pks:
+            path = reverse(detail, kwargs={'pk': pk})
+            routes.append((path, path, detail))
+    return routes
+
+
+def _link_rewriter(name):
+    def rewrite(match):
+        kind, value = match.group(1).decode(), unescape(match.group(2).decode())
+        if kind == 'cursor':
+            cursor = decode_cursor(value)
+            if cursor is None:
+                return match.group(0)
+            number = cursor[1]
+        else:
+            try:
+                number = max(1, int(value))
+            except ValueError:
+                return match.group(0)
+        return b'href="%s"' % listing_path(name, number).encode()
+    return rewrite
+
+
+def static_content(content, name):
+    """Strip per-visitor tokens from a rendered page and fix its pagination links."""
+    content = CSRF_INPUT_RE.sub(rb'\1\2', content)
+    content = FORM_TOKEN_RE.sub(rb'\1\2', content)
+    if name in ('services', 'trainings'):
+        content = PAGE_LINK_RE.sub(_link_rewriter(name), content)
+    return content
+
+
+def _compressed(content):
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['.br'] = brotli.compress(content, mode=brotli.MODE_TEXT)
+    return {suffix: data for suffix, data in variants.items()
+            if len(data) < len(content) * MIN_COMPRESSED_RATIO}
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.chmod(temp, 0o644)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def _page_file(root, static_path):
+    return root / static_path.strip('/') / 'index.html'
+
+
+def _write_page(root, static_path, content):
+    """Write the page and its compressed variants; returns the file names."""
+    target = _page_file(root, static_path)
+    _write_atomic(target, content)
+    written = [target]
+    variants = _compressed(content)
+    for suffix in ('.gz', '.br'):
+        variant = target.with_name(target.name + suffix)
+        if suffix in variants:
+            _write_atomic(variant, variants[suffix])
+            written.append(variant)
+        elif variant.exists():
+            variant.unlink()
+    return [str(path.relative_to(root)) for path in written]
+
+
+def _remove_page(root, entry):
+    for name in entry.get('files', []):
+        path = root / name
+        if path.exists():
+            path.unlink()
+        parent = path.parent
+        while parent != root and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+
+def read_manifest(root):
+    try:
+        return json.loads((root / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def export_snapshot(root=None, host=None, full=False):
+    """Bring the snapshot under ``root`` up to date.
+
+    Returns counts of pages ``rendered``, ``written`` (content changed),
+    ``unchanged`` (versions unchanged, not rendered), ``removed`` and
+    ``failed`` (non-200 responses, left out of the snapshot).
+    """
+    root = Path(root or SNAPSHOT_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = {} if full else read_manifest(root)
+    client = Client(HTTP_HOST=host or default_host())
+    stats = dict.fromkeys(('rendered', 'written', 'unchanged', 'removed', 'failed'), 0)
+    pages = {}
+
+    for static_path, request_path, name in snapshot_routes():
+        # Read before rendering: a change made meanwhile moves them again.
+        versions = path_versions(request_path.split('?')[0], name)
+        entry = manifest.get(static_path)
+        if entry and entry['versions'] == versions and all((root / f).exists() for f in entry['files']):
+            pages[static_path] = entry
+            stats['unchanged'] += 1
+            continue
+
+        response = client.get(request_path)
+        stats['rendered'] += 1
+        if response.status_code != 200:
+            stats['failed'] += 1
+            continue
+        content = static_content(response.content, name)
+        digest = hashlib.sha256(content).hexdigest()
+        if entry and entry['sha256'] == digest and all((root / f).exists() for f in entry['files']):
+            files = entry['files']
+        else:
+            files = _write_page(root, static_path, content)
+            stats['written'] += 1
+        pages[static_path] = {'versions': versions, 'sha256': digest, 'files': files}
+
+    for static_path, entry in read_manifest(root).items():
+        if static_path not in pages:
+            _remove_page(root, entry)
+            stats['removed'] += 1
+
+    _write_atomic(root / MANIFEST_NAME, json.dumps(pages, indent=1, sort_keys=True).encode())
+    return stats
+
@@ -0,0 +1,13 @@
+from django import template
+from django.templatetags.static import static
+
+from website.assets import VENDOR_ASSETS, self_hosted
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_url(name):
+    """URL of a third-party asset: the vendored static copy or the CDN original."""
+    cdn_url, static_path = VENDOR_ASSETS[name]
+    return static(static_path) if self_hosted() else cdn_url
@@ -0,0 +1,16 @@
+from django import template
+from django.utils.html import format_html
+
+from website.throttle import HONEYPOT_FIELD, TOKEN_FIELD, issue_form_token
+
+register = template.Library()
+
+
+@register.simple_tag
+def contact_form_guard():
+    """Honeypot and render-time fields checked by website.throttle.looks_automated."""
+    return format_html(
+        '<div class="d-none" aria-hidden="true"><input type="text" name="{}" tabindex="-1" autocomplete="off"></div>'
+        '<input type="hidden" name="{}" value="{}">',
+        HONEYPOT_FIELD, TOKEN_FIELD, issue_form_token(),
+    )
@@ -0,0 +1,31 @@
+from django import template
+
+from website.images import picture_html, prefetch_renditions as _prefetch_renditions
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', loading='lazy', **attrs):
+    """Render ``image`` as a <picture> with srcset/sizes over its renditions.
+
+    Usage::
+
+        {% responsive_image service.image alt=service.name sizes="(min-width: 992px) 33vw, 100vw" class="card-img-top" %}
+
+    Falls back to a plain <img> until the renditions have been generated.
+    """
+    if not image:
+        return ''
+    return picture_html(image.url, image.name, sizes=sizes, alt=alt, loading=loading, decoding='async', **attrs)
+
+
+@register.simple_tag
+def prefetch_renditions(*collections):
+    """Look up the renditions for every image in ``collections`` with one query.
+
+    For lists rendered inside a ``{% cache %}`` fragment, whose queryset the
+    view leaves unevaluated so that a cache hit costs no query.
+    """
+    _prefetch_renditions(*collections)
+    return ''
@@ -1,3 +1,1709 @@
-from django.test import TestCase
+import html
+import importlib
+import io
+import json
+import math
+import os
+import re
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.template import Context, Template
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import QueryDict
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import async_views, cache as site_cache, images, outbox, related, search, signals, views
+from .assets import VENDOR_ASSETS
+from .autocomplete import LRUCache, PrefixTrie
+from .cache import SITE_SETTINGS_GENERATION_KEY, get_site_settings
+from .management.commands import build_assets
+from .models import (
+    Contact, ContactNameSuffix, HeroSection, OutboundEmail, RelatedService, Service, SiteSettings, Testimonial,
+    Training, TrustedCompany,
+)
+from .page_cache import page_cache_stats, purge_all
+from .pagination import LISTING_PAGE_SIZE, encode_cursor, paginate_listing
+from . import metrics, urls as website_urls
+from . import benchmarks, downloads, loadtest, seed, snapshot
+from .related import Corpus, rebuild_related, refresh_related
+from .richtext import prepare_rich_text
+from .throttle import CONTACT_FORM_MAX_AGE, TOKEN_SALT
+from .transfer import ImportRowError, export_lines, import_rows, read_rows
+
+# The manifest storage needs collectstatic; tests render with plain storage.
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def reset_caches():
+    cache.clear()
+    # The SiteSettings row and the search index live in process memory,
+    # next to their generations.
+    site_cache._local.update(generation=None, value=None)
+    search._state.update(index=None, generation=None)
+    related._term_weights.clear()
+
+
+def create_catalog():
+    SiteSettings.objects.create(site_name='Zynder Tech', phone_number='1', email='info@example.com',
+                                address='Kochi')
+    HeroSection.objects.create(title='Hero', subtitle='Sub', description='<p>Hero</p>')
+    for i in range(12):
+        Service.objects.create(name=f'Service {i}', short_description='Short', full_description='<p>Body</p>',
+                               image='services/s.jpg', is_featured=i % 2 == 0, order=i % 4)
+        Training.objects.create(name=f'Training {i}', short_description='Short', full_description='<p>Body</p>',
+                                image='trainings/t.jpg', is_featured=i % 2 == 0, order=i % 4)
+    for i in range(4):
+        TrustedCompany.objects.create(name=f'Company {i}', logo='companies/c.png', order=i)
+        Testimonial.objects.create(name=f'Person {i}', designation='CTO', review='Great', is_featured=True, order=i)
+        Contact.objects.create(full_name=f'Person {i}', email='p@example.com', phone_number='1', message='Hi')
+    rebuild_related(Service)
+    rebuild_related(Training)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SiteSettingsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def setUp(self):
+        reset_caches()
+
+    def rename(self, name):
+        site_settings = SiteSettings.objects.get()
+        site_settings.site_name = name
+        site_settings.save()
+
+    def test_save_changes_next_request(self):
+        self.assertContains(self.client.get(reverse('home')), '<title>Zynder Tech')
+        with self.assertNumQueries(0):
+            get_site_settings()
+        self.rename('Zynder Labs')
+        self.assertContains(self.client.get(reverse('home')), '<title>Zynder Labs')
+
+    def test_evicted_generation_is_not_reused(self):
+        first = get_site_settings()
+        self.assertEqual(first.site_name, 'Zynder Tech')
+        self.rename('Zynder Labs')
+        # The cache loses the counter, but still holds the first generation's row.
+        cache.delete(SITE_SETTINGS_GENERATION_KEY)
+        site_cache._local.update(generation=None, value=None)
+        self.assertEqual(get_site_settings().site_name, 'Zynder Labs')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteSettings.objects.create(site_name='Zynder Tech', phone_number='1', email='info@example.com')
+        # No related lists, so a save purges only the item's own pages.
+        cls.services = [
+            Service.objects.create(name=f'Service {i}', short_description='Short', full_description='<p>Body</p>',
+                                   image='services/s.jpg', order=i)
+            for i in range(3)
+        ]
+        cls.training = Training.objects.create(name='Training', short_description='Short',
+                                               full_description='<p>Body</p>', image='trainings/t.jpg')
+
+    def setUp(self):
+        reset_caches()
+        self.paths = [reverse('home'), reverse('services'), reverse('trainings'), reverse('terms'),
+                      self.training.get_absolute_url()] + [service.get_absolute_url() for service in self.services]
+
+    def cache_states(self):
+        return {path: self.client.get(path)['X-Page-Cache'] for path in self.paths}
+
+    def test_save_purges_only_affected_pages(self):
+        self.cache_states()
+        self.assertEqual(set(self.cache_states().values()), {'HIT'})
+
+        service = self.services[1]
+        service.short_description = 'Changed'
+        service.save()
+        purged = {path for path, state in self.cache_states().items() if state == 'MISS'}
+        self.assertEqual(purged, {service.get_absolute_url(), reverse('services'), reverse('home')})
+
+    def test_hit_gets_fresh_form_token(self):
+        url = reverse('home')
+        self.client.get(url)
+        tokens = []
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response['X-Page-Cache'], 'HIT')
+            tokens.append(re.search(r'name="form_token" value="([^"]+)"', response.content.decode()).group(1))
+        self.assertNotEqual(tokens[0], tokens[1])
+        for token in tokens:
+            self.assertGreater(signing.loads(token, salt=TOKEN_SALT), time.time() - 60)
+
+    def test_session_bypasses_cache(self):
+        url = reverse('services')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'HIT')
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'session'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertEqual(page_cache_stats(['services'])['services'],
+                         {'hit': 1, 'miss': 1, 'bypass': 1})
+
+    def test_csrf_token_swapped_on_hit(self):
+        url = reverse('home')
+        tokens = []
+        for _ in range(2):
+            self.client.cookies.clear()
+            response = self.client.get(url)
+            tokens.append(re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode())[1])
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertNotEqual(tokens[0], tokens[1])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def service(name, short, body='', order=0):
+            return Service.objects.create(name=name, short_description=short, full_description=f'<p>{body}</p>',
+                                          image='services/s.jpg', order=order)
+
+        cls.in_name = service('Python Bootcamp', 'Learn to code', order=3)
+        cls.in_short = service('Data Workshop', 'Python for analysts', order=2)
+        cls.in_body = service('Cloud Audit', 'Infrastructure review',
+                              'We also review python scripts in the infrastructure. ' * 3, order=1)
+        cls.other = service('Mobile Apps', 'Native and hybrid apps', order=0)
+        cls.training = Training.objects.create(name='Pythonic Patterns', short_description='Idioms',
+                                               full_description='<p>Body</p>', image='trainings/t.jpg')
+
+    def setUp(self):
+        reset_caches()
+        self.index = search.build_index()
+
+    def test_field_weights_rank_matches(self):
+        self.assertEqual(self.index.search('python')['service'],
+                         [self.in_name.pk, self.in_short.pk, self.in_body.pk])
+
+    def test_rare_terms_weigh_more(self):
+        # "python" is in three documents, "analysts" in one.
+        self.assertEqual(self.index.search('analysts')['service'], [self.in_short.pk])
+        self.assertGreater(self.index._idf('analysts'), self.index._idf('python'))
+        self.assertEqual(self.index._idf('nowhere'), math.log(1 + (len(self.index) + 0.5) / 0.5))
+
+    def test_last_term_matches_as_prefix(self):
+        self.assertEqual(self.index.expand_prefix('pyth'), ['python', 'pythonic'])
+        results = self.index.search('pyth')
+        self.assertEqual(results['service'], [self.in_name.pk, self.in_short.pk, self.in_body.pk])
+        self.assertEqual(results['training'], [self.training.pk])
+        # Earlier terms must match whole words, and every term must match.
+        self.assertEqual(self.index.search('pyth data')['service'], [])
+        self.assertEqual(self.index.search('python data')['service'], [self.in_short.pk])
+        self.assertEqual(self.index.search('python mobile'), {'service': [], 'training': []})
+
+    def test_prefix_expansion_is_bounded(self):
+        self.index.postings.update({f'zz{i:03}': {('service', self.other.pk): 1.0} for i in range(80)})
+        self.index._terms = None
+        self.assertEqual(len(self.index.expand_prefix('zz')), search.MAX_PREFIX_EXPANSIONS)
+
+    def test_updates_in_place(self):
+        self.in_body.name = 'Cloud Bootcamp'
+        self.index.add('service', self.in_body)
+        self.assertEqual(set(self.index.search('bootcamp')['service']), {self.in_name.pk, self.in_body.pk})
+        self.assertEqual(self.index.search('audit')['service'], [])
+        self.index.remove(('service', self.in_name.pk))
+        self.index.remove(('service', self.in_body.pk))
+        self.assertEqual(self.index.search('bootcamp')['service'], [])
+        self.assertNotIn('bootcamp', self.index.postings)
+        self.assertEqual(self.index.names.lookup('boot'), frozenset())
+
+    def test_published_index_is_never_changed(self):
+        index = search.get_search_index()
+        postings = {term: dict(docs) for term, docs in index.postings.items()}
+        self.in_body.name = 'Cloud Bootcamp'
+        search.index_instance(self.in_body)
+        search.unindex_instance(self.other)
+        updated = search.get_search_index()
+        self.assertIsNot(updated, index)
+        self.assertEqual(set(updated.search('bootcamp')['service']), {self.in_name.pk, self.in_body.pk})
+        self.assertEqual(updated.search('mobile')['service'], [])
+        # Requests still holding the old index keep reading a consistent one.
+        self.assertEqual({term: dict(docs) for term, docs in index.postings.items()}, postings)
+        self.assertEqual(index.search('audit')['service'], [self.in_body.pk])
+        self.assertEqual(index.name_matches('service', ['mob']), [self.other.pk])
+        self.assertIs(updated.postings['analysts'], index.postings['analysts'])
+
+    def test_live_search_puts_name_matches_first(self):
+        body = json.loads(self.index.live_search('  PYTH '))
+        self.assertEqual([(r['type'], r['id']) for r in body['results']], [
+            ('service', self.in_name.pk), ('service', self.in_short.pk), ('service', self.in_body.pk),
+            ('training', self.training.pk),
+        ])
+        self.assertIs(self.index.live_search('pyth'), self.index.live_search('Pyth'))
+
+    def test_dropped_index_is_rebuilt(self):
+        index = search.get_search_index()
+        self.assertIs(search.get_search_index(), index)
+        # An update elsewhere dropped the index without a new generation.
+        search._state['index'] = None
+        self.assertIsNotNone(search.get_search_index())
+
+
+class AutocompleteTests(SimpleTestCase):
+    def test_trie_lookup(self):
+        trie = PrefixTrie()
+        trie.insert('python', 1)
+        trie.insert('pytest', 2)
+        trie.insert('data', 1)
+        self.assertEqual(trie.lookup('py'), {1, 2})
+        self.assertEqual(trie.lookup('pyth'), {1})
+        self.assertEqual(trie.lookup('python'), {1})
+        self.assertEqual(trie.lookup('pythons'), frozenset())
+        self.assertEqual(trie.lookup(''), set())
+
+    def test_trie_remove_prunes_empty_nodes(self):
+        trie = PrefixTrie()
+        trie.insert('python', 1)
+        trie.insert('pytest', 2)
+        trie.remove('python', 1)
+        self.assertEqual(trie.lookup('py'), {2})
+        self.assertEqual(trie.lookup('pyth'), frozenset())
+        self.assertNotIn('h', trie.root.children['p'].children['y'].children['t'].children)
+        trie.remove('pytest', 2)
+        self.assertEqual(trie.root.children, {})
+        # Removing a word that was never inserted is a no-op.
+        trie.remove('java', 3)
+
+    def test_trie_copy_leaves_original_unchanged(self):
+        trie = PrefixTrie()
+        trie.insert('python', 1)
+        trie.insert('pytest', 2)
+        found = trie.lookup('py')
+        clone = trie.copy()
+        clone.insert('pyramid', 3)
+        clone.remove('python', 1)
+        self.assertEqual((trie.lookup('py'), trie.lookup('pyth'), trie.lookup('pyr')), ({1, 2}, {1}, frozenset()))
+        self.assertEqual((clone.lookup('py'), clone.lookup('pyth'), clone.lookup('pyr')), ({2, 3}, frozenset(), {3}))
+        # Untouched branches stay shared; a lookup result is a snapshot.
+        self.assertIs(clone.root.children['p'].children['y'].children['t'].children['e'],
+                      trie.root.children['p'].children['y'].children['t'].children['e'])
+        self.assertEqual(found, {1, 2})
+        trie.insert('pygame', 4)
+        self.assertEqual(clone.lookup('pyg'), frozenset())
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        self.assertEqual(lru.get('a'), 1)
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c'), len(lru)), (1, 3, 2))
+        lru.set('a', 10)
+        lru.set('d', 4)
+        self.assertEqual((lru.get('a'), lru.get('c'), lru.get('d')), (10, None, 4))
+        lru.clear()
+        self.assertEqual(len(lru), 0)
+
+
+class FailingMailer:
+    def __init__(self, site_settings):
+        self.site_settings = site_settings
+
+    def settings(self):
+        return self.site_settings
+
+    def send(self, email, site_settings):
+        raise OSError('Connection refused')
+
+    def close(self):
+        pass
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class OutboxTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.site_settings = SiteSettings.objects.create(
+            site_name='Zynder Tech', email='owner@example.com', smtp_host='smtp.example.com',
+            smtp_username='mailer@example.com', smtp_password='secret',
+        )
+
+    def queue(self, count):
+        return [Contact.objects.create(full_name=f'Person {i}', email=f'p{i}@example.com', phone_number='1',
+                                       message='Hi').emails.get()
+                for i in range(count)]
+
+    def test_contact_queues_one_email(self):
+        [email] = self.queue(1)
+        self.assertEqual((email.status, email.attempts), ('pending', 0))
+        self.assertIn('Person 0', email.subject)
+
+    def test_contact_and_email_commit_together(self):
+        data = {'full_name': 'Ann Lee', 'email': 'ann@example.com', 'phone_number': '555 0100', 'message': 'Hi',
+                'form_token': signing.dumps(time.time() - 10, salt=TOKEN_SALT)}
+        with mock.patch('website.signals.enqueue_contact_notification', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('contact'), data)
+        self.assertFalse(Contact.objects.exists())
+
+    def test_claims_are_exclusive(self):
+        emails = self.queue(3)
+        first = outbox.claim_batch(2)
+        second = outbox.claim_batch(5)
+        self.assertEqual(len(first), 2)
+        self.assertEqual({e.pk for e in first} | {e.pk for e in second}, {e.pk for e in emails})
+        self.assertFalse({e.pk for e in first} & {e.pk for e in second})
+        self.assertEqual(outbox.claim_batch(5), [])
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {'sending'})
+
+    def test_stale_claims_are_released(self):
+        [email] = self.queue(1)
+        outbox.claim_batch(1)
+        self.assertEqual(outbox.release_stale_claims(), 0)
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            updated_at=timezone.now() - outbox.STALE_CLAIM_AFTER - timedelta(seconds=1))
+        self.assertEqual(outbox.release_stale_claims(), 1)
+        self.assertEqual([e.pk for e in outbox.claim_batch(1)], [email.pk])
+
+    def test_retry_delay_backs_off(self):
+        self.assertEqual([outbox.retry_delay(n).total_seconds() for n in (1, 2, 3, 4)], [60, 120, 240, 480])
+        self.assertEqual(outbox.retry_delay(20), timedelta(seconds=outbox.RETRY_MAX_DELAY))
+
+    def test_failures_are_retried_then_given_up(self):
+        [email] = self.queue(1)
+        mailer = FailingMailer(self.site_settings)
+        with self.assertLogs('website.outbox', 'WARNING'):
+            self.assertEqual(outbox.drain_outbox(mailer, max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn('Connection refused', email.last_error)
+        self.assertAlmostEqual((email.next_attempt_at - timezone.now()).total_seconds(), 60, delta=5)
+
+        # Not due yet.
+        self.assertEqual(outbox.drain_outbox(mailer, max_attempts=2), (0, 0))
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        with self.assertLogs('website.outbox', 'ERROR'):
+            self.assertEqual(outbox.drain_outbox(mailer, max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+    def test_worker_sees_smtp_changes(self):
+        self.queue(2)
+        mailer = outbox.OutboxMailer()
+        # Warm the per-process settings copy, as the web process would.
+        get_site_settings()
+        with mock.patch.object(outbox, 'get_connection') as get_connection:
+            self.assertEqual(outbox.drain_outbox(mailer, batch_size=1), (1, 0))
+            SiteSettings.objects.filter(pk=self.site_settings.pk).update(
+                smtp_host='smtp2.example.com', updated_at=timezone.now() + timedelta(seconds=1))
+            self.assertEqual(outbox.drain_outbox(mailer, batch_size=1), (1, 0))
+        self.assertEqual([c.kwargs['host'] for c in get_connection.call_args_list],
+                         ['smtp.example.com', 'smtp2.example.com'])
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 2)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.service = Service.objects.order_by('pk').first()
+        cls.training = Training.objects.order_by('pk').first()
+
+    def setUp(self):
+        reset_caches()
+        # The URLconf picks its views when imported; the cleanup runs after
+        # the setting is restored.
+        self.addCleanup(self.route_views)
+        self.enterContext(override_settings(WEBSITE_ASYNC_VIEWS=True))
+        self.route_views()
+
+    def route_views(self):
+        importlib.reload(website_urls)
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    def test_routed_to_async_views(self):
+        self.assertIs(resolve(reverse('home')).func, async_views.home)
+        self.assertIs(resolve(self.service.get_absolute_url()).func, async_views.service_detail)
+
+    async def test_pages(self):
+        pages = {
+            reverse('home'): self.service.name,
+            reverse('services'): self.service.name,
+            self.service.get_absolute_url(): self.service.name,
+            reverse('trainings') + '?page=2': 'Training',
+            self.training.get_absolute_url(): self.training.name,
+        }
+        for url, text in pages.items():
+            response = await self.async_client.get(url)
+            self.assertContains(response, text, msg_prefix=url)
+            self.assertContains(response, 'Zynder Tech', msg_prefix=url)
+            self.assertEqual(response['X-Page-Cache'], 'MISS')
+            self.assertEqual((await self.async_client.get(url))['X-Page-Cache'], 'HIT')
+
+    def test_sync_views_restored(self):
+        self.doCleanups()
+        self.assertIs(resolve(reverse('home')).func, views.home)
+
+    async def test_missing_item(self):
+        response = await self.async_client.get(reverse('service_detail', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_live_search(self):
+        response = await self.async_client.get(reverse('live_search'), {'q': 'servi'})
+        names = [result['name'] for result in response.json()['results']]
+        self.assertEqual(len(names), search.RESULTS_PER_KIND)
+        self.assertTrue(all(name.startswith('Service') for name in names))
+
+    async def test_conditional_get(self):
+        url = self.training.get_absolute_url()
+        response = await self.async_client.get(url)
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class RenditionTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.source = self.save_image('uploads/pic.jpg')
+        self.card = self.save_image('services/card.jpg')
+        self.img = f'<img src="{settings.MEDIA_URL}{self.source}">'
+
+    def save_image(self, name):
+        buffer = io.BytesIO()
+        Image.new('RGB', (700, 400), 'navy').save(buffer, format='JPEG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_generate_renditions(self):
+        self.assertGreater(images.generate_renditions(self.source), 0)
+        info = images.renditions_for(self.source)
+        self.assertEqual((info['width'], info['height']), (700, 400))
+        # Never upscaled: the original width caps the list.
+        self.assertEqual([width for width, _ in info['formats']['jpeg']], [160, 320, 480, 640, 700])
+        self.assertEqual(images.generate_renditions(self.source), 0)
+
+        html = images.picture_html('/media/pic.jpg', self.source, alt='')
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn(' 700w"', html)
+
+    def saved_service(self, body):
+        service = Service(name='Cloud', short_description='Short', full_description=f'<p>{body}</p>{self.img}',
+                          image=self.card)
+        service.save()
+        return service
+
+    def test_embedded_images_rerendered(self):
+        service = self.saved_service('Body')
+        self.assertNotIn('srcset', service.full_description_html)
+        signals._build_renditions(service)
+        service.refresh_from_db()
+        self.assertIn('<picture', service.full_description_html)
+        self.assertIn('srcset', service.full_description_html)
+
+    def test_job_does_not_undo_a_later_save(self):
+        queued = self.saved_service('Old')
+        newer = Service.objects.get(pk=queued.pk)
+        newer.full_description = f'<p>New</p>{self.img}'
+        newer.save()
+
+        signals._build_renditions(queued)
+        newer.refresh_from_db()
+        self.assertIn('<p>New</p>', newer.full_description_html)
+        self.assertIn('srcset', newer.full_description_html)
+
+    def test_migrated_bodies_get_picture_markup_from_backfill(self):
+        migration = importlib.import_module('website.migrations.0004_rich_text_columns')
+        service = self.saved_service('Body')
+        rendered, text = migration.render_rich_text(service.full_description)
+        self.assertEqual(rendered, f'<p>Body</p><img src="{settings.MEDIA_URL}{self.source}" alt="" '
+                                   f'loading="lazy" decoding="async">')
+        self.assertEqual(text, 'Body')
+        Service.objects.filter(pk=service.pk).update(full_description_html=rendered)
+
+        out = io.StringIO()
+        call_command('build_image_renditions', stdout=out)
+        service.refresh_from_db()
+        self.assertIn('<picture', service.full_description_html)
+        self.assertIn('srcset', service.full_description_html)
+        self.assertIn('Rich text: 1 row(s) re-rendered', out.getvalue())
+
+    def test_job_skips_write_when_saved_while_rendering(self):
+        service = self.saved_service('Old')
+        prepare = signals.prepare_rich_text
+
+        def save_meanwhile(instance):
+            Service.objects.filter(pk=service.pk).update(
+                full_description_html='<p>Newest</p>', updated_at=timezone.now() + timedelta(seconds=1))
+            return prepare(instance)
+
+        with mock.patch.object(signals, 'prepare_rich_text', save_meanwhile):
+            signals._build_renditions(service)
+        service.refresh_from_db()
+        self.assertEqual(service.full_description_html, '<p>Newest</p>')
+
+
+class RichTextTests(SimpleTestCase):
+    def clean(self, value):
+        service = Service(full_description=value)
+        prepare_rich_text(service)
+        return service.full_description_html
+
+    def assertCleaned(self, cases):
+        for value, expected in cases:
+            with self.subTest(value):
+                self.assertEqual(self.clean(value), expected)
+
+    def test_migration_copy_matches_without_images(self):
+        migration = importlib.import_module('website.migrations.0004_rich_text_columns')
+        value = ('<h2 onclick="x()">Title</h2><p style="color: red">A <a href="javascript:x" target="_blank">b</a>'
+                 '<script>bad()</script><table><tr><td colspan="2">c</td></tr></table><ul><li>d')
+        self.assertEqual(migration.render_rich_text(value)[0], self.clean(value))
+
+    def test_unsafe_urls_dropped(self):
+        self.assertCleaned([
+            ('<a href="javascript:alert(1)">x</a>', '<a>x</a>'),
+            ('<a href=" JAVASCRIPT:alert(1)">x</a>', '<a>x</a>'),
+            ('<a href="java\tscript:alert(1)">x</a>', '<a>x</a>'),
+            ('<a href="java\x00script:alert(1)">x</a>', '<a>x</a>'),
+            ('<a href="\x01javascript:alert(1)">x</a>', '<a>x</a>'),
+            ('<a href="vbscript:msgbox(1)">x</a>', '<a>x</a>'),
+            ('<a href="data:text/html,hi">x</a>', '<a>x</a>'),
+            ('<img src="javascript:alert(1)">', ''),
+        ])
+
+    def test_entity_encoded_urls_dropped(self):
+        self.assertCleaned([
+            ('<a href="jav&#x61;script:alert(1)">x</a>', '<a>x</a>'),
+            ('<a href="&#106;avascript:alert(1)">x</a>', '<a>x</a>'),
+            ('<a href="javascript&colon;alert(1)">x</a>', '<a>x</a>'),
+            ('<a href="&#x6A;&#x61;vascript&#58;alert(1)">x</a>', '<a>x</a>'),
+        ])
+
+    def test_safe_urls_kept(self):
+        self.assertCleaned([
+            ('<a href="https://example.com/a?b=1&amp;c=2">x</a>', '<a href="https://example.com/a?b=1&amp;c=2">x</a>'),
+            ('<a href="/services/">x</a>', '<a href="/services/">x</a>'),
+            ('<a href="mailto:info@example.com">x</a>', '<a href="mailto:info@example.com">x</a>'),
+            ('<a href="https://example.com" target="_blank">x</a>',
+             '<a href="https://example.com" target="_blank" rel="noopener noreferrer">x</a>'),
+            ('<img src="https://example.com/a.png">',
+             '<img src="https://example.com/a.png" alt="" decoding="async" loading="lazy">'),
+        ])
+
+    def test_unsafe_styles_dropped(self):
+        self.assertCleaned([
+            ('<p style="background: url(https://example.com/x.png)">x</p>', '<p>x</p>'),
+            ('<p style="background:URL (javascript:alert(1))">x</p>', '<p>x</p>'),
+            ('<p style="background: u&#114;l(x)">x</p>', '<p>x</p>'),
+            ('<p style="background: \\75rl(x)">x</p>', '<p>x</p>'),
+            ('<p style="width: expr/**/ession(alert(1))">x</p>', '<p>x</p>'),
+            ('<p style="width: expression(alert(1))">x</p>', '<p>x</p>'),
+            ('<p style="-moz-binding: x">x</p>', '<p>x</p>'),
+            ('<p style="color: red; text-align: center">x</p>', '<p style="color: red; text-align: center">x</p>'),
+        ])
+
+    def test_dropped_elements_take_their_content(self):
+        self.assertCleaned([
+            ('<script>alert(1)</script><p>ok</p>', '<p>ok</p>'),
+            ('<script><script>x</script>y</script>z', 'yz'),
+            ('<svg><script>alert(1)</script><p>inside</p></svg><p>after</p>', '<p>after</p>'),
+            ('<svg><style><img src=x onerror=alert(1)></style></svg>', ''),
+            ('<noscript><p title="</noscript><img src=x onerror=alert(1)>"></noscript><p>after</p>', '<p>after</p>'),
+            ('<math><mi xlink:href="javascript:alert(1)">x</mi></math>', ''),
+            ('<iframe src="https://example.com"></iframe>after', 'after'),
+            ('<p>text</p><script>', '<p>text</p>'),
+            ('<!-- <script>alert(1)</script> --><p>c</p>', '<p>c</p>'),
+        ])
+
+    def test_event_handlers_dropped(self):
+        self.assertCleaned([
+            ('<p onclick="alert(1)" class="lead">x</p>', '<p class="lead">x</p>'),
+            ('<p ONMOUSEOVER="alert(1)">x</p>', '<p>x</p>'),
+            ('<img src="/a.png" onerror="alert(1)">', '<img src="/a.png" alt="" decoding="async" loading="lazy">'),
+            ('<a href="/" onfocus="alert(1)" autofocus>x</a>', '<a href="/">x</a>'),
+        ])
+
+    def test_unclosed_and_stray_tags(self):
+        self.assertCleaned([
+            ('<div><p>unclosed <b>bold', '<div><p>unclosed <b>bold</b></p></div>'),
+            ('<p>a</b>c</p>', '<p>ac</p>'),
+            ('<p><em>a</p>b', '<p><em>a</em></p>b'),
+            ('<p/><br/>', '<p></p><br>'),
+            ('<p>1 < 2 & 3 > 2</p>', '<p>1 &lt; 2 &amp; 3 &gt; 2</p>'),
+            ('<p title="&quot;><script>">x</p>', '<p title="&quot;&gt;&lt;script&gt;">x</p>'),
+        ])
+
+    def test_search_text(self):
+        service = Service(full_description='<h2>Scope</h2><p>Cloud &amp; data</p><script>x</script>',
+                          features='<ul><li>One</li><li>Two</li></ul>', specialties='')
+        prepare_rich_text(service)
+        self.assertEqual(service.search_text, 'Scope Cloud & data\nOne Two')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.service = Service.objects.order_by('pk').first()
+
+    def setUp(self):
+        reset_caches()
+
+    def test_validators(self):
+        response = self.client.get(reverse('services'))
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_not_modified_without_queries(self):
+        url = self.service.get_absolute_url()
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        response = self.client.get(url, headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate(self):
+        url = reverse('services')
+        etag = self.client.get(url)['ETag']
+        self.service.name = 'Renamed'
+        self.service.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # A delete leaves MAX(updated_at) alone; the purge still changes the validators.
+        etag = response['ETag']
+        Service.objects.order_by('-pk').first().delete()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_unrelated_change_keeps_validators(self):
+        url = reverse('services')
+        etag = self.client.get(url)['ETag']
+        training = Training.objects.first()
+        training.name = 'Renamed'
+        training.save()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_session_bypasses(self):
+        url = reverse('services')
+        etag = self.client.get(url)['ETag']
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'session'
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+@override_settings(STORAGES=TEST_STORAGES)
+class QueryPlanTests(TestCase):
+    """Every query behind the public pages must be served by an index.
+
+    A plain ``SCAN <table>`` (full scan) or a ``TEMP B-TREE`` (sort in memory)
+    in a plan fails the test.
+    """
+    # One-row table; scanning it is the cheapest possible plan.
+    SCAN_ALLOWED = {'website_sitesettings'}
+    FULL_SCAN_RE = re.compile(r'\bSCAN (\w+)(?!\w| USING)')
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.service = Service.objects.first()
+        cls.training = Training.objects.first()
+
+    def setUp(self):
+        reset_caches()
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertPlanUsesIndexes(self, sql, plan):
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, f'{sql}\n{plan}')
+            match = self.FULL_SCAN_RE.search(step)
+            if match and match.group(1) != 'CONSTANT' and match.group(1) not in self.SCAN_ALLOWED:
+                self.fail(f'Full scan of {match.group(1)}:\n{sql}\n{plan}')
+
+    def assertPageQueriesIndexed(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        selects = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertPlanUsesIndexes(sql, self.plan(sql))
+
+    def test_home(self):
+        self.assertPageQueriesIndexed(reverse('home'))
+
+    def test_services_list(self):
+        self.assertPageQueriesIndexed(reverse('services'))
+        self.assertPageQueriesIndexed(reverse('services') + '?page=2')
+        for direction in ('next', 'prev'):
+            cursor = encode_cursor([self.service.order, self.service.name, self.service.pk], 2, direction)
+            self.assertPageQueriesIndexed(reverse('services') + f'?cursor={cursor}')
+
+    def test_service_detail(self):
+        self.assertPageQueriesIndexed(reverse('service_detail', kwargs={'pk': self.service.pk}))
+
+    def test_trainings_list(self):
+        self.assertPageQueriesIndexed(reverse('trainings'))
+        self.assertPageQueriesIndexed(reverse('trainings') + '?page=2')
+        for direction in ('next', 'prev'):
+            cursor = encode_cursor([self.training.order, self.training.name, self.training.pk], 2, direction)
+            self.assertPageQueriesIndexed(reverse('trainings') + f'?cursor={cursor}')
+
+    def test_training_detail(self):
+        self.assertPageQueriesIndexed(reverse('training_detail', kwargs={'pk': self.training.pk}))
+
+    def test_live_search(self):
+        self.assertPageQueriesIndexed(reverse('live_search') + '?q=serv')
+
+    def test_legal_pages(self):
+        for name in ('terms', 'privacy', 'refund'):
+            self.assertPageQueriesIndexed(reverse(name))
+
+    def test_contact_admin_queries(self):
+        for queryset in (Contact.objects.all()[:100], Contact.objects.filter(status='new')[:100]):
+            sql = str(queryset.query)
+            self.assertPlanUsesIndexes(sql, queryset.explain().splitlines())
+
+    def test_contact_search(self):
+        # Only the matches are sorted, so a TEMP B-TREE is fine here; a scan is not.
+        for term in ('person', 'p@example', '+1 (555) 01'):
+            plan = Contact.objects.search(term)[:100].explain()
+            self.assertIn('MULTI-INDEX OR', plan)
+            self.assertIsNone(self.FULL_SCAN_RE.search(plan), plan)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteSettings.objects.create(site_name='Zynder Tech')
+        # Many rows tie on (order, name); only the id tells them apart.
+        for i in range(22):
+            Service.objects.create(name='Same' if i % 3 else 'Other', short_description='Short',
+                                   full_description='<p>Body</p>', image='services/s.jpg', order=i % 2)
+        cls.expected = list(Service.objects.order_by('order', 'name', 'id').values_list('pk', flat=True))
+
+    def setUp(self):
+        reset_caches()
+
+    def page(self, **params):
+        query = QueryDict(mutable=True)
+        query.update(params)
+        return paginate_listing(query, Service.objects.cards(), LISTING_PAGE_SIZE, 'services')
+
+    def walk(self, page, cursor_name):
+        pages = [page]
+        while getattr(pages[-1], cursor_name):
+            pages.append(self.page(cursor=getattr(pages[-1], cursor_name)))
+        return pages
+
+    def test_walk_forward_and_back(self):
+        forward = self.walk(self.page(), 'next_cursor')
+        self.assertEqual([page.number for page in forward], [1, 2, 3])
+        self.assertEqual([obj.pk for page in forward for obj in page], self.expected)
+        self.assertEqual(len(forward[-1]), 22 - 2 * LISTING_PAGE_SIZE)
+
+        backward = self.walk(forward[-1], 'previous_cursor')
+        self.assertEqual([page.number for page in backward], [3, 2, 1])
+        self.assertEqual([obj.pk for page in reversed(backward) for obj in page], self.expected)
+        self.assertFalse(backward[-1].has_previous())
+
+    def test_new_row_past_page_boundary_adds_page_link(self):
+        url = reverse('services') + '?page=3'
+        self.assertNotContains(self.client.get(url), '>4</a>')
+        for i in range(3 * LISTING_PAGE_SIZE + 1 - len(self.expected)):
+            Service.objects.create(name=f'Late {i}', short_description='Short', full_description='<p>Body</p>',
+                                   image='services/s.jpg', order=5)
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 4)
+        self.assertContains(response, f'href="?cursor={response.context["page_obj"].next_cursor}">4</a>', html=False)
+
+    def test_numbered_pages_match_cursors(self):
+        forward = self.walk(self.page(), 'next_cursor')
+        for number, page in enumerate(forward, 1):
+            self.assertEqual(list(self.page(page=str(number))), list(page))
+        self.assertEqual(self.page(page='99').number, 3)
+        self.assertEqual(self.page(page='abc').number, 1)
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        cursor = self.page().next_cursor
+        first = [obj.pk for obj in self.page()]
+        for bad in (cursor[:-2] + ('AA' if not cursor.endswith('AA') else 'BB'), 'garbage',
+                    signing.dumps([[0, 'Same', 1], 2, 'next'], salt='other', compress=True),
+                    encode_cursor([0, 'Same', 1], 0, 'next'), encode_cursor([0, 'Same', 1], 2, 'sideways')):
+            with self.subTest(bad):
+                page = self.page(cursor=bad)
+                self.assertEqual((page.number, [obj.pk for obj in page]), (1, first))
+
+    def test_listing_links_walk_every_row(self):
+        seen, url = [], reverse('services')
+        while url:
+            content = self.client.get(url).content.decode()
+            # A card links its detail page more than once.
+            seen += dict.fromkeys(int(pk) for pk in re.findall(r'href="/service/(\d+)/"', content))
+            links = re.findall(r'href="\?(cursor=[^"]+)"[^>]*>\s*<i class="fas fa-chevron-right"', content)
+            url = reverse('services') + '?' + html.unescape(links[0]) if links else None
+        self.assertEqual(seen, self.expected)
+
+    def test_neighbouring_numbers_link_cursors(self):
+        content = self.client.get(reverse('services') + '?page=2').content.decode()
+        self.assertRegex(content, r'href="\?cursor=[^"]+">1</a>')
+        self.assertRegex(content, r'href="\?cursor=[^"]+">3</a>')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CardQuerysetTests(TestCase):
+    """List, featured, related and type-ahead paths never load the rich-text bodies."""
+    RICH_TEXT_COLUMNS = re.compile(r'"(full_description|features|specialties|curriculum)(_html)?"')
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.service = Service.objects.first()
+        cls.training = Training.objects.first()
+
+    def setUp(self):
+        reset_caches()
+
+    def rich_text_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries.captured_queries if self.RICH_TEXT_COLUMNS.search(q['sql'])]
+
+    def test_cards_defer_rich_text(self):
+        for model in (Service, Training):
+            self.assertFalse(self.RICH_TEXT_COLUMNS.search(str(model.objects.cards().query)))
+
+    def test_list_pages(self):
+        for url in (reverse('home'), reverse('services'), reverse('trainings'), reverse('live_search') + '?q=serv'):
+            self.assertEqual(self.rich_text_queries(url), [], url)
+
+    def test_detail_pages_load_bodies_once(self):
+        # Only the page's own row is fetched with its bodies; related cards are not.
+        for url in (reverse('service_detail', kwargs={'pk': self.service.pk}),
+                    reverse('training_detail', kwargs={'pk': self.training.pk})):
+            self.assertEqual(len(self.rich_text_queries(url)), 1, url)
+
+
+class RelatedItemsTests(TestCase):
+    def setUp(self):
+        reset_caches()
+
+    def service(self, name, text, order=0):
+        return Service.objects.create(name=name, short_description=text, full_description=f'<p>{text}</p>',
+                                      image='services/s.jpg', order=order)
+
+    def neighbors(self, service):
+        return list(Service.objects.filter(neighbor_of__source=service).order_by('neighbor_of__rank'))
+
+    def test_ranked_by_similarity(self):
+        itsm = self.service('ITSM', 'incident problem change management workflows', order=1)
+        hr = self.service('HR Service Delivery', 'employee onboarding case management', order=2)
+        itom = self.service('ITOM', 'incident event discovery monitoring workflows', order=3)
+        self.service('Training Portal', 'courses', order=4)
+        self.service('Consulting', 'advice', order=5)
+        rebuild_related(Service)
+
+        neighbors = self.neighbors(itsm)
+        self.assertEqual(neighbors[:2], [itom, hr])
+        self.assertEqual(len(neighbors), 3)
+
+    def test_numpy_matches_pure_python(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest('NumPy is not installed')
+        for i in range(8):
+            self.service(f'Service {i}', ' '.join(f'term{j}' for j in range(i, i + 4)), order=i)
+        corpus = Corpus(Service)
+        expected = {pk: [target for target, _ in corpus.top(pk, corpus.similarities(pk))] for pk in corpus.vectors}
+        actual = {pk: [target for target, _ in targets]
+                  for pk, targets in corpus._all_neighbors_numpy(numpy).items()}
+        self.assertEqual(actual, expected)
+
+    def test_refresh_after_save(self):
+        a = self.service('Alpha', 'cloud migration', order=1)
+        b = self.service('Beta', 'data analytics', order=2)
+        c = self.service('Gamma', 'security audit', order=3)
+        d = self.service('Delta', 'mobile apps', order=4)
+        rebuild_related(Service)
+        self.assertNotEqual(self.neighbors(b)[0], d)
+
+        d.short_description = 'data analytics dashboards'
+        d.save()
+        changed = refresh_related(Service, [d.pk])
+        self.assertEqual(self.neighbors(b)[0], d)
+        self.assertEqual(self.neighbors(d)[0], b)
+        self.assertIn(b.pk, changed)
+
+        d.delete()
+        refresh_related(Service, [d.pk])
+        for service in (a, b, c):
+            self.assertNotIn(d.pk, [s.pk for s in self.neighbors(service)])
+            self.assertEqual(len(self.neighbors(service)), 2)
+
+    def test_refresh_reads_only_affected_lists(self):
+        cloud = [self.service(f'Cloud {i}', f'cloud {topic}', order=1)
+                 for i, topic in enumerate(['migration aws', 'migration azure', 'backup aws', 'backup azure'])]
+        food = [self.service(f'Food {i}', f'recipe {topic}', order=2)
+                for i, topic in enumerate(['baking bread', 'baking cake', 'grilling fish', 'grilling meat'])]
+        rebuild_related(Service)
+        Corpus(Service)
+
+        food[1].short_description = 'recipe baking cake icing'
+        food[1].save()
+        with mock.patch('website.related.term_weights', wraps=related.term_weights) as weights, \
+                mock.patch('website.related._write', wraps=related._write) as write:
+            refresh_related(Service, [food[1].pk])
+        self.assertEqual(weights.call_count, 1)
+        self.assertEqual({call.args[1] for call in write.call_args_list}, {service.pk for service in food})
+
+        gone = food[3]
+        listing = related.listed_on(gone)
+        gone.delete()
+        refresh_related(Service, [gone.pk], listing)
+        for service in cloud + food[:3]:
+            self.assertEqual(len(self.neighbors(service)), 3)
+            self.assertNotIn(gone, self.neighbors(service))
+        self.assertEqual(self.neighbors(food[0])[:2], [food[1], food[2]])
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        for i in range(3):
+            Service.objects.create(name=f'Service {i}', short_description='Short', full_description='<p>Body</p>',
+                                   image='services/s.jpg', order=i)
+
+    def round_trip(self, fmt, edit):
+        exported = ''.join(export_lines(Service, Service.objects.all(), fmt))
+        return import_rows(Service, read_rows(io.StringIO(edit(exported)), fmt), chunk_size=2)
+
+    def test_csv_round_trip_updates_and_creates(self):
+        def edit(text):
+            lines = text.splitlines(keepends=True)
+            new_row = lines[-1].replace('Service 2', 'Service 3').split(',', 1)[1]
+            return text.replace('Service 0', 'Renamed') + ',' + new_row
+
+        result = self.round_trip('csv', edit)
+        self.assertEqual((result['created'], result['updated']), (1, 3))
+        self.assertTrue(Service.objects.filter(name='Renamed').exists())
+        self.assertEqual(Service.objects.get(name='Service 3').full_description_html, '<p>Body</p>')
+
+    def test_jsonl_round_trip(self):
+        result = self.round_trip('jsonl', lambda text: text.replace('Service 1', 'Renamed'))
+        self.assertEqual((result['created'], result['updated']), (0, 3))
+        self.assertEqual(Service.objects.get(name='Renamed').short_description, 'Short')
+
+    def test_invalid_row_rolls_back(self):
+        row = {'short_description': 'x', 'full_description': '<p>x</p>', 'image': 's.jpg'}
+        rows = [(2, {**row, 'name': 'New'}), (3, {**row, 'name': ''})]
+        with self.assertRaisesMessage(ImportRowError, 'Row 3: name'):
+            import_rows(Service, iter(rows))
+        self.assertEqual(Service.objects.count(), 3)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class TransferAdminTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        default_storage.save('services/card.jpg', ContentFile(b'jpeg'))
+        self.service = Service.objects.create(name='Cloud', short_description='Short',
+                                              full_description='<p>Body</p>', image='services/card.jpg')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_export_media_action(self):
+        url = reverse('admin:website_service_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, reverse('admin:website_service_import'))
+        response = self.client.post(url, {'action': 'export_media', '_selected_action': [self.service.pk]})
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(archive.namelist(), ['services/card.jpg'])
+        # Contacts reference no files.
+        actions = self.client.get(reverse('admin:website_contact_changelist')).context['action_form']
+        self.assertNotIn('export_media', dict(actions.fields['action'].choices))
+
+    def import_file(self, rows, media=None):
+        data = {'file': SimpleUploadedFile('services.jsonl', ''.join(json.dumps(row) + '\n' for row in rows).encode())}
+        if media:
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, 'w') as zf:
+                for name, content in media.items():
+                    zf.writestr(name, content)
+            data['media'] = SimpleUploadedFile('media.zip', archive.getvalue())
+        return self.client.post(reverse('admin:website_service_import'), data)
+
+    def test_import_with_media(self):
+        row = {'short_description': 'New', 'full_description': '<p>New</p>', 'image': 'services/new.jpg'}
+        response = self.import_file([{'id': self.service.pk, 'name': 'Renamed'}, dict(row, name='Added')],
+                                    media={'services/new.jpg': b'jpeg'})
+        self.assertRedirects(response, reverse('admin:website_service_changelist'))
+        self.assertEqual(sorted(Service.objects.values_list('name', flat=True)), ['Added', 'Renamed'])
+        self.assertTrue(default_storage.exists('services/new.jpg'))
+
+    def test_invalid_import_changes_nothing(self):
+        response = self.import_file([{'id': self.service.pk, 'name': 'Renamed'}, {'name': ''}])
+        self.assertContains(response, 'Nothing imported. Row 2: name')
+        self.assertEqual(list(Service.objects.values_list('name', flat=True)), ['Cloud'])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ContactAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann = Contact.objects.create(full_name='Ann  Lee', email='Ann.Lee@Example.com',
+                                         phone_number='+1 (555) 010-2000', message='Hi')
+        cls.bob = Contact.objects.create(full_name='Bob Stone', email='bob@example.org',
+                                         phone_number='555 777 1234', message='Hi')
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        reset_caches()
+        self.client.force_login(self.admin)
+
+    def test_search_keys(self):
+        self.assertEqual((self.ann.name_key, self.ann.email_key, self.ann.phone_key),
+                         ('ann lee', 'ann.lee@example.com', '15550102000'))
+
+    def test_prefix_search(self):
+        for term, expected in (('ann l', [self.ann]), ('BOB@', [self.bob]), ('+1 555', [self.ann]),
+                               ('555 777', [self.bob]), ('LEE', [self.ann]), ('ee', []),
+                               ('', [self.bob, self.ann])):
+            self.assertEqual(list(Contact.objects.search(term)), expected, term)
+
+    def test_name_suffixes(self):
+        self.ann.full_name = 'Ann Maria Lee'
+        self.ann.save(update_fields=['full_name'])
+        self.assertEqual(sorted(self.ann.name_suffixes.values_list('key', flat=True)), ['lee', 'maria lee'])
+        self.assertEqual(list(Contact.objects.search('Maria L')), [self.ann])
+        import_rows(Contact, [(2, {'id': str(self.ann.pk), 'full_name': 'Ann Kumar'})])
+        self.assertEqual(list(Contact.objects.search('kumar')), [self.ann])
+        self.assertEqual(list(Contact.objects.search('maria')), [])
+
+    def test_changelist(self):
+        url = reverse('admin:website_contact_changelist')
+        self.assertContains(self.client.get(url, {'q': 'ann'}), 'Ann.Lee@Example.com')
+        self.client.get(url)
+        # The unfiltered total is estimated, not counted on every load.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ContactThrottleTests(TestCase):
+    def setUp(self):
+        reset_caches()
+
+    def post(self, **data):
+        fields = {
+            'full_name': 'Ann Lee', 'email': 'ann@example.com', 'phone_number': '555 0100', 'message': 'Hello',
+            'form_token': signing.dumps(time.time() - 10, salt=TOKEN_SALT),
+        }
+        fields.update(data)
+        return self.client.post(reverse('contact_new'), fields, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def stale_token(self):
+        signed_at = time.time() - CONTACT_FORM_MAX_AGE - 60
+        with mock.patch('django.core.signing.time.time', return_value=signed_at):
+            return signing.dumps(signed_at, salt=TOKEN_SALT)
+
+    def test_accepted(self):
+        response = self.post()
+        self.assertEqual(response.json()['success'], True)
+        self.assertEqual(Contact.objects.count(), 1)
+
+    def test_bots_dropped_before_any_query(self):
+        for data in ({'website': 'http://spam.example'}, {'form_token': ''},
+                     {'form_token': signing.dumps(time.time(), salt=TOKEN_SALT)},
+                     {'form_token': self.stale_token()}):
+            with self.assertNumQueries(0):
+                response = self.post(**data)
+            self.assertEqual(response.json()['success'], True)
+        self.assertEqual(Contact.objects.count(), 0)
+
+    def test_duplicate_collapsed(self):
+        self.post()
+        self.post(message='  hello ')
+        self.assertEqual(Contact.objects.count(), 1)
+
+    def test_rate_limited_per_email(self):
+        for i in range(3):
+            self.assertEqual(self.post(message=f'Message {i}').status_code, 200)
+        response = self.post(message='One more')
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(response.json()['success'])
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Contact.objects.count(), 3)
+
+    def test_rate_limited_per_ip(self):
+        for i in range(5):
+            self.post(email=f'user{i}@example.com')
+        self.assertEqual(self.post(email='other@example.com').status_code, 429)
+        # The plain (non-AJAX) form gets the contact page back.
+        token = signing.dumps(time.time() - 10, salt=TOKEN_SALT)
+        response = self.client.post(reverse('contact'), {'full_name': 'Bob', 'form_token': token})
+        self.assertContains(response, 'try again later', status_code=429)
+        self.assertEqual(Contact.objects.count(), 5)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Checks the SQLite WAL setup')
+class SQLiteConcurrencyTests(SimpleTestCase):
+    """A contact insert and catalog reads do not wait for each other."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = {**connection.settings_dict, 'NAME': os.path.join(directory.name, 'db.sqlite3')}
+        self.reader = DatabaseWrapper(settings_dict, alias='reader')
+        self.writer = DatabaseWrapper(settings_dict, alias='writer')
+        self.addCleanup(self.reader.close)
+        self.addCleanup(self.writer.close)
+        with self.writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE contact (id INTEGER PRIMARY KEY, email TEXT)')
+            cursor.execute("INSERT INTO contact (email) VALUES ('a@example.com')")
+
+    def count(self, cursor):
+        cursor.execute('SELECT COUNT(*) FROM contact')
+        return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        with self.reader.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_pragmas_read_from_settings(self):
+        other = DatabaseWrapper(self.reader.settings_dict, alias='other')
+        self.addCleanup(other.close)
+        with self.settings(SQLITE_PRAGMAS={'busy_timeout': 1234}), other.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    def test_reads_during_insert(self):
+        with self.writer.cursor() as write, self.reader.cursor() as read:
+            write.execute('BEGIN IMMEDIATE')
+            write.execute("INSERT INTO contact (email) VALUES ('b@example.com')")
+            started = time.monotonic()
+            self.assertEqual(self.count(read), 1)
+            self.assertLess(time.monotonic() - started, 1)
+            write.execute('COMMIT')
+            self.assertEqual(self.count(read), 2)
+
+    def test_insert_commits_during_read(self):
+        with self.writer.cursor() as write, self.reader.cursor() as read:
+            read.execute('BEGIN')
+            self.assertEqual(self.count(read), 1)
+            started = time.monotonic()
+            write.execute('BEGIN IMMEDIATE')
+            write.execute("INSERT INTO contact (email) VALUES ('b@example.com')")
+            write.execute('COMMIT')
+            self.assertLess(time.monotonic() - started, 1)
+            # The open read transaction keeps its snapshot.
+            self.assertEqual(self.count(read), 1)
+            read.execute('COMMIT')
+            self.assertEqual(self.count(read), 2)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        reset_caches()
+        metrics._pending.clear()
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('home'))
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", tpl;dur=')
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('services'))
+        self.client.get(reverse('services'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        self.client.force_login(self.admin)
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('website_request_duration_seconds_count{view="services"} 2', body)
+        self.assertIn('website_request_duration_seconds_bucket{view="services",le="+Inf"} 2', body)
+        self.assertRegex(body, r'website_db_queries_total\{view="services"\} [1-9]')
+        self.assertRegex(body, r'website_template_render_seconds_total\{view="services"\} 0\.\d*[1-9]')
+        self.assertIn('website_page_cache_events_total{view="services",event="hit"} 1', body)
+
+    def test_token(self):
+        with mock.patch.object(metrics, 'METRICS_TOKEN', 'secret'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+            self.assertEqual(response.status_code, 403)
+
+    def test_unsampled(self):
+        with mock.patch.object(metrics, 'METRICS_SAMPLE_RATE', 0):
+            response = self.client.get(reverse('home'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics._pending, {})
+
+
+# Queries each route may run: (with cold caches, once the caches are warm).
+# Cold caches include loading the SiteSettings row.
+# Every named route in website/urls.py needs an entry.
+QUERY_BUDGETS = {
+    # The trusted companies marquee is a cached fragment with its own lookups.
+    'home': (9, 0),
+    'services': (5, 0),
+    'service_detail': (5, 0),
+    'trainings': (5, 0),
+    'training_detail': (5, 0),
+    # Downloads look up the file every time; counts are written in batches.
+    'service_brochure': (1, 1),
+    'training_brochure': (1, 1),
+    'contact': (1, 0),
+    'contact_new': (1, 0),
+    'contact_token': (0, 0),
+    'live_search': (3, 0),
+    'terms': (2, 0),
+    'privacy': (2, 0),
+    'refund': (2, 0),
+    # Staff only: the session and user lookups.
+    'metrics': (2, 2),
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class QueryBudgetTests(TestCase):
+    """Every route stays within its QUERY_BUDGETS entry and never repeats a query.
+
+    Budgets are checked against two catalog sizes, so a query per row (N+1)
+    fails even when the budget itself is generous.
+    """
+    STAFF_ROUTES = {'metrics'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        os.makedirs(os.path.join(media.name, 'brochures'))
+        with open(os.path.join(media.name, 'brochures', 'b.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4')
+        Service.objects.update(pdf_file='brochures/b.pdf')
+        Training.objects.update(pdf_file='brochures/b.pdf')
+        self.addCleanup(downloads.flush_download_counts)
+
+    def url(self, name):
+        if name in ('service_detail', 'training_detail', 'service_brochure', 'training_brochure'):
+            model = Service if name.startswith('service') else Training
+            return reverse(name, kwargs={'pk': model.objects.order_by('pk').first().pk})
+        if name == 'live_search':
+            return reverse(name) + '?q=serv'
+        return reverse(name)
+
+    def queries(self, name):
+        url = self.url(name)
+        if name in self.STAFF_ROUTES:
+            self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.client.logout()
+        self.assertEqual(response.status_code, 200, name)
+        sql = [query['sql'] for query in captured.captured_queries]
+        repeated = [query for query, count in Counter(sql).items() if count > 1]
+        self.assertEqual(repeated, [], f'{name} runs the same query more than once')
+        return sql
+
+    def assertWithinBudget(self, name):
+        cold, warm = QUERY_BUDGETS[name]
+        reset_caches()
+        sql = self.queries(name)
+        self.assertLessEqual(len(sql), cold, f'{name} on cold caches:\n' + '\n'.join(sql))
+        sql = self.queries(name)
+        self.assertLessEqual(len(sql), warm, f'{name} on warm caches:\n' + '\n'.join(sql))
+        return len(sql)
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in website_urls.urlpatterns if pattern.name}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_budgets(self):
+        for name in QUERY_BUDGETS:
+            with self.subTest(name):
+                self.assertWithinBudget(name)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        before = {}
+        for name in QUERY_BUDGETS:
+            reset_caches()
+            before[name] = len(self.queries(name))
+        for i in range(12, 30):
+            Service.objects.create(name=f'Service {i}', short_description='Short', full_description='<p>Body</p>',
+                                   image=f'services/{i}.jpg', is_featured=True)
+            Training.objects.create(name=f'Training {i}', short_description='Short', full_description='<p>Body</p>',
+                                    image=f'trainings/{i}.jpg', is_featured=True)
+            TrustedCompany.objects.create(name=f'Company {i}', logo=f'companies/{i}.png', order=i)
+            Testimonial.objects.create(name=f'Person {i}', designation='CTO', review='Great', is_featured=True)
+        rebuild_related(Service)
+        rebuild_related(Training)
+        for name in QUERY_BUDGETS:
+            reset_caches()
+            self.assertEqual(len(self.queries(name)), before[name], name)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def setUp(self):
+        reset_caches()
+
+    def test_chrome_follows_site_settings(self):
+        self.assertContains(self.client.get(reverse('contact')), '&copy; 2026 Zynder Tech')
+        site_settings = SiteSettings.objects.get()
+        site_settings.site_name = 'Zynder Labs'
+        site_settings.save()
+        self.assertContains(self.client.get(reverse('contact')), '&copy; 2026 Zynder Labs')
+
+    def test_marquee_skips_queries_when_cached(self):
+        self.client.get(reverse('home'))
+        purge_all()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+        self.assertFalse([q for q in queries.captured_queries if 'website_trustedcompany"."name' in q['sql']])
+
+        TrustedCompany.objects.create(name='Newco', logo='companies/n.png', order=9)
+        self.assertContains(self.client.get(reverse('home')), 'alt="Newco"', count=2)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def setUp(self):
+        reset_caches()
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+
+    def export(self, **kwargs):
+        return snapshot.export_snapshot(self.root.name, host='localhost', **kwargs)
+
+    def read(self, path):
+        with open(os.path.join(self.root.name, path, 'index.html'), encoding='utf-8') as f:
+            return f.read()
+
+    def test_export_writes_every_page(self):
+        stats = self.export()
+        # Home, three legal pages, two listing pages and twelve details per model.
+        self.assertEqual(stats['written'], 4 + 2 * (2 + 12))
+        self.assertTrue(os.path.exists(os.path.join(self.root.name, 'index.html.gz')))
+        service = Service.objects.order_by('pk').first()
+        self.assertIn(service.name, self.read(f'service/{service.pk}'))
+
+        home = self.read('')
+        self.assertIn('name="csrfmiddlewaretoken" value=""', home)
+        self.assertIn('name="form_token" value=""', home)
+        first_page = self.read('services')
+        self.assertIn('href="/services/page/2/"', first_page)
+        self.assertNotIn('?cursor=', first_page)
+        self.assertIn('href="/services/"', self.read('services/page/2'))
+
+    def test_only_affected_pages_are_rendered_again(self):
+        self.export()
+        self.assertEqual(self.export()['rendered'], 0)
+
+        service = Service.objects.order_by('pk').first()
+        service.name = 'Renamed service'
+        service.save()
+        stats = self.export()
+        # Its own page, both listing pages, home and at most every other
+        # service detail (as a related item); no legal or training pages.
+        self.assertGreater(stats['rendered'], 0)
+        self.assertLessEqual(stats['rendered'], 1 + 2 + 1 + 11)
+        self.assertIn('Renamed service', self.read(f'service/{service.pk}'))
+
+        stats = self.export()
+        self.assertEqual(stats['rendered'], 0)
+        service.delete()
+        stats = self.export()
+        self.assertEqual(stats['removed'], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.root.name, f'service/{service.pk}')))
+
+    def test_contact_token(self):
+        response = self.client.get(reverse('contact_token'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        data = response.json()
+        self.assertTrue(data['csrf_token'])
+        self.assertAlmostEqual(signing.loads(data['form_token'], salt=TOKEN_SALT), time.time(), delta=5)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class VendorAssetsTests(SimpleTestCase):
+    CSS = ('.fa{font-family:"Font Awesome 6 Free"}.fa-spin{animation:fa-spin 2s}'
+           '@font-face{font-family:"Font Awesome 6 Free";src:url(../webfonts/fa-solid-900.woff2)}'
+           '.fa-home:before,.fa-house:before{content:"\\f015"}'
+           '.fa-user::before{content:"\\F007"}'
+           '.fa-phone-alt:before,.fa-phone-flip:before{content:"\\f879"}'
+           '.fa-phone:before{content:"\\f095"}')
+
+    def test_subset_keeps_only_used_icons(self):
+        css, codepoints = build_assets.subset_icon_rules(self.CSS, {'fa-house', 'fa-user', 'fa-phone'})
+        self.assertEqual(css, '.fa{font-family:"Font Awesome 6 Free"}.fa-spin{animation:fa-spin 2s}'
+                              '@font-face{font-family:"Font Awesome 6 Free";src:url(../webfonts/fa-solid-900.woff2)}'
+                              '.fa-house:before{content:"\\f015"}'
+                              '.fa-user::before{content:"\\F007"}'
+                              '.fa-phone:before{content:"\\f095"}')
+        self.assertEqual(codepoints, {0xf015, 0xf007, 0xf095})
+
+    def test_subset_keeps_aliases_in_use(self):
+        css, codepoints = build_assets.subset_icon_rules(self.CSS, {'fa-home', 'fa-phone-alt'})
+        self.assertIn('.fa-home:before{content:"\\f015"}', css)
+        self.assertIn('.fa-phone-alt:before{content:"\\f879"}', css)
+        self.assertNotIn('fa-house', css)
+        self.assertNotIn('fa-user', css)
+        self.assertEqual(codepoints, {0xf015, 0xf879})
+
+    def test_used_icon_classes(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'js', 'vendor'))
+            with open(os.path.join(root, 'page.html'), 'w') as f:
+                f.write('<i class="fas fa-house"></i><i class="fa-brands fa-whatsapp"></i>')
+            with open(os.path.join(root, 'js', 'app.js'), 'w') as f:
+                f.write("icon.className = 'fa fa-spinner fa-spin';")
+            with open(os.path.join(root, 'js', 'vendor', 'lib.js'), 'w') as f:
+                f.write("'fa-never-used'")
+            self.assertEqual(build_assets.used_icon_classes([root]),
+                             {'fa-house', 'fa-brands', 'fa-whatsapp', 'fa-spinner', 'fa-spin'})
+
+    def render(self):
+        return Template("{% load assets %}{% vendor_url 'bootstrap_css' %}").render(Context())
+
+    def test_vendor_url_follows_setting(self):
+        cdn_url, path = VENDOR_ASSETS['bootstrap_css']
+        with self.settings(SELF_HOSTED_ASSETS=False):
+            self.assertEqual(self.render(), cdn_url)
+        with self.settings(SELF_HOSTED_ASSETS=True):
+            self.assertEqual(self.render(), settings.STATIC_URL + path)
+
+
+class SeedTests(TestCase):
+    def test_seed_is_reproducible_and_clearable(self):
+        counts = {'services': 5, 'trainings': 5, 'companies': 2, 'testimonials': 2, 'contacts': 7}
+        seed.seed(counts, seed=3, batch_size=3)
+        names = list(Service.objects.order_by('pk').values_list('name', flat=True))
+        self.assertEqual(Contact.objects.count(), 7)
+        self.assertTrue(Contact.objects.search(Contact.objects.first().full_name[:4]).exists())
+        self.assertTrue(RelatedService.objects.exists())
+        self.assertTrue(Service.objects.exclude(full_description_html='').exists())
+
+        deleted = seed.clear_seeded()
+        self.assertEqual(deleted, counts)
+        self.assertFalse(Service.objects.exists())
+        seed.seed(counts, seed=3)
+        self.assertEqual(list(Service.objects.order_by('pk').values_list('name', flat=True)), names)
+
+    def test_clear_needs_confirmation_without_debug(self):
+        service = Service.objects.create(name=f'{seed.SEED_PREFIX}Real', short_description='Short',
+                                         full_description='<p>Body</p>', image='services/s.jpg')
+        with self.settings(DEBUG=False), self.assertRaisesMessage(CommandError, 'pass --yes'):
+            call_command('seed_scale_data', clear_only=True, stdout=io.StringIO())
+        self.assertTrue(Service.objects.filter(pk=service.pk).exists())
+        call_command('seed_scale_data', clear_only=True, yes=True, stdout=io.StringIO())
+        self.assertFalse(Service.objects.filter(pk=service.pk).exists())
+
+    def test_seeded_contacts_queue_no_email(self):
+        Contact.objects.create(full_name='Load Test', email=f'loadtest.0.1@{seed.SEED_EMAIL_DOMAIN}',
+                               phone_number='1', message='Hi')
+        kept = Contact.objects.create(full_name='Ann Lee', email='ann@example.com', phone_number='1', message='Hi')
+        self.assertEqual(list(OutboundEmail.objects.values_list('contact', flat=True)), [kept.pk])
+        self.assertEqual(seed.clear_seeded()['contacts'], 1)
+        self.assertEqual(list(Contact.objects.all()), [kept])
+        self.assertEqual(list(ContactNameSuffix.objects.values_list('contact', flat=True)), [kept.pk])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class LoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        # Commits happen here, so keep the rendition and related-item jobs
+        # off the worker thread: it would contend for the in-memory database.
+        with mock.patch('website.signals.run_in_background', lambda func, *args: None):
+            create_catalog()
+        reset_caches()
+        self.addCleanup(downloads.flush_download_counts)
+
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(loadtest.route_names(), set(loadtest.SCENARIO_WEIGHTS) - {'contact_post'})
+
+    def test_run_reports_every_scenario(self):
+        contacts = list(Contact.objects.values_list('pk', flat=True))
+        results = loadtest.run(self.live_server_url, concurrency=2, requests=60, seed=1)
+        self.assertEqual(results['total']['errors'], 0, results)
+        self.assertGreaterEqual(results['total']['requests'], 60)
+        self.assertIn('live_search', results['scenarios'])
+        self.assertIsNotNone(results['scenarios']['home']['queries'])
+        # Posted contacts are cleared with the seeded data and notify nobody.
+        posted = Contact.objects.exclude(pk__in=contacts)
+        self.assertFalse(posted.exclude(email__endswith=f'@{seed.SEED_EMAIL_DOMAIN}').exists())
+        self.assertFalse(OutboundEmail.objects.filter(contact__in=posted).exists())
+
+        regressed = dict(results, total=dict(results['total'], queries=results['total']['queries'] + 1))
+        rows = loadtest.compare(results, regressed)
+        self.assertEqual([row[:2] for row in rows if row[-1]], [('total', 'queries')])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([loadtest.percentile(values, p) for p in (50, 95, 99)], [50, 95, 99])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        benchmarks.create_fixture(scale=0.05)
+
+    def setUp(self):
+        reset_caches()
+
+    def test_baseline_covers_every_benchmark(self):
+        names = set(benchmarks.collect())
+        directory = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'website')
+        templates = {f'template:{name}' for name in os.listdir(directory)}
+        self.assertLessEqual(templates, names)
+        self.assertEqual(set(benchmarks.read_baseline()['benchmarks']), names)
+
+    def test_run_and_check(self):
+        results = benchmarks.run_benchmarks(['template:index', 'view:home'], rounds=1)
+        self.assertEqual(set(results), {'template:index.html', 'view:home', 'view:home.cache_miss'})
+        self.assertGreater(results['view:home.cache_miss']['queries'], 0)
+        self.assertGreater(results['template:index.html']['peak_kb'], 0)
+
+        baseline = {'benchmarks': {name: dict(result) for name, result in results.items()}}
+        self.assertEqual(benchmarks.check(results, baseline), [])
+        baseline['benchmarks']['view:home']['time_ms'] = results['view:home']['time_ms'] / 10 - 1
+        baseline['benchmarks']['view:home.cache_miss']['queries'] -= 1
+        self.assertEqual([failure[:2] for failure in benchmarks.check(results, baseline)],
+                         [('view:home', 'time_ms'), ('view:home.cache_miss', 'queries')])
+
+
+class DownloadTests(TestCase):
+    CONTENT = bytes(range(256)) * 40
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.service = Service.objects.create(
+            name='Cloud Audit', short_description='Short', full_description='<p>Body</p>', image='services/s.jpg',
+            pdf_file=SimpleUploadedFile('brochure.pdf', self.CONTENT, content_type='application/pdf'),
+        )
+        self.url = reverse('service_brochure', kwargs={'pk': self.service.pk})
+        downloads.flush_download_counts()
+        self.addCleanup(downloads.flush_download_counts)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_download(self):
+        with self.assertNumQueries(1):
+            response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.CONTENT)
+        self.assertEqual(response['Content-Length'], str(len(self.CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment; filename="cloud-audit.pdf"', response['Content-Disposition'])
+        self.assertEqual(self.get(**{'If-None-Match': response['ETag']})[0].status_code, 304)
+
+    def test_ranges(self):
+        response, body = self.get(Range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.CONTENT[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.CONTENT)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+        response, body = self.get(Range='bytes=-10')
+        self.assertEqual(body, self.CONTENT[-10:])
+        response, body = self.get(Range='bytes=10000-')
+        self.assertEqual(body, self.CONTENT[10000:])
+
+        response, _ = self.get(Range=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+        # A stale If-Range gets the whole, current file.
+        response, body = self.get(Range='bytes=0-9', **{'If-Range': '"stale"'})
+        self.assertEqual((response.status_code, len(body)), (200, len(self.CONTENT)))
+
+    def test_offload(self):
+        with mock.patch.object(downloads, 'DOWNLOAD_OFFLOAD', 'x-accel-redirect'):
+            response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.service.pdf_file.name}')
+        self.assertEqual(body, b'')
+        with mock.patch.object(downloads, 'DOWNLOAD_OFFLOAD', 'x-sendfile'):
+            response, _ = self.get()
+        self.assertEqual(response['X-Sendfile'], self.service.pdf_file.path)
+
+    def test_counts_are_batched(self):
+        self.get()
+        self.get(Range='bytes=0-99')
+        self.get(Range='bytes=100-')
+        self.get(**{'If-None-Match': self.get()[0]['ETag']})
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.download_count, 0)
+        self.assertEqual(downloads.flush_download_counts(), 3)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.download_count, 3)
+
+    def test_missing_file(self):
+        self.assertEqual(self.client.get(reverse('training_brochure', kwargs={'pk': 999})).status_code, 404)
+        Service.objects.filter(pk=self.service.pk).update(pdf_file='service_pdfs/gone.pdf')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
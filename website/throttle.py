@@ -0,0 +1,102 @@
+"""
+Abuse protection for the contact forms.
+
+Checks run cheapest first and all of them before the database is touched:
+
+1. a honeypot field and a signed render timestamp catch naive bots, which
+   are answered as if their message had been accepted;
+2. token buckets per client IP and per email address, kept in the shared
+   cache, cap how often anyone can write; an empty bucket is a 429;
+3. a hash of the normalized submission collapses identical resubmissions
+   (double clicks, replays) within ``CONTACT_DEDUP_WINDOW`` seconds.
+
+Bucket updates are read-modify-write on the cache, so concurrent requests
+can occasionally slip one extra message through. That is fine for a limit
+whose job is to stop floods, not to count exactly.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from .models import normalize_phone, normalize_text
+
+# Bucket name -> (capacity, seconds to refill an empty bucket).
+CONTACT_RATE_LIMITS = getattr(settings, 'CONTACT_RATE_LIMITS', {
+    'ip': (5, 60 * 60),
+    'email': (3, 60 * 60),
+})
+CONTACT_DEDUP_WINDOW = getattr(settings, 'CONTACT_DEDUP_WINDOW', 60 * 10)
+# Humans need a few seconds to fill in the form; scripts post instantly.
+CONTACT_MIN_FILL_SECONDS = getattr(settings, 'CONTACT_MIN_FILL_SECONDS', 3)
+# A token older than this is a stale tab or a harvested token being replayed.
+CONTACT_FORM_MAX_AGE = getattr(settings, 'CONTACT_FORM_MAX_AGE', 60 * 60 * 24)
+# Trust the first X-Forwarded-For address (only behind a proxy that sets it).
+TRUST_X_FORWARDED_FOR = getattr(settings, 'TRUST_X_FORWARDED_FOR', False)
+
+HONEYPOT_FIELD = 'website'
+TOKEN_FIELD = 'form_token'
+TOKEN_SALT = 'website.contact.form'
+BUCKET_KEY = 'website:throttle:%s:%s'
+DEDUP_KEY = 'website:contact:dedup:%s'
+
+
+class Throttled(Exception):
+    def __init__(self, bucket, retry_after):
+        super().__init__(f'{bucket} limit reached, retry in {retry_after}s')
+        self.bucket = bucket
+        self.retry_after = retry_after
+
+
+def client_ip(request):
+    if TRUST_X_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def issue_form_token():
+    return signing.dumps(time.time(), salt=TOKEN_SALT)
+
+
+def looks_automated(data):
+    """True for a filled honeypot, or a form posted without a token, too soon
+    after rendering or more than CONTACT_FORM_MAX_AGE seconds later."""
+    if data.get(HONEYPOT_FIELD):
+        return True
+    try:
+        rendered = float(signing.loads(data.get(TOKEN_FIELD, ''), salt=TOKEN_SALT, max_age=CONTACT_FORM_MAX_AGE))
+    except (signing.BadSignature, TypeError, ValueError):
+        return True
+    return time.time() - rendered < CONTACT_MIN_FILL_SECONDS
+
+
+def take_token(bucket, ident):
+    """Spend one token from ``bucket`` for ``ident`` or raise Throttled."""
+    capacity, period = CONTACT_RATE_LIMITS[bucket]
+    rate = capacity / period
+    key = BUCKET_KEY % (bucket, hashlib.sha256(ident.encode()).hexdigest()[:32])
+    now = time.time()
+
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens < 1:
+        raise Throttled(bucket, math.ceil((1 - tokens) / rate))
+    # Kept until the bucket would be full again; a missing key means full.
+    cache.set(key, (tokens - 1, now), math.ceil((capacity - tokens + 1) / rate))
+
+
+def is_duplicate(cleaned_data):
+    """True when the same submission was accepted within CONTACT_DEDUP_WINDOW."""
+    content = '\0'.join([
+        normalize_text(cleaned_data.get('email', '')),
+        normalize_phone(cleaned_data.get('phone_number', '')),
+        normalize_text(cleaned_data.get('message', '')),
+    ])
+    key = DEDUP_KEY % hashlib.sha256(content.encode()).hexdigest()
+    # add() is atomic: only the first of several identical posts gets through.
+    return not cache.add(key, 1, CONTACT_DEDUP_WINDOW)
@@ -0,0 +1,273 @@
+"""
+Bulk import and export of catalog content and contacts.
+
+Rows travel as CSV or JSON Lines with one column per editable field plus
+``id``. Exports stream straight from ``QuerySet.iterator()``, so memory use
+does not grow with the table. Imports run in one transaction: rows with a
+known ``id`` are updated and the rest created, ``chunk_size`` rows per
+bulk_update/bulk_create statement. Referenced media files can travel in a
+zip archive alongside the rows.
+
+Bulk writes skip model signals, so an import renders rich text itself and,
+after commit, rebuilds the search index and related items, purges the page
+cache and builds image renditions in the background.
+"""
+import csv
+import io
+import json
+import posixpath
+import zipfile
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .cache import invalidate_trusted_companies
+from .images import IMAGE_FIELDS, generate_for_sources, run_in_background
+from .models import Contact, Service, Testimonial, Training, TrustedCompany, sync_name_suffixes
+from .page_cache import purge_all
+from .pagination import forget_listing_count
+from .related import RELATION_MODELS, rebuild_related
+from .richtext import RICH_TEXT_FIELDS, prepare_rich_text, rich_text_columns
+from .search import rebuild_search_index
+
+TRANSFER_MODELS = {
+    'services': Service,
+    'trainings': Training,
+    'testimonials': Testimonial,
+    'companies': TrustedCompany,
+    'contacts': Contact,
+}
+FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ImportRowError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f'Row {line}: {message}')
+        self.line = line
+
+
+def import_fields(model):
+    return [f for f in model._meta.concrete_fields if f.editable and not f.primary_key]
+
+
+def export_columns(model):
+    columns = ['id'] + [f.name for f in import_fields(model)]
+    return columns + [name for name in ('created_at', 'updated_at') if name not in columns]
+
+
+def file_field_names(model):
+    return [f.name for f in model._meta.concrete_fields if isinstance(f, models.FileField)]
+
+
+# Export
+
+def export_values(model, queryset):
+    """Yield one ``{column: value}`` dict per row, streamed from the database."""
+    columns = export_columns(model)
+    files = set(file_field_names(model))
+    for row in queryset.order_by('pk').values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        values = dict(zip(columns, row))
+        for name in files:
+            values[name] = values[name] or ''
+        yield values
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(model, queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(export_columns(model))
+    for values in export_values(model, queryset):
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value for value in values.values()
+        ])
+
+
+def jsonl_lines(model, queryset):
+    for values in export_values(model, queryset):
+        yield json.dumps(values, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(model, queryset, fmt):
+    return csv_lines(model, queryset) if fmt == 'csv' else jsonl_lines(model, queryset)
+
+
+def write_media_archive(target, model, queryset):
+    """Bundle the files referenced by ``queryset`` into the zip ``target``.
+
+    Returns the number of files written. Media is mostly already-compressed
+    images and PDFs, so members are stored rather than deflated.
+    """
+    names = file_field_names(model)
+    written = set()
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for row in queryset.values_list(*names).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            for name in row:
+                if not name or name in written or not default_storage.exists(name):
+                    continue
+                with default_storage.open(name, 'rb') as source, archive.open(name, 'w') as member:
+                    for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                        member.write(chunk)
+                written.add(name)
+    return len(written)
+
+
+# Import
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, {column: value})`` from a text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as exc:
+                raise ImportRowError(line_number, f'invalid JSON ({exc})')
+
+
+def _clean_value(field, value):
+    if value in ('', None):
+        if field.null:
+            return None
+        if isinstance(field, (models.CharField, models.TextField, models.FileField)):
+            return ''
+        return field.get_default()
+    return field.to_python(value)
+
+
+def _apply_row(instance, fields, row):
+    for field in fields:
+        if field.name in row:
+            setattr(instance, field.attname, _clean_value(field, row[field.name]))
+
+
+def _write_chunk(model, fields, chunk, chunk_size, result):
+    pks = [int(row['id']) for _, row in chunk if row.get('id') not in ('', None)]
+    existing = model.objects.in_bulk(pks)
+    creates, updates, updated_fields = [], [], set()
+    now = timezone.now()
+
+    for line, row in chunk:
+        pk = row.get('id')
+        instance = existing.get(int(pk)) if pk not in ('', None) else None
+        if instance is None:
+            instance = model(pk=int(pk)) if pk not in ('', None) else model()
+            creates.append(instance)
+        else:
+            updates.append(instance)
+            updated_fields.update(f.name for f in fields if f.name in row)
+        try:
+            _apply_row(instance, fields, row)
+            instance.full_clean(validate_unique=False)
+        except ValidationError as exc:
+            raise ImportRowError(line, '; '.join(
+                f'{field}: {" ".join(errors)}' for field, errors in exc.message_dict.items()
+            ))
+        if model in RICH_TEXT_FIELDS:
+            result['media'] |= prepare_rich_text(instance)
+        if model is Contact:
+            instance.set_search_keys()
+        instance.updated_at = now
+        for name in IMAGE_FIELDS.get(model, ()):
+            if getattr(instance, name):
+                result['media'].add(getattr(instance, name).name)
+
+    model.objects.bulk_create(creates, batch_size=chunk_size)
+    if updates:
+        update_fields = list(updated_fields) + ['updated_at']
+        if model in RICH_TEXT_FIELDS:
+            update_fields += rich_text_columns(updates[0])
+        if model is Contact:
+            update_fields += ['name_key', 'email_key', 'phone_key']
+        model.objects.bulk_update(updates, update_fields, batch_size=chunk_size)
+    if model is Contact:
+        sync_name_suffixes(creates + updates)
+    result['created'] += len(creates)
+    result['updated'] += len(updates)
+
+
+def import_rows(model, rows, chunk_size=CHUNK_SIZE):
+    """Create or update ``model`` rows from ``(line, dict)`` pairs, all or nothing.
+
+    Returns ``{'created': n, 'updated': n, 'media': {storage names}}``.
+    """
+    fields = import_fields(model)
+    result = {'created': 0, 'updated': 0, 'media': set()}
+    with transaction.atomic():
+        chunk = []
+        for line, row in rows:
+            chunk.append((line, row))
+            if len(chunk) >= chunk_size:
+                _write_chunk(model, fields, chunk, chunk_size, result)
+                chunk = []
+        if chunk:
+            _write_chunk(model, fields, chunk, chunk_size, result)
+        # Rows created with explicit ids leave PostgreSQL sequences behind.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
+        transaction.on_commit(lambda: after_import(model, result['media']))
+    return result
+
+
+def _purge_after_import(model):
+    if model is TrustedCompany:
+        invalidate_trusted_companies()
+    if model is not Contact:
+        purge_all()
+
+
+def _build_renditions(model, media):
+    if generate_for_sources(media):
+        # Pages rendered meanwhile have plain <img> tags; let them pick up srcsets.
+        _purge_after_import(model)
+
+
+def after_import(model, media):
+    """Do what the skipped save signals would have done."""
+    if model in RELATION_MODELS:
+        forget_listing_count(model)
+        rebuild_search_index()
+        rebuild_related(model)
+    _purge_after_import(model)
+    if media:
+        run_in_background(_build_renditions, model, sorted(media))
+
+
+def extract_media_archive(source):
+    """Copy the members of the zip ``source`` into media storage.
+
+    Existing files are left alone. Returns the number of files added.
+    """
+    added = 0
+    with zipfile.ZipFile(source) as archive:
+        for member in archive.infolist():
+            name = posixpath.normpath(member.filename)
+            if member.is_dir() or name.startswith(('/', '../')) or name == '..':
+                continue
+            if default_storage.exists(name):
+                continue
+            saved = default_storage.save(name, ContentFile(archive.read(member)))
+            added += saved == name
+    return added
+
+
+def text_stream(binary):
+    """Text view of an uploaded or opened binary file; tolerates a UTF-8 BOM."""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
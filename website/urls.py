@@ -1,16 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, metrics, views
+
+# Under ASGI the read-only pages can be served by their async variants.
+public_views = async_views if settings.WEBSITE_ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('services/', views.services_list, name='services'),
-    path('service/<int:pk>/', views.service_detail, name='service_detail'),
-    path('trainings/', views.trainings_list, name='trainings'),
-    path('training/<int:pk>/', views.training_detail, name='training_detail'),
+    path('', public_views.home, name='home'),
+    path('services/', public_views.services_list, name='services'),
+    path('service/<int:pk>/', public_views.service_detail, name='service_detail'),
+    path('service/<int:pk>/brochure/', views.service_brochure, name='service_brochure'),
+    path('trainings/', public_views.trainings_list, name='trainings'),
+    path('training/<int:pk>/', public_views.training_detail, name='training_detail'),
+    path('training/<int:pk>/brochure/', views.training_brochure, name='training_brochure'),
     path('contact/', views.contact_view, name='contact'),
+    path('contact/token/', views.contact_token, name='contact_token'),
     path('contact_new/',views.contact_view_new,name='contact_new'),
-    path('api/search/', views.live_search, name='live_search'),
+    path('api/search/', public_views.live_search, name='live_search'),
     path('terms/', views.terms,name='terms'),
     path('privacy/', views.privacy,name='privacy'),
     path('refund/', views.refund,name='refund'),
-]
\ No newline at end of file
+    path('metrics', metrics.metrics_view, name='metrics'),
+]
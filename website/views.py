@@ -1,21 +1,38 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
-from django.core.paginator import Paginator
+from django.http import HttpResponse, JsonResponse
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.conf import settings
-from django.db.models import Q
+from django.db import transaction
+from django.middleware.csrf import get_token
+from django.utils.cache import add_never_cache_headers
+from django.utils.text import slugify
 from .models import *
 from .forms import ContactForm
+from .conditional import (
+    conditional_page, home_sources, service_detail_sources, services_sources, site_sources,
+    training_detail_sources, trainings_sources,
+)
+from .downloads import counts_download, record_download, serve_file
+from .images import prefetch_renditions
+from .page_cache import cache_public_page
+from .pagination import LISTING_PAGE_SIZE, paginate_listing
+from .related import related_cards
+from .search import get_search_index
+from .throttle import Throttled, client_ip, is_duplicate, issue_form_token, looks_automated, take_token
 import json
+import os
 
 
+@conditional_page(home_sources)
+@cache_public_page
 def home(request):
     hero_section = HeroSection.objects.filter(is_active=True).first()
-    services = Service.objects.filter(is_featured=True)[:6]
-    trainings = Training.objects.filter(is_featured=True)[:6]
+    services = Service.objects.cards().filter(is_featured=True)[:6]
+    trainings = Training.objects.cards().filter(is_featured=True)[:6]
     trusted_companies = TrustedCompany.objects.all()
     testimonials = Testimonial.objects.filter(is_featured=True)[:6]
+    # trusted_companies stays lazy: the template caches the marquee fragment.
+    prefetch_renditions(services, trainings, testimonials)
 
     context = {
         'hero_section': hero_section,
@@ -27,11 +44,11 @@ def home(request):
     return render(request, 'website/index.html', context)
 
 
+@conditional_page(services_sources)
+@cache_public_page
 def services_list(request):
-    services = Service.objects.all()
-    paginator = Paginator(services, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate_listing(request.GET, Service.objects.cards(), LISTING_PAGE_SIZE, 'services')
+    prefetch_renditions(page_obj)
 
     context = {
         'page_obj': page_obj,
@@ -40,9 +57,12 @@ def services_list(request):
     return render(request, 'website/services.html', context)
 
 
+@conditional_page(service_detail_sources)
+@cache_public_page
 def service_detail(request, pk):
     service = get_object_or_404(Service, pk=pk)
-    related_services = Service.objects.exclude(pk=pk)[:3]
+    related_services = related_cards(Service, pk)
+    prefetch_renditions([service], related_services)
 
     context = {
         'service': service,
@@ -51,11 +71,11 @@ def service_detail(request, pk):
     return render(request, 'website/service_detail.html', context)
 
 
+@conditional_page(trainings_sources)
+@cache_public_page
 def trainings_list(request):
-    trainings = Training.objects.all()
-    paginator = Paginator(trainings, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate_listing(request.GET, Training.objects.cards(), LISTING_PAGE_SIZE, 'trainings')
+    prefetch_renditions(page_obj)
 
     context = {
         'page_obj': page_obj,
@@ -64,10 +84,13 @@ def trainings_list(request):
     return render(request, 'website/trainings.html', context)
 
 
+@conditional_page(training_detail_sources)
+@cache_public_page
 def training_detail(request, pk):
     training = get_object_or_404(Training, pk=pk)
     whatsapp_message = f"Hi, I'm interested in {training.name} training. Please provide more details about enrollment."
-    related_trainings = Training.objects.exclude(pk=pk)[:3]
+    related_trainings = related_cards(Training, pk)
+    prefetch_renditions([training], related_trainings)
 
     context = {
         'training': training,
@@ -77,25 +100,76 @@ def training_detail(request, pk):
     return render(request, 'website/training_detail.html', context)
 
 
+def _brochure(request, model, pk):
+    item = get_object_or_404(model.objects.only('id', 'name', 'pdf_file'), pk=pk)
+    # Saved under the item's name rather than the upload's file name.
+    extension = os.path.splitext(item.pdf_file.name)[1] if item.pdf_file else ''
+    filename = f'{slugify(item.name) or model._meta.model_name}{extension}'
+    response = serve_file(request, item.pdf_file, filename=filename)
+    if counts_download(request, response):
+        record_download(model, pk)
+    return response
+
+
+def service_brochure(request, pk):
+    return _brochure(request, Service, pk)
+
+
+def training_brochure(request, pk):
+    return _brochure(request, Training, pk)
+
+
+def _is_ajax(request):
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+def _screen_contact(request, form):
+    """Abuse checks for a posted contact form, all before any database write.
+
+    Returns 'save', 'drop' (bots and resubmissions, answered as accepted) or
+    'invalid'. Raises Throttled when a rate limit is hit.
+    """
+    if looks_automated(request.POST):
+        return 'drop'
+    take_token('ip', client_ip(request))
+    if not form.is_valid():
+        return 'invalid'
+    take_token('email', form.cleaned_data['email'].lower())
+    if is_duplicate(form.cleaned_data):
+        return 'drop'
+    return 'save'
+
+
+def _throttled(request, form, exc):
+    message = 'You have sent several messages in a short time. Please try again later.'
+    if _is_ajax(request):
+        response = JsonResponse({'success': False, 'message': message, 'retry_after': exc.retry_after},
+                                status=429)
+    else:
+        messages.error(request, message)
+        response = render(request, 'website/contact.html', {'form': form}, status=429)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+def _save_contact(form):
+    # The post_save handler queues the notification email in the outbox, so
+    # the Contact and its OutboundEmail row commit together or not at all.
+    # The send_queued_mail worker delivers the email.
+    with transaction.atomic():
+        return form.save()
+
+
 def contact_view(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
-        if form.is_valid():
-            contact = form.save()
-
-            # Send email notification
-            try:
-                site_settings = SiteSettings.objects.first()
-                if site_settings and site_settings.smtp_username:
-                    send_mail(
-                        subject=f'New Contact Form Submission from {contact.full_name}',
-                        message=f'Name: {contact.full_name}\nEmail: {contact.email}\nPhone: {contact.phone_number}\nMessage: {contact.message}',
-                        from_email=site_settings.smtp_username,
-                        recipient_list=[site_settings.email or site_settings.smtp_username],
-                        fail_silently=True,
-                    )
-            except:
-                pass
+        try:
+            outcome = _screen_contact(request, form)
+        except Throttled as exc:
+            return _throttled(request, form, exc)
+        if outcome != 'invalid':
+            if outcome == 'save':
+                _save_contact(form)
 
             messages.success(request, 'Thank you for your message. We will get back to you soon!')
             return redirect('/')
@@ -105,42 +179,17 @@ def contact_view(request):
     return render(request, 'website/contact.html', {'form': form})
 
 
+def contact_token(request):
+    """Fresh CSRF and render-time tokens for forms on static snapshot pages."""
+    response = JsonResponse({'csrf_token': get_token(request), 'form_token': issue_form_token()})
+    add_never_cache_headers(response)
+    return response
+
+
 def live_search(request):
     query = request.GET.get('q', '')
-    results = []
-
-    if query:
-        # Search services
-        services = Service.objects.filter(
-            Q(name__icontains=query) | Q(short_description__icontains=query)
-        )[:5]
-
-        for service in services:
-            results.append({
-                'type': 'service',
-                'id': service.id,
-                'name': service.name,
-                'description': service.short_description,
-                'url': service.get_absolute_url(),
-                'image': service.image.url if service.image else None,
-            })
-
-        # Search trainings
-        trainings = Training.objects.filter(
-            Q(name__icontains=query) | Q(short_description__icontains=query)
-        )[:5]
-
-        for training in trainings:
-            results.append({
-                'type': 'training',
-                'id': training.id,
-                'name': training.name,
-                'description': training.short_description,
-                'url': training.get_absolute_url(),
-                'image': training.image.url if training.image else None,
-            })
-
-    return JsonResponse({'results': results})
+    body = get_search_index().live_search(query)
+    return HttpResponse(body, content_type='application/json')
 
 
 def contact_view_new(request):
@@ -155,24 +204,16 @@ def contact_view_new(request):
 
     if request.method == "POST":
         form = ContactForm(request.POST)
-        if form.is_valid():
-            contact = form.save()
-            try:
-                site_settings = SiteSettings.objects.first()
-                # optional: email sending kept as in your existing codebase
-                if site_settings and site_settings.smtp_username:
-                    send_mail(
-                        subject=f'New Contact Form Submission from {contact.full_name}',
-                        message=f'Name: {contact.full_name}\nEmail: {contact.email}\nPhone: {contact.phone_number}\nMessage: {contact.message}',
-                        from_email=site_settings.smtp_username,
-                        recipient_list=[site_settings.email or site_settings.smtp_username],
-                        fail_silently=True,
-                    )
-            except Exception:
-                pass
+        try:
+            outcome = _screen_contact(request, form)
+        except Throttled as exc:
+            return _throttled(request, form, exc)
+        if outcome != 'invalid':
+            if outcome == 'save':
+                _save_contact(form)
 
             # Check if it's an AJAX request
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if _is_ajax(request):
                 return JsonResponse({
                     'success': True,
                     'message': 'Thank you for your message. We will get back to you soon!'
@@ -182,7 +223,7 @@ def contact_view_new(request):
                 return redirect("home")
         else:
             # Handle form errors for AJAX requests
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if _is_ajax(request):
                 return JsonResponse({
                     'success': False,
                     'errors': form.errors
@@ -193,11 +234,17 @@ def contact_view_new(request):
     return render(request, "website/contact.html", {"form": form})
 
 
+@conditional_page(site_sources)
+@cache_public_page
 def terms(request):
     return render(request, 'website/terms.html')
+@conditional_page(site_sources)
+@cache_public_page
 def privacy(request):
     return render(request, 'website/privacy.html')
 
+@conditional_page(site_sources)
+@cache_public_page
 def refund(request):
     return render(request, 'website/refund.html')
 
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'website.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -59,7 +62,8 @@ ROOT_URLCONF = 'zynder_tech.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, plus render timing for website.metrics.
+        'BACKEND': 'website.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,17 +79,129 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'zynder_tech.wsgi.application'
+ASGI_APPLICATION = 'zynder_tech.asgi.application'
+
+# Route the read-only public views to their async variants. Only enable this
+# when serving through an ASGI server (uvicorn, daphne, ...).
+WEBSITE_ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_ENGINE=sqlite (default) or postgresql. Connections persist for
+# DJANGO_CONN_MAX_AGE seconds instead of being opened per request.
+DATABASE_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'sqlite')
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', 600))
+
+if DATABASE_ENGINE == 'postgresql':
+    # Needs psycopg 3; pooling needs `pip install "psycopg[binary,pool]"`.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DJANGO_DB_NAME', 'zynder_tech'),
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if os.environ.get('DJANGO_DB_POOL', '1').lower() in ('1', 'true', 'yes'):
+        # Each worker process keeps a pool; Django requires CONN_MAX_AGE=0 with it.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DJANGO_DB_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('DJANGO_DB_POOL_MAX', 10)),
+                'timeout': 10,
+            },
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'OPTIONS': {
+                # Take the write lock at BEGIN, so a transaction that reads
+                # first never fails to upgrade with "database is locked".
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
+
+# Applied to every new SQLite connection (website.db). WAL lets readers and
+# the contact-form writer work concurrently; NORMAL sync is safe under WAL.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Cached pages, fragments and the search index are invalidated through
+# counters kept in this cache, so every worker process must share it. The
+# default file cache is shared by the processes of one host; set
+# DJANGO_REDIS_URL when the site runs on more than one.
+
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR',
+                                       os.path.join(tempfile.gettempdir(), 'zynder-tech-cache')),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Public catalog pages are purged from model signals, so entries can live long.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+# Template fragments (navbar, footer, marquee) are versioned the same way.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Service and training listings page with opaque cursors ('keyset') instead
+# of OFFSET ('offset'); the page-number links use a count cached this long.
+LISTING_PAGINATION = 'keyset'
+LISTING_COUNT_TIMEOUT = 60 * 10
+# Unfiltered admin changelists (the Contact inbox) show a row count cached this long.
+ADMIN_COUNT_TIMEOUT = 60
+
+# Contact form abuse limits: bucket -> (capacity, seconds to refill it), and
+# how long an identical resubmission is collapsed into the first one.
+CONTACT_RATE_LIMITS = {
+    'ip': (5, 60 * 60),
+    'email': (3, 60 * 60),
 }
+CONTACT_DEDUP_WINDOW = 60 * 10
+CONTACT_MIN_FILL_SECONDS = 3
+# Request metrics (website.metrics): share of requests measured, and the
+# bearer token Prometheus sends to /metrics.
+METRICS_SAMPLE_RATE = float(os.environ.get('DJANGO_METRICS_SAMPLE_RATE', 1.0))
+METRICS_SERVER_TIMING = True
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+
+# Brochure downloads: '' serves them from Django (sendfile through the WSGI
+# server), 'x-accel-redirect' (nginx, internal location at
+# DOWNLOAD_ACCEL_PREFIX aliasing MEDIA_ROOT) or 'x-sendfile' hand them to the proxy.
+DOWNLOAD_OFFLOAD = os.environ.get('DJANGO_DOWNLOAD_OFFLOAD', '')
+DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
+DOWNLOAD_COUNT_FLUSH_INTERVAL = 30
+
+# Where export_static_site writes the static snapshot of the public pages.
+SNAPSHOT_ROOT = Path(os.environ.get('DJANGO_SNAPSHOT_ROOT', BASE_DIR / 'snapshot'))
+
+TRUST_X_FORWARDED_FOR = os.environ.get('DJANGO_TRUST_X_FORWARDED_FOR', '').lower() in ('1', 'true', 'yes')
 
 
 # Password validation
@@ -118,7 +234,18 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Serve Bootstrap, Font Awesome, AOS and the web fonts from our own static
+# files instead of their CDNs. Run `manage.py build_assets` before enabling.
+SELF_HOSTED_ASSETS = os.environ.get('DJANGO_SELF_HOSTED_ASSETS', '').lower() in ('1', 'true', 'yes')
 
 # Media files
 MEDIA_URL = '/media/'